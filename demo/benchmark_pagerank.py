@@ -0,0 +1,36 @@
+
+# Benchmark of the Python and Cython PageRank implementations.
+#
+# Usage: python demo/benchmark_pagerank.py [nbnodes] [average out-degree]
+
+import sys
+from timeit import repeat
+
+import networkx as nx
+from graphflow import PageRankLanguage
+from graphflow.pagerank import GoogleMatrix, TransitionMatrix, CalculatePageRankFromAdjacencyMatrix, \
+    CalculatePageRankFromTransitionMatrix
+
+
+def best_time(func, number=5):
+    return min(repeat(func, number=number, repeat=3)) / number
+
+
+if __name__ == '__main__':
+    nbnodes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    outdegree = float(sys.argv[2]) if len(sys.argv) > 2 else 10.
+    digraph = nx.gnp_random_graph(nbnodes, outdegree / nbnodes, seed=42, directed=True)
+    beta = 0.85
+
+    A, nodes = GoogleMatrix(digraph, beta)
+    P, dangling, nodes = TransitionMatrix(digraph)
+
+    print(f'{nbnodes} nodes, {digraph.number_of_edges()} edges')
+    for language in [PageRankLanguage.PYTHON, PageRankLanguage.CYTHON]:
+        dense_time = best_time(
+            lambda: CalculatePageRankFromAdjacencyMatrix(A, nodes, language=language)
+        )
+        sparse_time = best_time(
+            lambda: CalculatePageRankFromTransitionMatrix(P, dangling, nodes, beta, language=language)
+        )
+        print(f'{language.name:>6}: dense {dense_time * 1000:9.3f} ms; sparse {sparse_time * 1000:9.3f} ms')
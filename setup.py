@@ -1,10 +1,27 @@
 
-from setuptools import setup
+import sys
+
+from setuptools import setup, Extension
 import numpy as np
 from Cython.Build import cythonize
 
 
-dynprog_ext_modules = cythonize(['src/graphflow/pagerank/cpagerank.pyx'])
+# OpenMP is used for the parallel loops of the PageRank kernels; without it, they run serially.
+if sys.platform == 'win32':
+    openmp_compile_args, openmp_link_args = ['/openmp'], []
+elif sys.platform == 'darwin':
+    openmp_compile_args, openmp_link_args = [], []
+else:
+    openmp_compile_args, openmp_link_args = ['-fopenmp'], ['-fopenmp']
+
+dynprog_ext_modules = cythonize([
+    Extension(
+        'graphflow.pagerank.cpagerank',
+        ['src/graphflow/pagerank/cpagerank.pyx'],
+        extra_compile_args=openmp_compile_args,
+        extra_link_args=openmp_link_args
+    )
+])
 
 
 setup(
@@ -12,6 +12,7 @@ class PageRankLanguage(enum.Enum):
     CYTHON = 1
     FORTRAN = 2
 
+from .results import NodeIndex, NodeScores
 from . import hits
 from . import pagerank
 from . import simvoltage
@@ -1,2 +1,2 @@
-
-from .hitsrank import hits, CalculateHITS
\ No newline at end of file
+from .hitsrank import hits, hits_svd, CalculateHITS
+from .topichits import TopicHITS
@@ -1,37 +1,70 @@
 
 # Jon Kleinberg's HITS (Hyperlink-Induced Topic Search) algorithm
 
-from typing import Literal, Annotated
+import warnings
+from typing import Literal, Annotated, Optional, Union
 
 import networkx
 import numpy as np
 import networkx as nx
 from numpy.typing import NDArray
+from scipy.sparse import csr_array, issparse, sparray
+from scipy.sparse.linalg import svds
 
 from .. import L1norm
+from ..results import NodeIndex, NodeScores
 
 
 def hits(
-        adjMatrix: Annotated[NDArray[np.float64], Literal["2D Array"]],
+        adjMatrix: Union[Annotated[NDArray[np.float64], Literal["2D Array"]], sparray],
         eps: float=1e-4,
-        maxstep: int=1000
-) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], Annotated[NDArray[np.float64], Literal["1D Array"]]]:
+        maxstep: int=1000,
+        initial: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None,
+        seed: Optional[int]=None,
+        solver: Literal["power", "svd"]="power",
+        return_residual: bool=False
+) -> Union[
+    tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], Annotated[NDArray[np.float64], Literal["1D Array"]]],
+    tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], Annotated[NDArray[np.float64], Literal["1D Array"]], float]
+]:
     """
     Compute the HITS (Hyperlink-Induced Topic Search) algorithm on an adjacency matrix.
     
     This function calculates the hub and authority vectors for a given adjacency matrix
     using the HITS algorithm. The algorithm iteratively computes these vectors until
     convergence or the maximum number of steps is reached.
+
+    A sparse adjacency matrix is kept sparse: its transpose is built once in CSR format,
+    and each iteration costs two sparse matrix-vector products, using O(E) memory.
+
+    The hub and authority vectors are the leading left and right singular vectors of the
+    adjacency matrix. With `solver="svd"`, they are computed directly with the Lanczos
+    method of ARPACK, which converges in a bounded number of iterations even when
+    the top singular value is nearly degenerate, where the power iteration is slow.
     
     Parameters
     ----------
-    adjMatrix : numpy.ndarray
+    adjMatrix : numpy.ndarray or scipy.sparse.sparray
         The adjacency matrix representing the graph structure.
     eps : float, optional
         The convergence threshold. The algorithm stops when the change in vectors
         is less than this value. Default is 1e-4.
     maxstep : int, optional
         The maximum number of iterations to perform. Default is 1000.
+    initial : numpy.ndarray, optional
+        The vector to start both the hub and the authority vectors from. If None,
+        the vector of ones is used, unless `seed` is given. Default is None.
+    seed : int, optional
+        If given, and `initial` is None, the hub and authority vectors start from
+        random vectors drawn with this seed. Default is None.
+    solver : str, optional
+        Either "power" for the power iteration, or "svd" for the truncated singular
+        value decomposition, whose `maxstep` and `eps` are passed to ARPACK as the
+        maximum number of iterations and the relative tolerance. Default is "power".
+    return_residual : bool, optional
+        If True, the residual is returned as well. It is the largest L1 change of the hub
+        and authority vectors in the last iteration, or under one more iteration for
+        the "svd" solver. Default is False.
     
     Returns
     -------
@@ -39,40 +72,134 @@ def hits(
         A tuple containing:
         - hub vector (numpy.ndarray): The hub scores for each node.
         - authority vector (numpy.ndarray): The authority scores for each node.
+        - residual (float): The residual, if `return_residual` is True.
+
+    Raises
+    ------
+    ValueError
+        If the solver is unknown.
+    scipy.sparse.linalg.ArpackNoConvergence
+        If the "svd" solver does not converge within `maxstep` iterations.
+
+    Warns
+    -----
+    RuntimeWarning
+        If the power iteration stops at `maxstep` before converging.
     """
     nbnodes = adjMatrix.shape[0]
-    # hub vector
-    i = np.random.uniform(size=nbnodes).reshape((nbnodes, 1))
-    # authority vector
-    p = np.random.uniform(size=nbnodes).reshape((nbnodes, 1))
+    if issparse(adjMatrix):
+        adjMatrix = csr_array(adjMatrix)
+        adjMatrixT = csr_array(adjMatrix.T)
+    else:
+        adjMatrixT = adjMatrix.T
+
+    if solver == "svd":
+        i, p = hits_svd(adjMatrix, eps=eps, maxstep=maxstep, initial=initial)
+        if return_residual:
+            residual = max(
+                L1norm(adjMatrix @ p / np.linalg.norm(adjMatrix @ p), i),
+                L1norm(adjMatrixT @ i / np.linalg.norm(adjMatrixT @ i), p)
+            )
+            return i, p, residual
+        return i, p
+    elif solver != "power":
+        raise ValueError(f"Unknown HITS solver: {solver}")
+
+    if initial is not None:
+        # hub vector
+        i = np.asarray(initial, dtype=np.float64).reshape(nbnodes)
+        # authority vector
+        p = i.copy()
+    elif seed is not None:
+        rng = np.random.default_rng(seed)
+        i = rng.uniform(size=nbnodes)
+        p = rng.uniform(size=nbnodes)
+    else:
+        i = np.ones(nbnodes)
+        p = np.ones(nbnodes)
 
     step = 0
     converged = False
+    residual = np.inf
 
     while step < maxstep and not converged:
-        newp = np.matmul(adjMatrix.T, i)
-        newi = np.matmul(adjMatrix, p)
+        newp = adjMatrixT @ i
+        newi = adjMatrix @ p
 
         newp = newp / np.linalg.norm(newp)
         newi = newi / np.linalg.norm(newi)
 
-        converged = (L1norm(newp, p) < eps) and (L1norm(newi, i) < eps)
+        residual = max(L1norm(newp, p), L1norm(newi, i))
+        converged = residual < eps
         i, p = newi, newp
+        step += 1
+
+    if not converged:
+        warnings.warn(
+            f"HITS did not converge in {maxstep} steps (residual {residual:.3g}).",
+            RuntimeWarning
+        )
+    if return_residual:
+        return i, p, residual
+    return i, p
+
+
+def hits_svd(
+        adjMatrix: Union[Annotated[NDArray[np.float64], Literal["2D Array"]], sparray],
+        eps: float=1e-4,
+        maxstep: int=1000,
+        initial: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], Annotated[NDArray[np.float64], Literal["1D Array"]]]:
+    """
+    Compute the hub and authority vectors as the leading singular vectors of an adjacency matrix.
 
-    return i.reshape(nbnodes), p.reshape(nbnodes)
+    Parameters
+    ----------
+    adjMatrix : numpy.ndarray or scipy.sparse.sparray
+        The adjacency matrix representing the graph structure.
+    eps : float, optional
+        The relative tolerance of the singular vectors. Default is 1e-4.
+    maxstep : int, optional
+        The maximum number of Lanczos iterations. Default is 1000.
+    initial : numpy.ndarray, optional
+        The vector to start the Lanczos iteration from. If None, the vector of ones
+        is used, so that the result is deterministic. Default is None.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - hub vector (numpy.ndarray): The hub scores for each node, with unit L2 norm.
+        - authority vector (numpy.ndarray): The authority scores for each node, with unit L2 norm.
+    """
+    nbnodes = adjMatrix.shape[0]
+    if nbnodes < 2:
+        # ARPACK needs at least one more dimension than the number of singular vectors
+        u, _, vt = np.linalg.svd(adjMatrix.toarray() if issparse(adjMatrix) else np.asarray(adjMatrix, dtype=np.float64))
+    else:
+        v0 = np.ones(nbnodes) if initial is None else np.asarray(initial, dtype=np.float64)
+        u, _, vt = svds(adjMatrix.astype(np.float64), k=1, tol=eps, maxiter=maxstep, v0=v0)
+    hubvec, authvec = u[:, 0], vt[0, :]
+    # singular vectors are defined up to a common sign, and the scores are nonnegative
+    if np.sum(hubvec) + np.sum(authvec) < 0:
+        hubvec, authvec = -hubvec, -authvec
+    return hubvec, authvec
 
 
 def CalculateHITS(
         digraph: networkx.DiGraph,
         eps: float=1e-4,
-        maxstep: int=1000
-) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], Annotated[NDArray[np.float64], Literal["1D Array"]]]:
+        maxstep: int=1000,
+        as_result: bool=False,
+        seed: Optional[int]=None,
+        solver: Literal["power", "svd"]="power"
+) -> Union[tuple[dict[str, float], dict[str, float]], tuple[NodeScores, NodeScores]]:
     """
     Compute the HITS (Hyperlink-Induced Topic Search) algorithm on a NetworkX digraph.
     
     This function calculates the hub and authority scores for each node in a directed graph
-    using the HITS algorithm. It converts the graph to an adjacency matrix and then applies
-    the HITS algorithm.
+    using the HITS algorithm. It converts the graph to a sparse adjacency matrix and then
+    applies the HITS algorithm.
     
     Parameters
     ----------
@@ -83,6 +210,15 @@ def CalculateHITS(
         is less than this value. Default is 1e-4.
     maxstep : int, optional
         The maximum number of iterations to perform. Default is 1000.
+    as_result : bool, optional
+        If True, the scores are returned as two :class:`graphflow.results.NodeScores`
+        sharing one node index, instead of dictionaries. Default is False.
+    seed : int, optional
+        If given, the iteration starts from random vectors drawn with this seed, instead
+        of the vectors of ones. Default is None.
+    solver : str, optional
+        Either "power" for the power iteration, or "svd" for the truncated singular
+        value decomposition (see :func:`hits`). Default is "power".
     
     Returns
     -------
@@ -91,9 +227,12 @@ def CalculateHITS(
         - hubdict (dict): A dictionary mapping node identifiers to their hub scores.
         - authdict (dict): A dictionary mapping node identifiers to their authority scores.
     """
-    A = nx.adjacency_matrix(digraph).toarray()
+    A = nx.adjacency_matrix(digraph)
     nodes = list(digraph.nodes())
-    hubvec, authvec = hits(A, eps=eps, maxstep=maxstep)
+    hubvec, authvec = hits(A, eps=eps, maxstep=maxstep, seed=seed, solver=solver)
+    if as_result:
+        nodeindex = NodeIndex(nodes)
+        return NodeScores(hubvec, nodeindex), NodeScores(authvec, nodeindex)
     hubdict = {nodes[i]: hubvec[i] for i in range(len(hubvec))}
     authdict = {nodes[i]: authvec[i] for i in range(len(authvec))}
     return hubdict, authdict
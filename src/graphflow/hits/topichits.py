@@ -0,0 +1,208 @@
+
+'''
+Topic-focused HITS for batches of queries on one large graph.
+
+As in Kleinberg's paper, HITS is run for each query on a base set, made of a root
+set of nodes relevant to the query and of their neighbors. The graph is indexed
+once into sparse arrays, so that base sets and their adjacency matrices are
+extracted with array operations, without building a networkx subgraph.
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Hashable, Iterable, Literal, Optional
+
+import networkx
+import numpy as np
+from numpy.typing import NDArray
+from scipy.sparse import csr_array
+
+from .hitsrank import hits
+from ..results import NodeIndex, NodeScores
+
+
+def GatherNeighbors(
+        indptr: Annotated[NDArray[np.int64], Literal["1D Array"]],
+        indices: Annotated[NDArray[np.int64], Literal["1D Array"]],
+        rows: Annotated[NDArray[np.int64], Literal["1D Array"]],
+        cap: Optional[int]=None
+) -> Annotated[NDArray[np.int64], Literal["1D Array"]]:
+    """
+    Gather the column indices of several rows of a CSR matrix at once.
+
+    Parameters
+    ----------
+    indptr : numpy.ndarray
+        The row pointers of the CSR matrix.
+    indices : numpy.ndarray
+        The column indices of the CSR matrix.
+    rows : numpy.ndarray
+        The rows to gather.
+    cap : int, optional
+        If given, at most `cap` column indices are taken from each row. Default is None.
+
+    Returns
+    -------
+    numpy.ndarray
+        The column indices of all the rows, concatenated.
+    """
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    if cap is not None:
+        lengths = np.minimum(lengths, cap)
+    # position of each gathered entry: the start of its row plus its rank in the row
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return indices[offsets + np.arange(np.sum(lengths))]
+
+
+class TopicHITS:
+    """
+    Run HITS on the base sets of many root sets of one large directed graph.
+    """
+    def __init__(
+            self,
+            digraph: networkx.DiGraph,
+            max_inlinks: Optional[int]=50,
+            eps: float=1e-4,
+            maxstep: int=1000,
+            solver: Literal["power", "svd"]="power"
+    ):
+        """
+        Initialize the TopicHITS class.
+
+        Parameters
+        ----------
+        digraph : networkx.DiGraph
+            The directed graph. It is indexed once, and not referred to afterwards.
+        max_inlinks : int, optional
+            The maximum number of nodes pointing to a root node added to the base set,
+            as popular pages have too many of them. If None, all are added. Default is 50.
+        eps : float, optional
+            The convergence threshold. Default is 1e-4.
+        maxstep : int, optional
+            The maximum number of iterations to perform. Default is 1000.
+        solver : str, optional
+            Either "power" or "svd" (see :func:`graphflow.hits.hits`). Default is "power".
+        """
+        self.max_inlinks = max_inlinks
+        self.eps = eps
+        self.maxstep = maxstep
+        self.solver = solver
+
+        self.nodeindex = NodeIndex(digraph.nodes())
+        nbnodes = len(self.nodeindex)
+        nbedges = digraph.number_of_edges()
+        src = np.fromiter((self.nodeindex[node] for node, _ in digraph.edges()), dtype=np.int64, count=nbedges)
+        dst = np.fromiter((self.nodeindex[node] for _, node in digraph.edges()), dtype=np.int64, count=nbedges)
+        weights = np.fromiter((weight for _, _, weight in digraph.edges(data='weight', default=1.)),
+                              dtype=np.float64, count=nbedges)
+        # A[i, j] is the weight of the edge from node i to node j, as in networkx.adjacency_matrix,
+        # and its transpose gives the in-links
+        self.A = csr_array((weights, (src, dst)), shape=(nbnodes, nbnodes))
+        self.AT = csr_array((weights, (dst, src)), shape=(nbnodes, nbnodes))
+
+    def rootIndices(self, rootnodes: Iterable[Hashable]) -> Annotated[NDArray[np.int64], Literal["1D Array"]]:
+        """
+        Look up the indices of the nodes of a root set.
+
+        Parameters
+        ----------
+        rootnodes : Iterable
+            The node identifiers.
+
+        Returns
+        -------
+        numpy.ndarray
+            The indices of the nodes.
+
+        Raises
+        ------
+        ValueError
+            If a node is not in the graph.
+        """
+        rootnodes = list(rootnodes)
+        roots, found = self.nodeindex.indices(rootnodes)
+        if not np.all(found):
+            raise ValueError(f"Node {rootnodes[np.argmin(found)]} is not in the graph.")
+        return roots
+
+    def baseSet(self, roots: Annotated[NDArray[np.int64], Literal["1D Array"]]) -> Annotated[NDArray[np.int64], Literal["1D Array"]]:
+        """
+        Expand a root set into its base set: the root nodes, the nodes they point to,
+        and up to `max_inlinks` nodes pointing to each of them.
+
+        Parameters
+        ----------
+        roots : numpy.ndarray
+            The indices of the root nodes.
+
+        Returns
+        -------
+        numpy.ndarray
+            The sorted indices of the nodes of the base set.
+        """
+        return np.unique(np.concatenate([
+            roots,
+            GatherNeighbors(self.A.indptr, self.A.indices, roots),
+            GatherNeighbors(self.AT.indptr, self.AT.indices, roots, cap=self.max_inlinks)
+        ]))
+
+    def calculateHITS(self, rootnodes: Iterable[Hashable]) -> tuple[NodeScores, NodeScores]:
+        """
+        Compute the hub and authority scores of the base set of a root set.
+
+        Parameters
+        ----------
+        rootnodes : Iterable
+            The root set of the query.
+
+        Returns
+        -------
+        tuple
+            A tuple containing:
+            - hubs (NodeScores): The hub scores of the nodes of the base set.
+            - authorities (NodeScores): The authority scores of the nodes of the base set.
+
+        Raises
+        ------
+        ValueError
+            If a node is not in the graph.
+        """
+        base = self.baseSet(self.rootIndices(rootnodes))
+        # only the rows of the base set are copied, then restricted to its columns
+        subA = self.A[base][:, base]
+        nodeindex = NodeIndex(self.nodeindex.nodes[base].tolist())
+        if subA.nnz == 0:
+            return NodeScores(np.zeros(len(base)), nodeindex), NodeScores(np.zeros(len(base)), nodeindex)
+        hubvec, authvec = hits(subA, eps=self.eps, maxstep=self.maxstep, solver=self.solver)
+        return NodeScores(hubvec, nodeindex), NodeScores(authvec, nodeindex)
+
+    def calculateHITSBatch(
+            self,
+            rootsets: Iterable[Iterable[Hashable]],
+            max_workers: Optional[int]=None
+    ) -> list[tuple[NodeScores, NodeScores]]:
+        """
+        Compute the hub and authority scores for a batch of root sets, on a pool of threads.
+
+        The sparse matrix products release the GIL, so that the queries run concurrently.
+
+        Parameters
+        ----------
+        rootsets : Iterable
+            The root sets of the queries.
+        max_workers : int, optional
+            The number of threads. If None, the default of
+            :class:`concurrent.futures.ThreadPoolExecutor` is used. Default is None.
+
+        Returns
+        -------
+        list
+            The hub and authority scores of each query, in the order of `rootsets`.
+
+        Raises
+        ------
+        ValueError
+            If a node is not in the graph.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.calculateHITS, [list(rootnodes) for rootnodes in rootsets]))
@@ -1,13 +1,20 @@
 
 import warnings
-from typing import Annotated, Literal
+from typing import Annotated, Literal, Optional, Union
 
 import networkx
 import numpy as np
 from numpy.typing import NDArray
+from scipy.sparse import csr_array
 
-from .cpagerank import pagerank_cython
+from .kernels import RequireCompiledKernels
+from .solvers import TopKPowerIteration, SparsePowerIteration_Python
 from .. import L1norm, PageRankLanguage
+from ..results import NodeIndex, NodeScores
+
+
+# graphs with more nodes than this are never ranked with the dense Google Matrix by default
+SPARSE_NODES_THRESHOLD = 2000
 
 
 def GoogleMatrix(
@@ -35,20 +42,210 @@ def GoogleMatrix(
         - A (numpy.ndarray): The Google Matrix.
         - nodedict (dict): A dictionary mapping node identifiers to their indices.
     """
-    nodedict = {node: idx for idx, node in enumerate(digraph.nodes())}
-    A = (1 - beta) / float(len(digraph)) * np.ones(shape=(len(digraph), len(digraph)))
-    for node1, node2 in digraph.edges():
-        A[nodedict[node2], nodedict[node1]] += beta / float(len(list(digraph.successors(node1))))
+    src, dst, nodedict = EdgeIndexArrays(digraph)
+    A = GoogleMatrixFromEdgeArrays(src, dst, len(digraph), beta)
     return A, nodedict
 
 
+def EdgeIndexArrays(
+        digraph: networkx.DiGraph
+) -> tuple[Annotated[NDArray[np.int64], Literal["1D Array"]], Annotated[NDArray[np.int64], Literal["1D Array"]], dict[str, int]]:
+    """
+    Extract the edges of a directed graph as arrays of node indices.
+
+    The edge list is traversed only once.
+
+    Parameters
+    ----------
+    digraph : networkx.DiGraph
+        The directed graph.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - src (numpy.ndarray): The indices of the source nodes of the edges.
+        - dst (numpy.ndarray): The indices of the target nodes of the edges.
+        - nodedict (dict): A dictionary mapping node identifiers to their indices.
+    """
+    nodedict = {node: idx for idx, node in enumerate(digraph.nodes())}
+    nbedges = digraph.number_of_edges()
+    edgeidx = np.fromiter(
+        (nodedict[node] for edge in digraph.edges() for node in edge),
+        dtype=np.int64,
+        count=2*nbedges
+    ).reshape((nbedges, 2))
+    return edgeidx[:, 0], edgeidx[:, 1], nodedict
+
+
+def GoogleMatrixFromEdgeArrays(
+        src: Annotated[NDArray[np.int64], Literal["1D Array"]],
+        dst: Annotated[NDArray[np.int64], Literal["1D Array"]],
+        nbnodes: int,
+        beta: float
+) -> Annotated[NDArray[np.float64], Literal["2D Array"]]:
+    """
+    Compute the Google Matrix from arrays of edges.
+
+    The nodes are the integers 0, ..., `nbnodes`-1, and the i-th edge goes from
+    `src[i]` to `dst[i]`. Repeated edges are counted as many times as they appear.
+
+    Parameters
+    ----------
+    src : numpy.ndarray
+        The indices of the source nodes of the edges.
+    dst : numpy.ndarray
+        The indices of the target nodes of the edges.
+    nbnodes : int
+        The number of nodes.
+    beta : float
+        The damping factor (between 0 and 1). Typically set to 0.85.
+
+    Returns
+    -------
+    numpy.ndarray
+        The Google Matrix.
+    """
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    outdegree = np.bincount(src, minlength=nbnodes)
+    A = np.full((nbnodes, nbnodes), (1 - beta) / float(nbnodes))
+    np.add.at(A, (dst, src), beta / outdegree[src])
+    return A
+
+
+def TransitionMatrix(
+        digraph: networkx.DiGraph
+) -> tuple[csr_array, Annotated[NDArray[np.bool_], Literal["1D Array"]], dict[str, int]]:
+    """
+    Compute the sparse column-stochastic link matrix of a directed graph.
+
+    Unlike :func:`GoogleMatrix`, the teleportation term is not stored. Only the
+    links are kept, in CSR format, so that the memory scales with the number of
+    edges instead of the square of the number of nodes. The teleportation and
+    dangling-node terms are added back as rank-one corrections in
+    :func:`CalculatePageRankFromTransitionMatrix`.
+
+    Parameters
+    ----------
+    digraph : networkx.DiGraph
+        The directed graph for which to compute the transition matrix.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - P (scipy.sparse.csr_array): The link matrix, with P[j, i] = 1 / outdegree(i)
+          for every edge i -> j.
+        - dangling (numpy.ndarray): A boolean mask of the nodes without outgoing edges.
+        - nodedict (dict): A dictionary mapping node identifiers to their indices.
+    """
+    src, dst, nodedict = EdgeIndexArrays(digraph)
+    P, dangling = TransitionMatrixFromEdgeArrays(src, dst, len(digraph))
+    return P, dangling, nodedict
+
+
+def TransitionMatrixFromEdgeArrays(
+        src: Annotated[NDArray[np.int64], Literal["1D Array"]],
+        dst: Annotated[NDArray[np.int64], Literal["1D Array"]],
+        nbnodes: int
+) -> tuple[csr_array, Annotated[NDArray[np.bool_], Literal["1D Array"]]]:
+    """
+    Compute the sparse column-stochastic link matrix from arrays of edges.
+
+    The nodes are the integers 0, ..., `nbnodes`-1, and the i-th edge goes from
+    `src[i]` to `dst[i]`. Repeated edges are counted as many times as they appear.
+    This allows ranking crawl output without building a `networkx.DiGraph`.
+
+    Parameters
+    ----------
+    src : numpy.ndarray
+        The indices of the source nodes of the edges.
+    dst : numpy.ndarray
+        The indices of the target nodes of the edges.
+    nbnodes : int
+        The number of nodes.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - P (scipy.sparse.csr_array): The link matrix.
+        - dangling (numpy.ndarray): A boolean mask of the nodes without outgoing edges.
+    """
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    outdegree = np.bincount(src, minlength=nbnodes)
+    P = csr_array((1. / outdegree[src], (dst, src)), shape=(nbnodes, nbnodes))
+    return P, outdegree == 0
+
+
+def CalculatePageRankFromTransitionMatrix(
+        P: csr_array,
+        dangling: Annotated[NDArray[np.bool_], Literal["1D Array"]],
+        nodes: dict[str, int],
+        beta: float,
+        eps: float=1e-4,
+        maxstep: int=1000,
+        redistribute_dangling: bool=False,
+        language: PageRankLanguage=PageRankLanguage.CYTHON
+) -> dict[str, float]:
+    """
+    Calculate PageRank from a sparse link matrix.
+
+    Each iteration computes r' = beta * P r + (1 - beta) / n * sum(r), which is the same
+    as multiplying by the dense Google Matrix from :func:`GoogleMatrix`, without ever
+    forming it.
+
+    Parameters
+    ----------
+    P : scipy.sparse.csr_array
+        The link matrix returned by :func:`TransitionMatrix`.
+    dangling : numpy.ndarray
+        A boolean mask of the nodes without outgoing edges.
+    nodes : dict
+        A dictionary mapping node identifiers to their indices.
+    beta : float
+        The damping factor (between 0 and 1). Typically set to 0.85.
+    eps : float, optional
+        The convergence threshold. The algorithm stops when the change in vectors
+        is less than this value. Default is 1e-4.
+    maxstep : int, optional
+        The maximum number of iterations to perform. Default is 1000.
+    redistribute_dangling : bool, optional
+        If True, the rank held by dangling nodes is spread uniformly over all nodes,
+        as if they linked to every node. If False, it is dropped, as in
+        :func:`GoogleMatrix`. Default is False.
+    language : PageRankLanguage, optional
+        The implementation language to use. PageRankLanguage.CYTHON needs the compiled
+        extension, and raises ImportError if it is not built. Default is PageRankLanguage.CYTHON.
+
+    Returns
+    -------
+    dict
+        A dictionary mapping node identifiers to their PageRank scores.
+    """
+    if language == PageRankLanguage.CYTHON:
+        r, _ = RequireCompiledKernels().pagerank_csr(
+            P.indptr, P.indices, np.asarray(P.data, dtype=np.float64),
+            np.asarray(dangling, dtype=np.uint8),
+            beta, eps, maxstep, redistribute_dangling
+        )
+    else:
+        r, _ = SparsePowerIteration_Python(
+            P, dangling, beta, eps=eps, maxstep=maxstep, redistribute_dangling=redistribute_dangling
+        )
+    nodepr = {node: r[nodes[node]] for node in nodes}
+    return nodepr
+
+
 def CalculatePageRankFromAdjacencyMatrix_Cython(
         adjMatrix: Annotated[NDArray[np.float64], Literal["2D Array"]],
         nodes: dict[str, int],
         eps: float=1e-4,
         maxstep: int=1000
 ):
-    return pagerank_cython(adjMatrix, nodes, eps, maxstep)
+    return RequireCompiledKernels().pagerank_cython(np.ascontiguousarray(adjMatrix, dtype=np.float64), nodes, eps, maxstep)
 
 
 def CalculatePageRankFromAdjacencyMatrix_Python(
@@ -81,8 +278,30 @@ def CalculatePageRankFromAdjacencyMatrix_Python(
     dict
         A dictionary mapping node identifiers to their PageRank scores.
     """
+    r, _ = PowerIteration_Python(adjMatrix, eps=eps, maxstep=maxstep)
+    nodepr = {node: r[nodes[node]] for node in nodes}
+    return nodepr
+
+
+def PowerIteration_Python(
+        adjMatrix: Annotated[NDArray[np.float64], Literal["2D Array"]],
+        eps: float=1e-4,
+        maxstep: int=1000
+) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], int]:
+    """
+    Run the power iteration on a dense (Google) matrix, in Python.
+
+    See :func:`CalculatePageRankFromAdjacencyMatrix_Python` for the parameters.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - r (numpy.ndarray): The PageRank vector.
+        - nbmatvecs (int): The number of matrix-vector products performed.
+    """
     nbnodes = adjMatrix.shape[0]
-    r = np.transpose([np.repeat(1 / float(nbnodes), nbnodes)])
+    r = np.repeat(1 / float(nbnodes), nbnodes)
     converged = False
     stepid = 0
     while not converged and stepid < maxstep:
@@ -90,8 +309,7 @@ def CalculatePageRankFromAdjacencyMatrix_Python(
         converged = (L1norm(newr, r) < eps)
         r = newr
         stepid += 1
-    nodepr = {node: r[nodes[node], 0] for node in nodes}
-    return nodepr
+    return r, stepid
 
 
 def CalculatePageRankFromAdjacencyMatrix(
@@ -120,7 +338,8 @@ def CalculatePageRankFromAdjacencyMatrix(
     maxstep : int, optional
         The maximum number of iterations to perform. Default is 1000.
     language : PageRankLanguage, optional
-        The implementation language to use. Default is PageRankLanguage.CYTHON.
+        The implementation language to use. PageRankLanguage.CYTHON needs the compiled
+        extension, and raises ImportError if it is not built. Default is PageRankLanguage.CYTHON.
     
     Returns
     -------
@@ -138,14 +357,23 @@ def CalculatePageRank(
         digraph: networkx.DiGraph,
         beta: float,
         eps: float=1e-4,
-        maxstep: int=1000
-) -> dict[str, float]:
+        maxstep: int=1000,
+        engine: str="auto",
+        redistribute_dangling: bool=False,
+        solver: str="power",
+        return_matvecs: bool=False,
+        as_result: bool=False,
+        top_k: Optional[int]=None
+) -> Union[dict[str, float], NodeScores, tuple[Union[dict[str, float], NodeScores], int]]:
     """
     Calculate PageRank for a directed graph.
     
     This function computes the PageRank scores for nodes in a directed graph.
-    It first computes the Google Matrix and then calculates the PageRank using
-    the specified parameters.
+    The computation is delegated to a PageRank engine (see :mod:`graphflow.pagerank.engines`).
+    By default, the engine is chosen according to the numbers of nodes and edges: small
+    and dense graphs are ranked with the dense Google Matrix, and the others with the
+    sparse link matrix (see :func:`TransitionMatrix`), so that the memory scales with
+    the number of edges.
     
     Parameters
     ----------
@@ -158,12 +386,82 @@ def CalculatePageRank(
         is less than this value. Default is 1e-4.
     maxstep : int, optional
         The maximum number of iterations to perform. Default is 1000.
+    engine : str, optional
+        The name of a registered PageRank engine, such as "dense", "cython" or "sparse",
+        or "auto" to choose one automatically. Default is "auto".
+    redistribute_dangling : bool, optional
+        If True, the rank held by dangling nodes is spread uniformly over all nodes.
+        Only supported by the engines working on the sparse link matrix. Default is False.
+    solver : str, optional
+        The solver, one of "power", "gauss-seidel", "extrapolation", "gmres" and "bicgstab"
+        (see :mod:`graphflow.pagerank.solvers`). The solvers other than "power" spread the
+        rank held by dangling nodes over all nodes, and need fewer iterations when `beta`
+        is close to 1. Default is "power".
+    return_matvecs : bool, optional
+        If True, the number of matrix-vector products performed is returned as well.
+        Default is False.
+    as_result : bool, optional
+        If True, the scores are returned as a :class:`graphflow.results.NodeScores`,
+        which keeps them in an array instead of building a dictionary. Default is False.
+    top_k : int, optional
+        If given, only the `top_k` nodes of highest PageRank are computed, with the power
+        iteration stopping as soon as their ranking is settled if `redistribute_dangling`
+        is True (see :func:`graphflow.pagerank.solvers.TopKPowerIteration`), and once it
+        converges otherwise. They are returned as a
+        NodeScores, in decreasing order of scores. This mode runs on the sparse link matrix,
+        whatever `engine` is, and only with the "power" solver. Default is None.
 
     Returns
     -------
-    dict
-        A dictionary mapping node identifiers to their PageRank scores.
+    dict, NodeScores or tuple
+        A dictionary mapping node identifiers to their PageRank scores (or a NodeScores
+        if `as_result` is True or `top_k` is given), and if `return_matvecs` is True,
+        the number of matrix-vector products performed.
+
+    Raises
+    ------
+    ValueError
+        If the engine is unknown or cannot handle the graph, or if `top_k` is given with
+        another solver than "power".
     """
-    A, nodes = GoogleMatrix(digraph, beta)
-    return CalculatePageRankFromAdjacencyMatrix(A, nodes, eps=eps, maxstep=maxstep)
+    from .engines import get_engine, select_engine
+
+    src, dst, nodes = EdgeIndexArrays(digraph)
+    if top_k is not None:
+        if solver != "power":
+            raise ValueError(f"Top-k PageRank is not supported by the solver {solver}.")
+        P, dangling = TransitionMatrixFromEdgeArrays(src, dst, len(nodes))
+        indices, scores, nbmatvecs = TopKPowerIteration(
+            P, dangling, beta, top_k,
+            eps=eps, maxstep=maxstep, redistribute_dangling=redistribute_dangling
+        )
+        nodelist = list(nodes)
+        topscores = NodeScores(scores, NodeIndex([nodelist[idx] for idx in indices]), nbmatvecs=nbmatvecs)
+        if return_matvecs:
+            return topscores, nbmatvecs
+        return topscores
 
+    has_dangling = bool(np.any(np.bincount(src, minlength=len(nodes)) == 0))
+    if engine == "auto":
+        pagerank_engine = select_engine(
+            len(nodes), len(src), redistribute_dangling=redistribute_dangling, solver=solver,
+            has_dangling=has_dangling
+        )
+    else:
+        pagerank_engine = get_engine(engine)
+        if not pagerank_engine.can_handle(
+                len(nodes), len(src), redistribute_dangling=redistribute_dangling, solver=solver,
+                has_dangling=has_dangling
+        ):
+            raise ValueError(f"PageRank engine {engine} cannot handle this graph with solver {solver}.")
+    r, nbmatvecs = pagerank_engine.compute(
+        src, dst, len(nodes), beta,
+        eps=eps, maxstep=maxstep, redistribute_dangling=redistribute_dangling, solver=solver
+    )
+    if as_result:
+        nodepr = NodeScores(r, NodeIndex(nodes), nbmatvecs=nbmatvecs)
+    else:
+        nodepr = {node: r[nodes[node]] for node in nodes}
+    if return_matvecs:
+        return nodepr, nbmatvecs
+    return nodepr
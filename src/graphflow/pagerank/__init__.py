@@ -1,2 +1,8 @@
+
 from .GooglePageRank import GoogleMatrix, CalculatePageRankFromAdjacencyMatrix_Cython, \
-    CalculatePageRankFromAdjacencyMatrix_Python, CalculatePageRankFromAdjacencyMatrix, CalculatePageRank
+    CalculatePageRankFromAdjacencyMatrix_Python, CalculatePageRankFromAdjacencyMatrix, CalculatePageRank, \
+    TransitionMatrix, CalculatePageRankFromTransitionMatrix, EdgeIndexArrays, GoogleMatrixFromEdgeArrays, \
+    TransitionMatrixFromEdgeArrays, PowerIteration_Python, SparsePowerIteration_Python
+from .engines import PageRankEngine, register_engine, get_engine, select_engine
+from .incremental import IncrementalPageRank
+from .personalized import TeleportMatrix, PersonalizedPageRankFromTransitionMatrix, CalculatePersonalizedPageRank
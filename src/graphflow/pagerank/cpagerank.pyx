@@ -1,22 +1,278 @@
+# cython: boundscheck=False, wraparound=False, cdivision=True
 
-from cpython cimport bool
+from cython.parallel cimport prange
+from libc.math cimport fabs
+from scipy.linalg.cython_blas cimport dgemv
 import numpy as np
 cimport numpy as np
 
 
-def pagerank_cython(np.ndarray adjMatrix, dict nodes, float eps, int maxstep):
+ctypedef fused index_t:
+    np.int32_t
+    np.int64_t
+
+
+def pagerank_cython(double[:, ::1] adjMatrix, dict nodes, double eps, int maxstep):
+    r, _ = pagerank_dense(adjMatrix, eps, maxstep)
+    cdef dict nodepr = {node: r[nodes[node]] for node in nodes}
+    return nodepr
+
+
+cpdef tuple pagerank_dense(double[:, ::1] adjMatrix, double eps, int maxstep):
+    """
+    Power iteration on a dense (Google) matrix.
+
+    The matrix-vector product is done by BLAS (dgemv) without the GIL, over two
+    preallocated buffers that are swapped after each step, and the L1 change is
+    reduced in parallel with OpenMP.
+
+    Every step is a single dgemv, as with NumPy, so the gain is only the interpreter
+    overhead of each step: it is a few times faster on graphs of tens of nodes, but
+    on the same footing from a few thousand nodes on, where the product dominates.
+
+    Returns the PageRank vector and the number of matrix-vector products.
+    """
     cdef int nbnodes = adjMatrix.shape[0]
-    cdef np.ndarray r = np.transpose([np.repeat(1 / float(nbnodes), nbnodes)])
-    cdef np.ndarray newr = np.transpose([np.repeat(1 / float(nbnodes), nbnodes)])
-    cdef bool converged = False
+    if nbnodes == 0:
+        return (np.empty(0), 0)
+    cdef double[::1] buf0 = np.full(nbnodes, 1. / nbnodes)
+    cdef double[::1] buf1 = np.empty(nbnodes)
+    cdef double *r = &buf0[0]
+    cdef double *newr = &buf1[0]
+    cdef double *tmp
+    cdef double residual = eps
+    cdef double one = 1.
+    cdef double zero = 0.
+    cdef int inc = 1
+    cdef char trans = b'T'
+    cdef Py_ssize_t i
+    cdef int stepid = 0
+
+    with nogil:
+        while residual >= eps and stepid < maxstep:
+            # the matrix is row-major, i.e., its transpose in column-major order
+            dgemv(&trans, &nbnodes, &nbnodes, &one, &adjMatrix[0, 0], &nbnodes, r, &inc, &zero, newr, &inc)
+            residual = 0.
+            for i in prange(nbnodes, schedule='static'):
+                residual += fabs(newr[i] - r[i])
+            tmp = r
+            r = newr
+            newr = tmp
+            stepid += 1
+
+    return (np.asarray(buf0 if r == &buf0[0] else buf1), stepid)
+
+
+cpdef tuple pagerank_csr(
+        const index_t[::1] indptr,
+        const index_t[::1] indices,
+        const double[::1] data,
+        const unsigned char[::1] dangling,
+        double beta,
+        double eps,
+        int maxstep,
+        bint redistribute_dangling,
+        const double[::1] initial=None
+):
+    """
+    Power iteration on a sparse link matrix in CSR format.
+
+    Each step computes r' = beta * P r + mass / n, where the teleportation mass,
+    and the dangling-node mass if requested, is added as a rank-one correction.
+    The sparse product and the L1 change are fused in one loop over the rows,
+    which are shared among threads with OpenMP. The iteration starts from `initial`
+    if given, and from the uniform vector otherwise.
+
+    Returns the PageRank vector and the number of matrix-vector products.
+    """
+    cdef Py_ssize_t nbnodes = indptr.shape[0] - 1
+    if nbnodes == 0:
+        return (np.empty(0), 0)
+    cdef double[::1] buf0 = np.full(nbnodes, 1. / nbnodes) if initial is None else np.array(initial)
+    cdef double[::1] buf1 = np.empty(nbnodes)
+    cdef double *r = &buf0[0]
+    cdef double *newr = &buf1[0]
+    cdef double *tmp
+    cdef double residual = eps
+    cdef double mass, acc
+    cdef Py_ssize_t i, k
+    cdef int stepid = 0
+
+    with nogil:
+        while residual >= eps and stepid < maxstep:
+            mass = 0.
+            for i in range(nbnodes):
+                mass = mass + (1 - beta) * r[i]
+                if redistribute_dangling and dangling[i]:
+                    mass = mass + beta * r[i]
+            mass = mass / nbnodes
+
+            residual = 0.
+            for i in prange(nbnodes, schedule='static'):
+                acc = 0.
+                for k in range(indptr[i], indptr[i+1]):
+                    acc = acc + data[k] * r[indices[k]]
+                acc = beta * acc + mass
+                newr[i] = acc
+                residual += fabs(acc - r[i])
+            tmp = r
+            r = newr
+            newr = tmp
+            stepid += 1
+
+    return (np.asarray(buf0 if r == &buf0[0] else buf1), stepid)
+
+
+cpdef tuple pagerank_gauss_seidel(
+        const index_t[::1] indptr,
+        const index_t[::1] indices,
+        const double[::1] data,
+        double beta,
+        double eps,
+        int maxstep,
+        const double[::1] initial=None
+):
+    """
+    Gauss-Seidel sweeps on the linear system (I - beta * P) y = v, with a uniform
+    teleportation vector v, on a sparse link matrix in CSR format.
+
+    Every updated component is used immediately in the same sweep, which usually
+    converges in far fewer sweeps than the power iteration. The sweeps are
+    inherently sequential, but they run without the GIL. The sweeps start from
+    `initial` (an estimate of y) if given, and from the uniform vector otherwise.
+
+    Returns the PageRank vector, i.e., y normalized to unit sum, and the number
+    of sweeps, each costing about one matrix-vector product.
+    """
+    cdef Py_ssize_t nbnodes = indptr.shape[0] - 1
+    if nbnodes == 0:
+        return (np.empty(0), 0)
+    cdef double[::1] y = np.full(nbnodes, 1. / nbnodes) if initial is None else np.array(initial)
+    cdef double teleport = 1. / nbnodes
+    cdef double residual = eps
+    cdef double acc, diag, newy, total
+    cdef Py_ssize_t i, j, k
+    cdef int stepid = 0
+
+    with nogil:
+        while residual >= eps and stepid < maxstep:
+            residual = 0.
+            total = 0.
+            for i in range(nbnodes):
+                acc = 0.
+                diag = 0.
+                for k in range(indptr[i], indptr[i+1]):
+                    j = indices[k]
+                    if j == i:
+                        diag = diag + data[k]
+                    else:
+                        acc = acc + data[k] * y[j]
+                newy = (teleport + beta * acc) / (1 - beta * diag)
+                residual = residual + fabs(newy - y[i])
+                total = total + newy
+                y[i] = newy
+            # change relative to the norm, as the PageRank vector is y normalized
+            residual = residual / total
+            stepid += 1
+
+        total = 0.
+        for i in range(nbnodes):
+            total = total + y[i]
+        for i in range(nbnodes):
+            y[i] = y[i] / total
+
+    return (np.asarray(y), stepid)
+
+
+cpdef tuple personalized_pagerank_csr(
+        const index_t[::1] indptr,
+        const index_t[::1] indices,
+        const double[::1] data,
+        const unsigned char[::1] dangling,
+        const double[:, ::1] teleport,
+        double beta,
+        double eps,
+        int maxstep,
+        bint redistribute_dangling
+):
+    """
+    Power iteration on a block of k vectors, one per teleportation distribution,
+    on a sparse link matrix in CSR format.
+
+    Each step computes R' = beta * P R + V diag(mass) in a single pass over the
+    rows, reading every stored entry of the link matrix once for all the k
+    columns. The rows are split into chunks shared among threads with OpenMP,
+    and each chunk accumulates its own column sums and L1 changes.
+
+    Returns the n x k block of PageRank vectors and the number of iterations.
+    """
+    cdef Py_ssize_t nbnodes = teleport.shape[0]
+    cdef Py_ssize_t nbcols = teleport.shape[1]
+    if nbnodes == 0:
+        return (np.empty((0, nbcols)), 0)
+    cdef Py_ssize_t nbchunks = min(nbnodes, 256)
+    cdef Py_ssize_t chunksize = (nbnodes + nbchunks - 1) // nbchunks
+    cdef double[:, ::1] buf0 = np.array(teleport)
+    cdef double[:, ::1] buf1 = np.empty((nbnodes, nbcols))
+    cdef double[::1] mass = np.empty(nbcols)
+    cdef double[:, ::1] chunkresidual = np.zeros((nbchunks, nbcols))
+    cdef double[:, ::1] chunktotal = np.zeros((nbchunks, nbcols))
+    cdef double[:, ::1] chunkdangling = np.zeros((nbchunks, nbcols))
+    cdef double *R = &buf0[0, 0]
+    cdef double *newR = &buf1[0, 0]
+    cdef double *tmp
+    cdef double residual = eps
+    cdef double weight, value, colresidual
+    cdef Py_ssize_t chunk, i, k, c, j
     cdef int stepid = 0
 
-    while not converged and stepid < maxstep:
-        newr = np.matmul(adjMatrix, r)
-        converged = bool(np.sum(np.abs(newr - r)) < eps)
-        r = newr
-        stepid += 1
+    with nogil:
+        for c in range(nbcols):
+            mass[c] = 0.
+        for i in range(nbnodes):
+            for c in range(nbcols):
+                mass[c] = mass[c] + (1 - beta) * R[i*nbcols + c]
+                if redistribute_dangling and dangling[i]:
+                    mass[c] = mass[c] + beta * R[i*nbcols + c]
+
+        while residual >= eps and stepid < maxstep:
+            for chunk in prange(nbchunks, schedule='dynamic'):
+                for c in range(nbcols):
+                    chunkresidual[chunk, c] = 0.
+                    chunktotal[chunk, c] = 0.
+                    chunkdangling[chunk, c] = 0.
+                for i in range(chunk * chunksize, min((chunk + 1) * chunksize, nbnodes)):
+                    for c in range(nbcols):
+                        newR[i*nbcols + c] = 0.
+                    for k in range(indptr[i], indptr[i+1]):
+                        j = indices[k]
+                        weight = beta * data[k]
+                        for c in range(nbcols):
+                            newR[i*nbcols + c] = newR[i*nbcols + c] + weight * R[j*nbcols + c]
+                    for c in range(nbcols):
+                        value = newR[i*nbcols + c] + teleport[i, c] * mass[c]
+                        newR[i*nbcols + c] = value
+                        chunkresidual[chunk, c] = chunkresidual[chunk, c] + fabs(value - R[i*nbcols + c])
+                        chunktotal[chunk, c] = chunktotal[chunk, c] + value
+                        if dangling[i]:
+                            chunkdangling[chunk, c] = chunkdangling[chunk, c] + value
+
+            # every column must have converged
+            residual = 0.
+            for c in range(nbcols):
+                colresidual = 0.
+                mass[c] = 0.
+                for chunk in range(nbchunks):
+                    colresidual = colresidual + chunkresidual[chunk, c]
+                    mass[c] = mass[c] + (1 - beta) * chunktotal[chunk, c]
+                    if redistribute_dangling:
+                        mass[c] = mass[c] + beta * chunkdangling[chunk, c]
+                if colresidual > residual:
+                    residual = colresidual
 
-    cdef dict nodepr = {node: r[nodes[node], 0] for node in nodes}
+            tmp = R
+            R = newR
+            newR = tmp
+            stepid += 1
 
-    return nodepr
\ No newline at end of file
+    return (np.asarray(buf0 if R == &buf0[0, 0] else buf1), stepid)
@@ -0,0 +1,306 @@
+
+'''
+Registry of PageRank engines.
+
+An engine computes the PageRank vector of a graph given as arrays of edges. Each
+engine declares which graphs it can handle and an estimated cost, so that
+:func:`select_engine` can choose one automatically. Other implementations can be
+plugged in with :func:`register_engine`.
+'''
+
+from abc import ABC, abstractmethod
+from typing import Annotated, Literal
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .GooglePageRank import GoogleMatrixFromEdgeArrays, TransitionMatrixFromEdgeArrays, \
+    PowerIteration_Python, SPARSE_NODES_THRESHOLD
+from .kernels import CompiledKernels
+from .solvers import SolvePageRank, PAGERANK_SOLVERS, LEAKING_DANGLING_SOLVERS
+
+
+class PageRankEngine(ABC):
+    """
+    Abstract base class of PageRank engines.
+
+    Subclasses set `name`, and implement :meth:`cost` and :meth:`compute`. They may
+    override :meth:`is_available` and :meth:`can_handle`.
+    """
+    name = None
+    # whether the engine can spread the rank of dangling nodes over all nodes
+    redistributes_dangling = False
+    # the solvers (see graphflow.pagerank.solvers) supported by the engine
+    solvers = ("power",)
+
+    def is_available(self) -> bool:
+        """
+        Return whether the engine can run in this environment, e.g., if the compiled
+        extension or the hardware it relies on is present.
+        """
+        return True
+
+    def can_handle(
+            self,
+            nbnodes: int,
+            nbedges: int,
+            redistribute_dangling: bool=False,
+            solver: str="power",
+            has_dangling: bool=True
+    ) -> bool:
+        """
+        Return whether the engine can rank a graph of the given size with the given solver.
+
+        Parameters
+        ----------
+        nbnodes : int
+            The number of nodes.
+        nbedges : int
+            The number of edges.
+        redistribute_dangling : bool, optional
+            Whether the rank held by dangling nodes is to be spread over all nodes.
+            Default is False.
+        solver : str, optional
+            The solver. Default is "power".
+        has_dangling : bool, optional
+            Whether the graph has nodes without outgoing edges. Default is True.
+
+        Returns
+        -------
+        bool
+            True if the engine can rank the graph.
+        """
+        # only some solvers can leave the rank of dangling nodes out
+        leaks_dangling = redistribute_dangling or not has_dangling or solver in LEAKING_DANGLING_SOLVERS
+        return (self.redistributes_dangling or not redistribute_dangling) and solver in self.solvers and leaks_dangling
+
+    @abstractmethod
+    def cost(self, nbnodes: int, nbedges: int) -> float:
+        """
+        Estimate the relative cost of one iteration on a graph of the given size.
+
+        Parameters
+        ----------
+        nbnodes : int
+            The number of nodes.
+        nbedges : int
+            The number of edges.
+
+        Returns
+        -------
+        float
+            The estimated cost. Among the engines able to handle a graph, the one with
+            the lowest cost is chosen by :func:`select_engine`.
+        """
+
+    @abstractmethod
+    def compute(
+            self,
+            src: Annotated[NDArray[np.int64], Literal["1D Array"]],
+            dst: Annotated[NDArray[np.int64], Literal["1D Array"]],
+            nbnodes: int,
+            beta: float,
+            eps: float=1e-4,
+            maxstep: int=1000,
+            redistribute_dangling: bool=False,
+            solver: str="power"
+    ) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], int]:
+        """
+        Compute the PageRank vector.
+
+        Parameters
+        ----------
+        src : numpy.ndarray
+            The indices of the source nodes of the edges.
+        dst : numpy.ndarray
+            The indices of the target nodes of the edges.
+        nbnodes : int
+            The number of nodes.
+        beta : float
+            The damping factor (between 0 and 1). Typically set to 0.85.
+        eps : float, optional
+            The convergence threshold. Default is 1e-4.
+        maxstep : int, optional
+            The maximum number of iterations to perform. Default is 1000.
+        redistribute_dangling : bool, optional
+            If True, the rank held by dangling nodes is spread uniformly over all nodes.
+            Default is False.
+        solver : str, optional
+            The solver. Default is "power".
+
+        Returns
+        -------
+        tuple
+            A tuple containing:
+            - r (numpy.ndarray): The PageRank vector.
+            - nbmatvecs (int): The number of matrix-vector products performed.
+        """
+
+
+class DenseNumpyEngine(PageRankEngine):
+    """
+    Power iteration on the dense Google Matrix with NumPy.
+    """
+    name = "dense"
+
+    def can_handle(
+            self,
+            nbnodes: int,
+            nbedges: int,
+            redistribute_dangling: bool=False,
+            solver: str="power",
+            has_dangling: bool=True
+    ) -> bool:
+        return super().can_handle(nbnodes, nbedges, redistribute_dangling, solver, has_dangling) \
+            and nbnodes <= SPARSE_NODES_THRESHOLD
+
+    def cost(self, nbnodes: int, nbedges: int) -> float:
+        # same arithmetic as the Cython engine, with the interpreter overhead on top
+        return 2. * nbnodes * nbnodes
+
+    def compute(self, src, dst, nbnodes, beta, eps=1e-4, maxstep=1000, redistribute_dangling=False, solver="power"):
+        A = GoogleMatrixFromEdgeArrays(src, dst, nbnodes, beta)
+        return PowerIteration_Python(A, eps=eps, maxstep=maxstep)
+
+
+class DenseCythonEngine(DenseNumpyEngine):
+    """
+    Power iteration on the dense Google Matrix with the compiled kernel.
+    """
+    name = "cython"
+
+    def is_available(self) -> bool:
+        return CompiledKernels() is not None
+
+    def cost(self, nbnodes: int, nbedges: int) -> float:
+        return float(nbnodes * nbnodes)
+
+    def compute(self, src, dst, nbnodes, beta, eps=1e-4, maxstep=1000, redistribute_dangling=False, solver="power"):
+        A = GoogleMatrixFromEdgeArrays(src, dst, nbnodes, beta)
+        return CompiledKernels().pagerank_dense(A, eps, maxstep)
+
+
+class SparseEngine(PageRankEngine):
+    """
+    PageRank on the sparse link matrix, with any of the solvers in
+    :mod:`graphflow.pagerank.solvers`. The power iteration and the Gauss-Seidel sweeps
+    run with the compiled kernels, or in Python if the extension is not built, so the
+    engine is always available.
+    """
+    name = "sparse"
+    redistributes_dangling = True
+    solvers = tuple(PAGERANK_SOLVERS)
+
+    def cost(self, nbnodes: int, nbedges: int) -> float:
+        # indirect addressing makes a stored entry a few times as costly as a dense one
+        return 3. * nbedges + nbnodes
+
+    def compute(self, src, dst, nbnodes, beta, eps=1e-4, maxstep=1000, redistribute_dangling=False, solver="power"):
+        P, dangling = TransitionMatrixFromEdgeArrays(src, dst, nbnodes)
+        return SolvePageRank(
+            P, dangling, beta,
+            eps=eps, maxstep=maxstep, solver=solver, redistribute_dangling=redistribute_dangling
+        )
+
+
+PAGERANK_ENGINES: dict[str, PageRankEngine] = {}
+
+
+def register_engine(engine: PageRankEngine, overwrite: bool=False) -> None:
+    """
+    Register a PageRank engine, so that it can be used by
+    :func:`graphflow.pagerank.CalculatePageRank`.
+
+    Parameters
+    ----------
+    engine : PageRankEngine
+        The engine to register, under `engine.name`.
+    overwrite : bool, optional
+        Whether to replace an engine registered under the same name. Default is False.
+
+    Raises
+    ------
+    ValueError
+        If an engine with the same name is already registered and `overwrite` is False.
+    """
+    if engine.name in PAGERANK_ENGINES and not overwrite:
+        raise ValueError(f"PageRank engine {engine.name} is already registered.")
+    PAGERANK_ENGINES[engine.name] = engine
+
+
+def get_engine(name: str) -> PageRankEngine:
+    """
+    Get a registered PageRank engine by name.
+
+    Parameters
+    ----------
+    name : str
+        The name of the engine.
+
+    Returns
+    -------
+    PageRankEngine
+        The engine.
+
+    Raises
+    ------
+    ValueError
+        If no engine is registered under this name, or if it is not available.
+    """
+    if name not in PAGERANK_ENGINES:
+        raise ValueError(f"Unknown PageRank engine: {name}")
+    engine = PAGERANK_ENGINES[name]
+    if not engine.is_available():
+        raise ValueError(f"PageRank engine {name} is not available.")
+    return engine
+
+
+def select_engine(
+        nbnodes: int,
+        nbedges: int,
+        redistribute_dangling: bool=False,
+        solver: str="power",
+        has_dangling: bool=True
+) -> PageRankEngine:
+    """
+    Choose the cheapest available PageRank engine able to handle a graph.
+
+    Parameters
+    ----------
+    nbnodes : int
+        The number of nodes.
+    nbedges : int
+        The number of edges.
+    redistribute_dangling : bool, optional
+        Whether the rank held by dangling nodes is to be spread over all nodes.
+        Default is False.
+    solver : str, optional
+        The solver. Default is "power".
+    has_dangling : bool, optional
+        Whether the graph has nodes without outgoing edges. Default is True.
+
+    Returns
+    -------
+    PageRankEngine
+        The chosen engine.
+
+    Raises
+    ------
+    ValueError
+        If no registered engine can handle the graph.
+    """
+    candidates = [
+        engine for engine in PAGERANK_ENGINES.values()
+        if engine.is_available() and engine.can_handle(
+            nbnodes, nbedges, redistribute_dangling=redistribute_dangling, solver=solver,
+            has_dangling=has_dangling
+        )
+    ]
+    if len(candidates) == 0:
+        raise ValueError("No PageRank engine can handle this graph.")
+    return min(candidates, key=lambda engine: engine.cost(nbnodes, nbedges))
+
+
+register_engine(DenseNumpyEngine())
+register_engine(DenseCythonEngine())
+register_engine(SparseEngine())
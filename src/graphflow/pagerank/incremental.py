@@ -0,0 +1,199 @@
+
+'''
+PageRank of a graph under small edits.
+
+After a few edges are inserted or deleted, the PageRank vector moves only a
+little, so that restarting the iteration from the previous vector converges in
+a handful of steps instead of a full solve.
+'''
+
+import warnings
+from typing import Iterable, Optional
+
+import networkx
+import numpy as np
+from scipy.sparse import csr_array, SparseEfficiencyWarning
+
+from .GooglePageRank import EdgeIndexArrays
+from .solvers import SolvePageRank
+
+
+class IncrementalPageRank:
+    """
+    Maintain the PageRank of a directed graph under edge insertions and deletions.
+
+    The sparse link matrix is built once from the graph. Edge edits are applied to it
+    directly, without going through `networkx` or :func:`graphflow.pagerank.GoogleMatrix`
+    again, and every new computation is warm-started from the previous scores.
+    """
+    def __init__(
+            self,
+            digraph: networkx.DiGraph,
+            beta: float,
+            eps: float=1e-4,
+            maxstep: int=1000,
+            solver: str="power",
+            redistribute_dangling: bool=True
+    ):
+        """
+        Initialize the IncrementalPageRank class.
+
+        Parameters
+        ----------
+        digraph : networkx.DiGraph
+            The directed graph. It is not modified, nor referred to afterwards.
+        beta : float
+            The damping factor (between 0 and 1). Typically set to 0.85.
+        eps : float, optional
+            The convergence threshold. Default is 1e-4.
+        maxstep : int, optional
+            The maximum number of iterations to perform. Default is 1000.
+        solver : str, optional
+            The solver (see :mod:`graphflow.pagerank.solvers`). Default is "power".
+        redistribute_dangling : bool, optional
+            If True, the rank held by dangling nodes is spread uniformly over all nodes,
+            and the scores sum to 1. If False, the rank held by dangling nodes leaks at
+            every iteration, and the scores decay towards 0, as in
+            :func:`graphflow.pagerank.CalculatePageRank`. Default is True.
+        """
+        self.beta = beta
+        self.eps = eps
+        self.maxstep = maxstep
+        self.solver = solver
+        self.redistribute_dangling = redistribute_dangling
+
+        src, dst, self.nodes = EdgeIndexArrays(digraph)
+        self.nodelist = list(self.nodes)
+        nbnodes = len(self.nodelist)
+        # number of edges from node j to node i, stored at [i, j]
+        self.linkcounts = csr_array((np.ones(len(src)), (dst, src)), shape=(nbnodes, nbnodes))
+        self.outdegree = np.bincount(src, minlength=nbnodes).astype(np.float64)
+        self.P = None
+        self.updateTransitionMatrix()
+
+        self.scores = None
+        self.nbmatvecs = 0
+
+    def updateTransitionMatrix(self) -> None:
+        """
+        Rescale the link counts by the out-degrees into the column-stochastic link matrix.
+        """
+        with np.errstate(divide='ignore'):
+            data = self.linkcounts.data / self.outdegree[self.linkcounts.indices]
+        self.P = csr_array((data, self.linkcounts.indices, self.linkcounts.indptr), shape=self.linkcounts.shape)
+
+    def addNodes(self, nodes: Iterable[str]) -> None:
+        """
+        Add nodes without edges. Nodes already in the graph are ignored.
+
+        The new nodes start with the average score, and the scores are renormalized to unit sum.
+
+        Parameters
+        ----------
+        nodes : Iterable[str]
+            The node identifiers.
+        """
+        newnodes = [node for node in dict.fromkeys(nodes) if node not in self.nodes]
+        if len(newnodes) == 0:
+            return
+        for node in newnodes:
+            self.nodes[node] = len(self.nodelist)
+            self.nodelist.append(node)
+        nbnodes = len(self.nodelist)
+        self.linkcounts.resize((nbnodes, nbnodes))
+        self.outdegree = np.concatenate([self.outdegree, np.zeros(len(newnodes))])
+        if self.scores is not None:
+            self.scores = np.concatenate([self.scores, np.repeat(np.mean(self.scores), len(newnodes))])
+            self.scores /= np.sum(self.scores)
+        self.updateTransitionMatrix()
+
+    def applyEdgeDelta(
+            self,
+            added_edges: Iterable[tuple[str, str]]=(),
+            removed_edges: Iterable[tuple[str, str]]=()
+    ) -> None:
+        """
+        Insert and delete edges in the link matrix.
+
+        Nodes of the inserted edges that are not in the graph yet are added. An edge
+        inserted several times is counted as many times, as in
+        :func:`graphflow.pagerank.TransitionMatrixFromEdgeArrays`.
+
+        Parameters
+        ----------
+        added_edges : Iterable[tuple[str, str]], optional
+            The edges to insert, as (source, target). Default is no edges.
+        removed_edges : Iterable[tuple[str, str]], optional
+            The edges to delete, as (source, target). Default is no edges.
+
+        Raises
+        ------
+        ValueError
+            If an edge to delete is not in the graph.
+        """
+        added_edges = list(added_edges)
+        removed_edges = list(removed_edges)
+        self.addNodes(node for edge in added_edges for node in edge)
+        for node1, node2 in removed_edges:
+            if node1 not in self.nodes or node2 not in self.nodes:
+                raise ValueError(f"Edge ({node1}, {node2}) is not in the graph.")
+
+        nbnodes = len(self.nodelist)
+        src = np.array([self.nodes[node1] for node1, _ in added_edges + removed_edges], dtype=np.int64)
+        dst = np.array([self.nodes[node2] for _, node2 in added_edges + removed_edges], dtype=np.int64)
+        change = np.concatenate([np.ones(len(added_edges)), -np.ones(len(removed_edges))])
+        if len(change) == 0:
+            return
+
+        # aggregate the changes per entry, so that each entry is written once
+        entries, inverse = np.unique(dst * nbnodes + src, return_inverse=True)
+        entrychange = np.bincount(inverse, weights=change)
+        rows, cols = entries // nbnodes, entries % nbnodes
+        newcounts = self.linkcounts[rows, cols] + entrychange
+        if np.any(newcounts < 0):
+            idx = np.argmax(newcounts < 0)
+            raise ValueError(f"Edge ({self.nodelist[cols[idx]]}, {self.nodelist[rows[idx]]}) is not in the graph.")
+
+        with warnings.catch_warnings():
+            # inserting entries into a CSR matrix shifts its arrays once for the whole batch
+            warnings.simplefilter('ignore', SparseEfficiencyWarning)
+            self.linkcounts[rows, cols] = newcounts
+        self.linkcounts.eliminate_zeros()
+        self.outdegree += np.bincount(cols, weights=entrychange, minlength=nbnodes)
+        self.updateTransitionMatrix()
+
+    def calculatePageRank(self, initial: Optional[dict[str, float]]=None) -> dict[str, float]:
+        """
+        Calculate the PageRank of the current graph.
+
+        Parameters
+        ----------
+        initial : dict, optional
+            The scores to start from, e.g., those returned before the latest edits.
+            Nodes missing from it start with the average score. If None, the scores of
+            the previous computation are used, or the uniform vector for the first one.
+            The scores are used at their scale, which is 1 only if `redistribute_dangling`
+            is True. Default is None.
+
+        Returns
+        -------
+        dict
+            A dictionary mapping node identifiers to their PageRank scores. The number of
+            matrix-vector products performed is stored in the attribute `nbmatvecs`.
+        """
+        if initial is not None:
+            r0 = np.array([initial.get(node, np.nan) for node in self.nodelist])
+            r0[np.isnan(r0)] = np.nanmean(r0) if np.any(~np.isnan(r0)) else 1.
+            if self.redistribute_dangling:
+                # the power iteration conserves the total score, so it must start from unit sum
+                r0 /= np.sum(r0)
+            # otherwise, the total score decays, and the iteration resumes from the decayed
+            # scores: rescaling them to unit sum would restart the decay from the beginning
+        else:
+            r0 = self.scores
+        self.scores, self.nbmatvecs = SolvePageRank(
+            self.P, self.outdegree == 0, self.beta,
+            eps=self.eps, maxstep=self.maxstep, solver=self.solver,
+            redistribute_dangling=self.redistribute_dangling, initial=r0
+        )
+        return {node: self.scores[idx] for idx, node in enumerate(self.nodelist)}
@@ -0,0 +1,48 @@
+
+'''
+Access to the compiled PageRank kernels of :mod:`graphflow.pagerank.cpagerank`.
+
+The extension is imported when a kernel is first needed, rather than with the package,
+so that :mod:`graphflow.pagerank` can be imported, and its Python paths used, when the
+extension is not built.
+'''
+
+from importlib import import_module
+from types import ModuleType
+from typing import Optional
+
+
+def CompiledKernels() -> Optional[ModuleType]:
+    """
+    Return the module of the compiled kernels, if it can be imported.
+
+    Returns
+    -------
+    module or None
+        The module :mod:`graphflow.pagerank.cpagerank`, or None if the extension is not built.
+    """
+    try:
+        return import_module('.cpagerank', __package__)
+    except ImportError:
+        return None
+
+
+def RequireCompiledKernels() -> ModuleType:
+    """
+    Return the module of the compiled kernels, for the code paths that need it.
+
+    Returns
+    -------
+    module
+        The module :mod:`graphflow.pagerank.cpagerank`.
+
+    Raises
+    ------
+    ImportError
+        If the extension is not built.
+    """
+    kernels = CompiledKernels()
+    if kernels is None:
+        raise ImportError("The compiled extension graphflow.pagerank.cpagerank is not built: "
+                          "use PageRankLanguage.PYTHON, or build it with `python setup.py build_ext`.")
+    return kernels
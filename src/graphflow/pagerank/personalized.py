@@ -0,0 +1,169 @@
+
+'''
+Personalized PageRank for many teleportation vectors at once.
+
+The k teleportation distributions are stacked into an n x k block, and the
+power iteration is run on the whole block, so that the link matrix is read only
+once per iteration for all of them.
+'''
+
+from typing import Annotated, Iterable, Literal, Union
+
+import networkx
+import numpy as np
+from numpy.typing import NDArray
+from scipy.sparse import csr_array
+
+from .GooglePageRank import TransitionMatrix
+from .kernels import CompiledKernels, RequireCompiledKernels
+from .. import PageRankLanguage
+
+
+def TeleportMatrix(
+        seeds: list[Union[Iterable[str], dict[str, float]]],
+        nodes: dict[str, int]
+) -> Annotated[NDArray[np.float64], Literal["2D Array"]]:
+    """
+    Build the block of teleportation distributions from seed sets.
+
+    Parameters
+    ----------
+    seeds : list
+        The k seed sets. Each is either an iterable of nodes, which are teleported
+        to with equal probabilities, or a dictionary mapping nodes to their weights.
+    nodes : dict
+        A dictionary mapping node identifiers to their indices.
+
+    Returns
+    -------
+    numpy.ndarray
+        An n x k array, whose columns are the teleportation distributions.
+
+    Raises
+    ------
+    ValueError
+        If a seed set is empty, or has no positive weight.
+    """
+    teleport = np.zeros((len(nodes), len(seeds)))
+    for col, seedset in enumerate(seeds):
+        if not isinstance(seedset, dict):
+            seedset = {node: 1. for node in seedset}
+        rows = np.array([nodes[node] for node in seedset], dtype=np.int64)
+        np.add.at(teleport[:, col], rows, np.array(list(seedset.values()), dtype=np.float64))
+    totals = np.sum(teleport, axis=0)
+    if np.any(totals <= 0):
+        raise ValueError("Every seed set must have a positive total weight.")
+    return teleport / totals
+
+
+def PersonalizedPageRankFromTransitionMatrix(
+        P: csr_array,
+        dangling: Annotated[NDArray[np.bool_], Literal["1D Array"]],
+        teleport: Annotated[NDArray[np.float64], Literal["2D Array"]],
+        beta: float,
+        eps: float=1e-4,
+        maxstep: int=1000,
+        redistribute_dangling: bool=False,
+        language: PageRankLanguage=PageRankLanguage.CYTHON
+) -> tuple[Annotated[NDArray[np.float64], Literal["2D Array"]], int]:
+    """
+    Calculate personalized PageRank for a block of teleportation distributions.
+
+    Each iteration computes R' = beta * P R + V diag((1 - beta) * sum(R, axis=0)) for
+    all the columns of R together, where V is the block of teleportation distributions.
+
+    Parameters
+    ----------
+    P : scipy.sparse.csr_array
+        The link matrix returned by :func:`graphflow.pagerank.TransitionMatrix`.
+    dangling : numpy.ndarray
+        A boolean mask of the nodes without outgoing edges.
+    teleport : numpy.ndarray
+        An n x k array, whose columns are the teleportation distributions.
+    beta : float
+        The damping factor (between 0 and 1). Typically set to 0.85.
+    eps : float, optional
+        The convergence threshold. The algorithm stops when the L1 change of every
+        column is less than this value. Default is 1e-4.
+    maxstep : int, optional
+        The maximum number of iterations to perform. Default is 1000.
+    redistribute_dangling : bool, optional
+        If True, the rank held by dangling nodes is sent back to the teleportation
+        distribution of its column. Default is False.
+    language : PageRankLanguage, optional
+        The implementation language to use. The Cython kernel fuses the product and
+        the updates of the whole block in a single pass, and raises ImportError if the
+        extension is not built. Default is PageRankLanguage.CYTHON.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - R (numpy.ndarray): An n x k array, whose columns are the personalized PageRank vectors.
+        - nbsteps (int): The number of iterations, each reading the link matrix once.
+    """
+    teleport = np.ascontiguousarray(teleport, dtype=np.float64)
+    if language == PageRankLanguage.CYTHON:
+        return RequireCompiledKernels().personalized_pagerank_csr(
+            P.indptr, P.indices, np.asarray(P.data, dtype=np.float64),
+            np.asarray(dangling, dtype=np.uint8), teleport,
+            beta, eps, maxstep, redistribute_dangling
+        )
+
+    R = teleport.copy()
+    converged = False
+    stepid = 0
+    while not converged and stepid < maxstep:
+        mass = (1 - beta) * np.sum(R, axis=0)
+        if redistribute_dangling:
+            mass += beta * np.sum(R[dangling, :], axis=0)
+        newR = beta * (P @ R) + teleport * mass
+        converged = np.all(np.sum(np.abs(newR - R), axis=0) < eps)
+        R = newR
+        stepid += 1
+    return R, stepid
+
+
+def CalculatePersonalizedPageRank(
+        digraph: networkx.DiGraph,
+        beta: float,
+        seeds: Union[list[Union[Iterable[str], dict[str, float]]], Annotated[NDArray[np.float64], Literal["2D Array"]]],
+        eps: float=1e-4,
+        maxstep: int=1000,
+        redistribute_dangling: bool=False
+) -> tuple[Annotated[NDArray[np.float64], Literal["2D Array"]], dict[str, int]]:
+    """
+    Calculate personalized PageRank of a directed graph for many seed sets at once.
+
+    Parameters
+    ----------
+    digraph : networkx.DiGraph
+        The directed graph for which to compute PageRank.
+    beta : float
+        The damping factor (between 0 and 1). Typically set to 0.85.
+    seeds : list or numpy.ndarray
+        Either the k seed sets (see :func:`TeleportMatrix`), or an n x k array whose
+        columns are teleportation distributions, with rows in the order of `digraph.nodes()`.
+    eps : float, optional
+        The convergence threshold. Default is 1e-4.
+    maxstep : int, optional
+        The maximum number of iterations to perform. Default is 1000.
+    redistribute_dangling : bool, optional
+        If True, the rank held by dangling nodes is sent back to the teleportation
+        distribution of its column. Default is False.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - R (numpy.ndarray): An n x k array, whose k-th column holds the scores for the k-th seed set.
+        - nodedict (dict): A dictionary mapping node identifiers to their row indices.
+    """
+    P, dangling, nodes = TransitionMatrix(digraph)
+    teleport = seeds if isinstance(seeds, np.ndarray) else TeleportMatrix(seeds, nodes)
+    language = PageRankLanguage.PYTHON if CompiledKernels() is None else PageRankLanguage.CYTHON
+    R, _ = PersonalizedPageRankFromTransitionMatrix(
+        P, dangling, teleport, beta,
+        eps=eps, maxstep=maxstep, redistribute_dangling=redistribute_dangling, language=language
+    )
+    return R, nodes
@@ -0,0 +1,594 @@
+
+'''
+Solvers for PageRank on a sparse link matrix.
+
+Besides the power iteration, PageRank is the solution of the linear system
+(I - beta * P) y = v, normalized to unit sum, where v is the uniform teleportation
+vector. With this formulation, the rank of the dangling nodes is spread uniformly
+over all nodes. The solvers below need far fewer matrix-vector products than the
+power iteration when the damping factor is close to 1.
+'''
+
+import warnings
+from typing import Annotated, Literal, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+from scipy.sparse import csr_array, identity, tril, triu
+from scipy.sparse.linalg import LinearOperator, gmres, bicgstab, spsolve_triangular
+
+from .kernels import CompiledKernels
+from .. import L1norm
+
+
+PAGERANK_SOLVERS = ["power", "gauss-seidel", "extrapolation", "gmres", "bicgstab"]
+# the solvers able to leave the rank of dangling nodes out, the others always spread it over all nodes
+LEAKING_DANGLING_SOLVERS = ["power"]
+# number of inner iterations of GMRES between two restarts, the default of scipy
+GMRES_RESTART = 20
+
+
+def SparsePowerIteration_Python(
+        P: csr_array,
+        dangling: Annotated[NDArray[np.bool_], Literal["1D Array"]],
+        beta: float,
+        eps: float=1e-4,
+        maxstep: int=1000,
+        redistribute_dangling: bool=False,
+        initial: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], int]:
+    """
+    Run the power iteration on a sparse link matrix, in Python.
+
+    See :func:`PowerIteration` for the parameters.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - r (numpy.ndarray): The PageRank vector.
+        - nbmatvecs (int): The number of matrix-vector products performed.
+    """
+    nbnodes = P.shape[0]
+    r = np.repeat(1 / float(nbnodes), nbnodes) if initial is None else np.asarray(initial, dtype=np.float64)
+    converged = False
+    stepid = 0
+    while not converged and stepid < maxstep:
+        mass = (1 - beta) * np.sum(r)
+        if redistribute_dangling:
+            mass += beta * np.sum(r[dangling])
+        newr = beta * (P @ r) + mass / nbnodes
+        converged = (L1norm(newr, r) < eps)
+        r = newr
+        stepid += 1
+    return r, stepid
+
+
+def PowerIteration(
+        P: csr_array,
+        dangling: Annotated[NDArray[np.bool_], Literal["1D Array"]],
+        beta: float,
+        eps: float=1e-4,
+        maxstep: int=1000,
+        redistribute_dangling: bool=False,
+        initial: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], int]:
+    """
+    Compute PageRank with the power iteration, with the compiled kernel, or in Python
+    (see :func:`SparsePowerIteration_Python`) if the extension is not built.
+
+    Parameters
+    ----------
+    P : scipy.sparse.csr_array
+        The link matrix returned by :func:`graphflow.pagerank.TransitionMatrix`.
+    dangling : numpy.ndarray
+        A boolean mask of the nodes without outgoing edges.
+    beta : float
+        The damping factor (between 0 and 1). Typically set to 0.85.
+    eps : float, optional
+        The convergence threshold on the L1 change of the vector. Default is 1e-4.
+    maxstep : int, optional
+        The maximum number of iterations to perform. Default is 1000.
+    redistribute_dangling : bool, optional
+        If True, the rank held by dangling nodes is spread uniformly over all nodes.
+        Default is False.
+    initial : numpy.ndarray, optional
+        The PageRank vector to start from, e.g., the one of the graph before an edit.
+        If None, the uniform vector is used. Default is None.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - r (numpy.ndarray): The PageRank vector.
+        - nbmatvecs (int): The number of matrix-vector products performed.
+    """
+    kernels = CompiledKernels()
+    if kernels is None:
+        return SparsePowerIteration_Python(
+            P, dangling, beta, eps=eps, maxstep=maxstep, redistribute_dangling=redistribute_dangling, initial=initial
+        )
+    return kernels.pagerank_csr(
+        P.indptr, P.indices, np.asarray(P.data, dtype=np.float64),
+        np.asarray(dangling, dtype=np.uint8),
+        beta, eps, maxstep, redistribute_dangling,
+        None if initial is None else np.asarray(initial, dtype=np.float64)
+    )
+
+
+def GaussSeidel(
+        P: csr_array,
+        beta: float,
+        eps: float=1e-4,
+        maxstep: int=1000,
+        initial: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], int]:
+    """
+    Compute PageRank with Gauss-Seidel sweeps on (I - beta * P) y = v, with the compiled
+    kernel, or in Python (see :func:`GaussSeidel_Python`) if the extension is not built.
+
+    Parameters
+    ----------
+    P : scipy.sparse.csr_array
+        The link matrix returned by :func:`graphflow.pagerank.TransitionMatrix`.
+    beta : float
+        The damping factor (between 0 and 1). Typically set to 0.85.
+    eps : float, optional
+        The convergence threshold on the L1 change of the normalized vector in a sweep.
+        Default is 1e-4.
+    maxstep : int, optional
+        The maximum number of sweeps to perform. Default is 1000.
+    initial : numpy.ndarray, optional
+        The PageRank vector to start from, e.g., the one of the graph before an edit.
+        If None, the uniform vector is used. Default is None.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - r (numpy.ndarray): The PageRank vector.
+        - nbmatvecs (int): The number of sweeps, each costing one matrix-vector product,
+          plus one for scaling `initial` if given.
+    """
+    y0, nbmatvecs = LinearSystemInitialVector(P, beta, initial)
+    kernels = CompiledKernels()
+    if kernels is None:
+        r, nbsweeps = GaussSeidel_Python(P, beta, eps=eps, maxstep=maxstep, y0=y0)
+    else:
+        r, nbsweeps = kernels.pagerank_gauss_seidel(
+            P.indptr, P.indices, np.asarray(P.data, dtype=np.float64), beta, eps, maxstep, y0
+        )
+    return r, nbsweeps + nbmatvecs
+
+
+def GaussSeidel_Python(
+        P: csr_array,
+        beta: float,
+        eps: float=1e-4,
+        maxstep: int=1000,
+        y0: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], int]:
+    """
+    Run Gauss-Seidel sweeps on (I - beta * P) y = v, in Python.
+
+    Each sweep solves the lower triangular part of the system, the upper part being
+    taken from the previous sweep, which updates the components in order, as the
+    compiled kernel does.
+
+    Parameters
+    ----------
+    P : scipy.sparse.csr_array
+        The link matrix.
+    beta : float
+        The damping factor (between 0 and 1).
+    eps : float, optional
+        The convergence threshold on the L1 change of the normalized vector in a sweep.
+        Default is 1e-4.
+    maxstep : int, optional
+        The maximum number of sweeps to perform. Default is 1000.
+    y0 : numpy.ndarray, optional
+        The initial guess of y (see :func:`LinearSystemInitialVector`). If None, the
+        uniform vector is used. Default is None.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - r (numpy.ndarray): The PageRank vector, i.e., y normalized to unit sum.
+        - nbsweeps (int): The number of sweeps.
+    """
+    nbnodes = P.shape[0]
+    if nbnodes == 0:
+        return np.empty(0), 0
+    A = identity(nbnodes, format='csr') - beta * csr_array(P)
+    lower, upper = tril(A, format='csr'), triu(A, k=1, format='csr')
+    teleport = np.full(nbnodes, 1. / nbnodes)
+    y = teleport.copy() if y0 is None else np.array(y0, dtype=np.float64)
+    residual = eps
+    stepid = 0
+    while residual >= eps and stepid < maxstep:
+        newy = spsolve_triangular(lower, teleport - upper @ y, lower=True)
+        # change relative to the norm, as the PageRank vector is y normalized
+        residual = np.sum(np.abs(newy - y)) / np.sum(newy)
+        y = newy
+        stepid += 1
+    return y / np.sum(y), stepid
+
+
+def LinearSystemInitialVector(
+        P: csr_array,
+        beta: float,
+        initial: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+) -> tuple[Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]], int]:
+    """
+    Scale a PageRank vector into an initial guess for (I - beta * P) y = v.
+
+    The solution y is the PageRank vector x times 1 / (1 - beta * sum(P x)), where
+    sum(P x) is the total rank not held by dangling nodes. Starting from a well-scaled guess
+    matters, as the error along x itself decays only as fast as beta ** k.
+
+    Parameters
+    ----------
+    P : scipy.sparse.csr_array
+        The link matrix.
+    beta : float
+        The damping factor (between 0 and 1).
+    initial : numpy.ndarray, optional
+        The PageRank vector. Default is None.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - y0 (numpy.ndarray): The initial guess, or None if `initial` is None.
+        - nbmatvecs (int): The number of matrix-vector products performed.
+    """
+    if initial is None:
+        return None, 0
+    x0 = np.asarray(initial, dtype=np.float64)
+    x0 = x0 / np.sum(x0)
+    return x0 / (1 - beta * np.sum(P @ x0)), 1
+
+
+def QuadraticExtrapolation(
+        x3: Annotated[NDArray[np.float64], Literal["1D Array"]],
+        x2: Annotated[NDArray[np.float64], Literal["1D Array"]],
+        x1: Annotated[NDArray[np.float64], Literal["1D Array"]],
+        x0: Annotated[NDArray[np.float64], Literal["1D Array"]]
+) -> Annotated[NDArray[np.float64], Literal["1D Array"]]:
+    """
+    Extrapolate four successive iterates of the power iteration.
+
+    This removes the components along the second and third eigenvectors, assuming
+    that they dominate the error (Kamvar et al., "Extrapolation Methods for
+    Accelerating PageRank Computations", WWW 2003).
+
+    Parameters
+    ----------
+    x3, x2, x1, x0 : numpy.ndarray
+        The iterates, from the oldest to the latest.
+
+    Returns
+    -------
+    numpy.ndarray
+        The extrapolated vector, normalized to unit sum.
+    """
+    Y = np.stack([x2 - x3, x1 - x3], axis=1)
+    gamma, _, _, _ = np.linalg.lstsq(Y, -(x0 - x3), rcond=None)
+    newx = (gamma[0] + gamma[1] + 1.) * x2 + (gamma[1] + 1.) * x1 + x0
+    newx = np.abs(newx)
+    return newx / np.sum(newx)
+
+
+def ExtrapolatedPowerIteration(
+        P: csr_array,
+        dangling: Annotated[NDArray[np.bool_], Literal["1D Array"]],
+        beta: float,
+        eps: float=1e-4,
+        maxstep: int=1000,
+        period: int=10,
+        initial: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], int]:
+    """
+    Compute PageRank with the power iteration, accelerated by a quadratic
+    extrapolation (see :func:`QuadraticExtrapolation`) every `period` iterations.
+
+    Parameters
+    ----------
+    P : scipy.sparse.csr_array
+        The link matrix returned by :func:`graphflow.pagerank.TransitionMatrix`.
+    dangling : numpy.ndarray
+        A boolean mask of the nodes without outgoing edges.
+    beta : float
+        The damping factor (between 0 and 1). Typically set to 0.85.
+    eps : float, optional
+        The convergence threshold on the L1 change of the vector. Default is 1e-4.
+    maxstep : int, optional
+        The maximum number of iterations to perform. Default is 1000.
+    period : int, optional
+        The number of iterations between two extrapolations. Default is 10.
+    initial : numpy.ndarray, optional
+        The PageRank vector to start from, e.g., the one of the graph before an edit.
+        If None, the uniform vector is used. Default is None.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - r (numpy.ndarray): The PageRank vector.
+        - nbmatvecs (int): The number of matrix-vector products performed.
+    """
+    nbnodes = P.shape[0]
+    r = np.repeat(1 / float(nbnodes), nbnodes) if initial is None else np.asarray(initial, dtype=np.float64)
+    history = [r]
+    converged = False
+    stepid = 0
+    while not converged and stepid < maxstep:
+        newr = beta * (P @ r) + (1 - beta + beta * np.sum(r[dangling])) / nbnodes
+        stepid += 1
+        converged = (L1norm(newr, r) < eps)
+        r = newr
+        history = history[-3:] + [r]
+        if not converged and stepid % period == 0 and len(history) == 4:
+            r = QuadraticExtrapolation(*history)
+            history = [r]
+    return r, stepid
+
+
+def KrylovSolve(
+        P: csr_array,
+        beta: float,
+        eps: float=1e-4,
+        maxstep: int=1000,
+        method: Literal["gmres", "bicgstab"]="gmres",
+        initial: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], int]:
+    """
+    Compute PageRank by solving (I - beta * P) y = v with a Krylov subspace method.
+
+    Parameters
+    ----------
+    P : scipy.sparse.csr_array
+        The link matrix returned by :func:`graphflow.pagerank.TransitionMatrix`.
+    beta : float
+        The damping factor (between 0 and 1). Typically set to 0.85.
+    eps : float, optional
+        The tolerance on the relative residual. Default is 1e-4.
+    maxstep : int, optional
+        The maximum number of iterations to perform. An iteration of GMRES is an inner
+        iteration, of one matrix-vector product, and they are run in restart cycles of at
+        most `GMRES_RESTART` iterations. An iteration of BiCGSTAB takes two products.
+        Default is 1000.
+    method : str, optional
+        Either "gmres" or "bicgstab". Default is "gmres".
+    initial : numpy.ndarray, optional
+        The PageRank vector to start from, e.g., the one of the graph before an edit.
+        If None, the uniform vector is used. Default is None.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - r (numpy.ndarray): The PageRank vector.
+        - nbmatvecs (int): The number of matrix-vector products performed.
+
+    Raises
+    ------
+    ValueError
+        If the method is unknown, or if it breaks down.
+
+    Warns
+    -----
+    RuntimeWarning
+        If the method does not converge in `maxstep` iterations.
+    """
+    nbnodes = P.shape[0]
+    y0, nbmatvecs = LinearSystemInitialVector(P, beta, initial)
+
+    def matvec(y):
+        nonlocal nbmatvecs
+        nbmatvecs += 1
+        return y - beta * (P @ y)
+
+    operator = LinearOperator((nbnodes, nbnodes), matvec=matvec, dtype=np.float64)
+    teleport = np.repeat(1 / float(nbnodes), nbnodes)
+    if y0 is None:
+        y0 = teleport
+    if method == "gmres":
+        # the maximum number of iterations of scipy's gmres counts the restart cycles
+        restart = max(1, min(GMRES_RESTART, maxstep))
+        y, info = gmres(operator, teleport, x0=y0, rtol=eps, atol=0., restart=restart,
+                        maxiter=int(np.ceil(maxstep / restart)))
+    elif method == "bicgstab":
+        y, info = bicgstab(operator, teleport, x0=y0, rtol=eps, atol=0., maxiter=maxstep)
+    else:
+        raise ValueError(f"Unknown Krylov method: {method}")
+    if info < 0:
+        raise ValueError(f"{method} failed on the PageRank system (info {info}).")
+    if info > 0:
+        warnings.warn(f"{method} did not converge in {maxstep} iterations "
+                      f"({nbmatvecs} matrix-vector products).", RuntimeWarning)
+    return y / np.sum(y), nbmatvecs
+
+
+def TopKRanking(
+        r: Annotated[NDArray[np.float64], Literal["1D Array"]],
+        k: int
+) -> Annotated[NDArray[np.int64], Literal["1D Array"]]:
+    """
+    Select the indices of the k highest scores, in decreasing order of scores.
+
+    The k indices are selected with a partial sort in O(n) time, and only them are sorted.
+
+    Parameters
+    ----------
+    r : numpy.ndarray
+        The scores.
+    k : int
+        The number of indices, at most the length of `r`.
+
+    Returns
+    -------
+    numpy.ndarray
+        The indices of the k highest scores.
+    """
+    top = np.argpartition(-r, k - 1)[:k]
+    return top[np.argsort(-r[top], kind='stable')]
+
+
+def TopKPowerIteration(
+        P: csr_array,
+        dangling: Annotated[NDArray[np.bool_], Literal["1D Array"]],
+        beta: float,
+        k: int,
+        eps: float=1e-4,
+        maxstep: int=1000,
+        redistribute_dangling: bool=False,
+        initial: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+) -> tuple[Annotated[NDArray[np.int64], Literal["1D Array"]], Annotated[NDArray[np.float64], Literal["1D Array"]], int]:
+    """
+    Compute the k nodes of highest PageRank with the power iteration, stopping as
+    soon as their ranking is settled.
+
+    If the rank of dangling nodes is redistributed, the iteration contracts by beta in
+    L1 norm, and after an iteration changing the vector by delta, the L1 distance to the
+    limit is at most beta / (1 - beta) * delta, and so is the sum of the errors on any
+    two scores. The iteration stops when the ranking of the first k nodes is the same
+    as in the previous iteration, and every gap between two consecutive scores among
+    the first k + 1 ones is larger than this bound, or when the L1 change is less than
+    `eps`, as for :func:`PowerIteration`. Otherwise, the rank leaks through the dangling
+    nodes, the bound does not hold, and the iteration stops on the L1 change only.
+
+    Parameters
+    ----------
+    P : scipy.sparse.csr_array
+        The link matrix returned by :func:`graphflow.pagerank.TransitionMatrix`.
+    dangling : numpy.ndarray
+        A boolean mask of the nodes without outgoing edges.
+    beta : float
+        The damping factor (between 0 and 1). Typically set to 0.85.
+    k : int
+        The number of nodes to rank.
+    eps : float, optional
+        The convergence threshold on the L1 change of the vector, used if the scores of
+        the first nodes are tied. Default is 1e-4.
+    maxstep : int, optional
+        The maximum number of iterations to perform. Default is 1000.
+    redistribute_dangling : bool, optional
+        If True, the rank held by dangling nodes is spread uniformly over all nodes.
+        Default is False.
+    initial : numpy.ndarray, optional
+        The PageRank vector to start from. If None, the uniform vector is used.
+        Default is None.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - indices (numpy.ndarray): The indices of the k nodes, in decreasing order of scores.
+        - scores (numpy.ndarray): The scores of these nodes.
+        - nbmatvecs (int): The number of matrix-vector products performed.
+
+    Raises
+    ------
+    ValueError
+        If `k` is not positive.
+    """
+    if k < 1:
+        raise ValueError("The number of top nodes must be positive.")
+    nbnodes = P.shape[0]
+    k = min(k, nbnodes)
+    r = np.repeat(1 / float(nbnodes), nbnodes) if initial is None else np.asarray(initial, dtype=np.float64)
+    # the (k+1)-th node is ranked too, to check that it cannot overtake the k-th one
+    nbranked = min(k + 1, nbnodes)
+    ranking = None
+    settled = False
+    stepid = 0
+    while not settled and stepid < maxstep:
+        mass = (1 - beta) * np.sum(r)
+        if redistribute_dangling:
+            mass += beta * np.sum(r[dangling])
+        newr = beta * (P @ r) + mass / nbnodes
+        delta = L1norm(newr, r)
+        r = newr
+        stepid += 1
+
+        newranking = TopKRanking(r, nbranked)
+        errorbound = beta / (1 - beta) * delta
+        settled = (delta < eps) or (
+            redistribute_dangling and ranking is not None and np.array_equal(newranking[:k], ranking[:k])
+            and np.all(-np.diff(r[newranking]) > errorbound)
+        )
+        ranking = newranking
+    if ranking is None:
+        ranking = TopKRanking(r, nbranked)
+    return ranking[:k], r[ranking[:k]], stepid
+
+
+def SolvePageRank(
+        P: csr_array,
+        dangling: Annotated[NDArray[np.bool_], Literal["1D Array"]],
+        beta: float,
+        eps: float=1e-4,
+        maxstep: int=1000,
+        solver: str="power",
+        redistribute_dangling: bool=False,
+        initial: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], int]:
+    """
+    Compute PageRank on a sparse link matrix with the given solver.
+
+    Parameters
+    ----------
+    P : scipy.sparse.csr_array
+        The link matrix returned by :func:`graphflow.pagerank.TransitionMatrix`.
+    dangling : numpy.ndarray
+        A boolean mask of the nodes without outgoing edges.
+    beta : float
+        The damping factor (between 0 and 1). Typically set to 0.85.
+    eps : float, optional
+        The convergence threshold. Default is 1e-4.
+    maxstep : int, optional
+        The maximum number of iterations to perform. Default is 1000.
+    solver : str, optional
+        One of "power", "gauss-seidel", "extrapolation", "gmres" and "bicgstab".
+        Default is "power".
+    redistribute_dangling : bool, optional
+        If True, the rank held by dangling nodes is spread uniformly over all nodes.
+        Only the power iteration can leave it out: the other solvers always spread it,
+        and refuse graphs with dangling nodes if it is False. Default is False.
+    initial : numpy.ndarray, optional
+        The PageRank vector to start from, e.g., the one of the graph before an edit.
+        If None, the uniform vector is used. Default is None.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - r (numpy.ndarray): The PageRank vector.
+        - nbmatvecs (int): The number of matrix-vector products performed.
+
+    Raises
+    ------
+    ValueError
+        If the solver is unknown, or if it cannot leave the rank of dangling nodes out
+        while `redistribute_dangling` is False and the graph has dangling nodes.
+    """
+    if solver not in PAGERANK_SOLVERS:
+        raise ValueError(f"Unknown PageRank solver: {solver}")
+    if not redistribute_dangling and solver not in LEAKING_DANGLING_SOLVERS and np.any(dangling):
+        raise ValueError(f"The solver {solver} spreads the rank of dangling nodes over all nodes: "
+                         "set redistribute_dangling to True.")
+    if solver == "power":
+        return PowerIteration(
+            P, dangling, beta,
+            eps=eps, maxstep=maxstep, redistribute_dangling=redistribute_dangling, initial=initial
+        )
+    elif solver == "gauss-seidel":
+        return GaussSeidel(P, beta, eps=eps, maxstep=maxstep, initial=initial)
+    elif solver == "extrapolation":
+        return ExtrapolatedPowerIteration(P, dangling, beta, eps=eps, maxstep=maxstep, initial=initial)
+    elif solver in ["gmres", "bicgstab"]:
+        return KrylovSolve(P, beta, eps=eps, maxstep=maxstep, method=solver, initial=initial)
+    else:
+        raise ValueError(f"Unknown PageRank solver: {solver}")
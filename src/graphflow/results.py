@@ -0,0 +1,184 @@
+
+'''
+Array-based results of ranking algorithms.
+
+Instead of a dictionary with one Python float per node, a result holds the
+scores in one NumPy array, along with a table mapping the nodes to indices,
+which can be shared by several results on the same graph.
+'''
+
+from collections.abc import Mapping
+from typing import Annotated, Hashable, Iterable, Iterator, Literal, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+def _labelarray(labels: list[Hashable]) -> Annotated[NDArray, Literal["1D Array"]]:
+    # labels such as tuples must not be unpacked into extra dimensions, and labels of
+    # mixed types, such as 1 and 'a', must not be converted to a common type such as strings
+    array = None
+    if len({type(label) for label in labels}) <= 1:
+        try:
+            array = np.array(labels)
+        except ValueError:
+            pass
+    if array is None or array.ndim != 1:
+        array = np.empty(len(labels), dtype=object)
+        array[:] = labels
+    return array
+
+
+class NodeIndex:
+    """
+    Table mapping node identifiers to contiguous indices 0, ..., n-1.
+
+    Lookups of arrays of identifiers are vectorized with a binary search when the
+    identifiers are all of one sortable type, such as strings or integers.
+    """
+    def __init__(self, nodes: Iterable[Hashable]):
+        """
+        Initialize the NodeIndex class.
+
+        Parameters
+        ----------
+        nodes : Iterable
+            The node identifiers, in the order of their indices.
+        """
+        self.nodelist = list(nodes)
+        self.nodeidx = {node: idx for idx, node in enumerate(self.nodelist)}
+        self.nodes = _labelarray(self.nodelist)
+        self.sortorder = None if self.nodes.dtype == object else np.argsort(self.nodes, kind='stable')
+
+    @classmethod
+    def fromdict(cls, nodedict: dict[Hashable, int]) -> 'NodeIndex':
+        """
+        Build the table from a dictionary mapping node identifiers to indices 0, ..., n-1,
+        such as those returned by :func:`graphflow.pagerank.GoogleMatrix`.
+        """
+        nodelist = [None] * len(nodedict)
+        for node, idx in nodedict.items():
+            nodelist[idx] = node
+        return cls(nodelist)
+
+    def __len__(self) -> int:
+        return len(self.nodelist)
+
+    def __contains__(self, node: Hashable) -> bool:
+        return node in self.nodeidx
+
+    def __getitem__(self, node: Hashable) -> int:
+        return self.nodeidx[node]
+
+    def indices(
+            self,
+            nodes: Iterable[Hashable]
+    ) -> tuple[Annotated[NDArray[np.int64], Literal["1D Array"]], Annotated[NDArray[np.bool_], Literal["1D Array"]]]:
+        """
+        Look up the indices of many nodes at once.
+
+        Parameters
+        ----------
+        nodes : Iterable
+            The node identifiers.
+
+        Returns
+        -------
+        tuple
+            A tuple containing:
+            - indices (numpy.ndarray): The indices of the nodes, and 0 for unknown nodes.
+            - found (numpy.ndarray): A boolean mask of the nodes that are in the table.
+        """
+        queries = nodes if isinstance(nodes, np.ndarray) else _labelarray(list(nodes))
+        if self.sortorder is None or queries.dtype == object or queries.dtype.kind != self.nodes.dtype.kind:
+            indices = np.fromiter((self.nodeidx.get(node, -1) for node in queries.tolist()),
+                                  dtype=np.int64, count=len(queries))
+            found = indices >= 0
+            indices[~found] = 0
+            return indices, found
+        if len(self.nodes) == 0:
+            return np.zeros(len(queries), dtype=np.int64), np.zeros(len(queries), dtype=bool)
+        sortednodes = self.nodes[self.sortorder]
+        positions = np.minimum(np.searchsorted(sortednodes, queries), len(sortednodes) - 1)
+        found = sortednodes[positions] == queries
+        indices = np.where(found, self.sortorder[positions], 0).astype(np.int64)
+        return indices, found
+
+
+class NodeScores(Mapping):
+    """
+    Scores of the nodes of a graph, held in an array.
+
+    It behaves as a read-only dictionary mapping node identifiers to scores, but
+    the dictionary is only built if :meth:`todict` is called.
+    """
+    def __init__(
+            self,
+            scores: Annotated[NDArray[np.float64], Literal["1D Array"]],
+            nodeindex: NodeIndex,
+            nbmatvecs: Optional[int]=None
+    ):
+        """
+        Initialize the NodeScores class.
+
+        Parameters
+        ----------
+        scores : numpy.ndarray
+            The scores, in the order of the indices of `nodeindex`.
+        nodeindex : NodeIndex
+            The table mapping node identifiers to indices.
+        nbmatvecs : int, optional
+            The number of matrix-vector products performed to compute the scores.
+            Default is None.
+        """
+        self.scores = np.asarray(scores)
+        self.nodeindex = nodeindex
+        self.nbmatvecs = nbmatvecs
+        self.scoredict = None
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.nodeindex.nodelist)
+
+    def __getitem__(self, node: Hashable) -> float:
+        return self.scores[self.nodeindex[node]]
+
+    def __contains__(self, node: Hashable) -> bool:
+        return node in self.nodeindex
+
+    def todict(self) -> dict[Hashable, float]:
+        """
+        Return the scores as a dictionary, which is built once and then cached.
+        """
+        if self.scoredict is None:
+            self.scoredict = dict(zip(self.nodeindex.nodelist, self.scores.tolist()))
+        return self.scoredict
+
+    def topk(self, k: int) -> 'NodeScores':
+        """
+        Return the k nodes with the highest scores, in decreasing order of scores.
+
+        The nodes are selected with a partial sort, in O(n + k log k) time.
+
+        Parameters
+        ----------
+        k : int
+            The number of nodes.
+
+        Returns
+        -------
+        NodeScores
+            The scores of the k nodes, iterated in decreasing order of scores.
+        """
+        k = min(k, len(self.scores))
+        if k <= 0:
+            return NodeScores(np.zeros(0), NodeIndex([]), nbmatvecs=self.nbmatvecs)
+        selected = np.argpartition(-self.scores, k - 1)[:k]
+        selected = selected[np.argsort(-self.scores[selected], kind='stable')]
+        return NodeScores(
+            self.scores[selected],
+            NodeIndex(self.nodeindex.nodes[selected].tolist()),
+            nbmatvecs=self.nbmatvecs
+        )
@@ -1,7 +1,20 @@
 
+import os
+import tempfile
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
 from itertools import product
+from typing import Annotated, Iterable, Iterator, Literal, Optional, Union
 
 import networkx as nx
+import numpy as np
+from numpy.typing import NDArray
+from scipy.sparse import csr_array, diags_array
+from scipy.sparse.csgraph import connected_components, depth_first_order, dijkstra
+from scipy.sparse.linalg import splu
+
+from ..results import NodeIndex
 
 
 DEFAULT_NODES = ['Stephen', 'Sinnie', 'Elaine']
@@ -12,6 +25,145 @@ DEFAULT_EDGES = [('Stephen', 'Sinnie', 0.2),
                  ('Stephen', 'Elaine', 1.1),
                  ('Elaine', 'Stephen', 1.2)]
 
+DIJKSTRA_CHUNK_SIZE = 64
+
+# graph of the shortest path computations in a worker process, set by _initDijkstraWorker in
+# the pool workers only
+_dijkstraGraph = None
+
+
+def _initDijkstraWorker(
+        data: Annotated[NDArray[np.float64], Literal["1D Array"]],
+        indices: Annotated[NDArray[np.int64], Literal["1D Array"]],
+        indptr: Annotated[NDArray[np.int64], Literal["1D Array"]]
+) -> None:
+    global _dijkstraGraph
+    nbnodes = len(indptr) - 1
+    _dijkstraGraph = csr_array((data, indices, indptr), shape=(nbnodes, nbnodes))
+
+
+def _dijkstraRows(sources: Annotated[NDArray[np.int64], Literal["1D Array"]]) -> Annotated[NDArray[np.float64], Literal["2D Array"]]:
+    return dijkstra(_dijkstraGraph, directed=True, indices=sources)
+
+
+# network of the resistance computations in a worker process, and the targets of its rows,
+# set by _initResistanceWorker
+_resistanceNetwork = None
+_resistanceTargets = None
+
+
+def _mapArrayState(state: dict, directory: str) -> tuple[dict, dict[str, str]]:
+    # split the state of a network into its other arguments, pickled to the workers, and
+    # its arrays, saved to .npy files in directory that the workers map in memory instead
+    # of each receiving a copy; the files must be kept until the pool is shut down
+    paths = {}
+    for key, value in state.items():
+        if isinstance(value, np.ndarray):
+            paths[key] = os.path.join(directory, f'{key}.npy')
+            np.save(paths[key], value)
+    return {key: value for key, value in state.items() if key not in paths}, paths
+
+
+def _initResistanceWorker(
+        state: dict,
+        paths: dict[str, str],
+        targets: Optional[Annotated[NDArray[np.int64], Literal["1D Array"]]]=None
+) -> None:
+    global _resistanceNetwork, _resistanceTargets
+    arrays = {key: np.load(path, mmap_mode='r') for key, path in paths.items()}
+    _resistanceNetwork = SocialNetworkSimVoltage.fromArrays(**state, **arrays)
+    _resistanceTargets = targets
+
+
+def _rowsCacheSize(
+        cache_size: Optional[int],
+        targets: Annotated[NDArray[np.int64], Literal["1D Array"]]
+) -> Optional[int]:
+    # a row reads the tree from its source and the tree to each target in turn, except the tree
+    # to the source itself, last read by the previous row: the cache keeps the trees to all the
+    # targets across the rows, plus the trees from the last three sources, so that the least
+    # recently used tree is never one still needed
+    return None if cache_size is None else max(cache_size, len(np.unique(targets)) + 3)
+
+
+def _resistanceRow(idx1: int) -> Annotated[NDArray[np.float64], Literal["1D Array"]]:
+    return np.array([_resistanceNetwork.resistanceFromIndices(idx1, idx2) for idx2 in _resistanceTargets.tolist()])
+
+
+def _resistancePairs(
+        idx1: Annotated[NDArray[np.int64], Literal["1D Array"]],
+        idx2: Annotated[NDArray[np.int64], Literal["1D Array"]]
+) -> Annotated[NDArray[np.float64], Literal["1D Array"]]:
+    return np.array([_resistanceNetwork.resistanceFromIndices(i1, i2) for i1, i2 in zip(idx1.tolist(), idx2.tolist())])
+
+
+def PreorderIntervals(
+        predecessors: Annotated[NDArray[np.int32], Literal["1D Array"]],
+        root: int
+) -> tuple[Annotated[NDArray[np.int64], Literal["1D Array"]], Annotated[NDArray[np.int64], Literal["1D Array"]]]:
+    """
+    Number the nodes of a tree in depth-first preorder, so that the subtree of each node
+    is an interval of numbers.
+
+    A node u is then an ancestor of a node v (or v itself) if and only if
+    `start[u] <= start[v] < end[u]`.
+
+    Parameters
+    ----------
+    predecessors : numpy.ndarray
+        The parent of each node, and a negative number for the root and the nodes not in
+        the tree, as returned by :func:`scipy.sparse.csgraph.dijkstra`.
+    root : int
+        The root of the tree.
+
+    Returns
+    -------
+    tuple
+        A tuple containing:
+        - start (numpy.ndarray): The preorder number of each node, and -1 for the nodes
+          not in the tree.
+        - end (numpy.ndarray): The preorder number following the subtree of each node.
+    """
+    nbnodes = len(predecessors)
+    children = np.flatnonzero(predecessors >= 0)
+    parents = predecessors[children]
+    childgraph = csr_array((np.ones(len(children)), (parents, children)), shape=(nbnodes, nbnodes))
+    order = depth_first_order(childgraph, root, directed=True, return_predecessors=False)
+    start = np.full(nbnodes, -1, dtype=np.int64)
+    start[order] = np.arange(len(order))
+
+    # sizes of the subtrees, accumulated level by level from the deepest nodes up
+    levels = [np.array([root])]
+    while True:
+        nextlevel = childgraph[levels[-1]].indices
+        if len(nextlevel) == 0:
+            break
+        levels.append(nextlevel)
+    sizes = np.ones(nbnodes, dtype=np.int64)
+    for level in reversed(levels[1:]):
+        np.add.at(sizes, predecessors[level], sizes[level])
+    return start, start + sizes
+
+
+class _DistanceMapping(Mapping):
+    # read-only view of the array of distances, as the former dictionary
+    # distance_matrix keyed by pairs of people
+    def __init__(self, nodeindex: NodeIndex, distances: Annotated[NDArray[np.float64], Literal["2D Array"]]):
+        self.nodeindex = nodeindex
+        self.distances = distances
+
+    def __getitem__(self, pair: tuple[str, str]) -> float:
+        person1, person2 = pair
+        if person1 not in self.nodeindex or person2 not in self.nodeindex:
+            raise KeyError(pair)
+        return float(self.distances[self.nodeindex[person1], self.nodeindex[person2]])
+
+    def __iter__(self) -> Iterator[tuple[str, str]]:
+        return product(self.nodeindex.nodelist, repeat=2)
+
+    def __len__(self) -> int:
+        return len(self.nodeindex) ** 2
+
 
 class SocialNetworkSimVoltage:
     """
@@ -25,7 +177,9 @@ class SocialNetworkSimVoltage:
             self,
             nodes: list[str]=None,
             edges: list[tuple[str, str, float]]=None,
-            precalculated_distance: bool=True
+            precalculated_distance: Union[bool, Literal["lazy"]]=True,
+            method: Literal["relaxation", "direct"]="relaxation",
+            cache_size: Optional[int]=128
     ):
         """
         Initialize the SocialNetworkSimVoltage class.
@@ -38,12 +192,33 @@ class SocialNetworkSimVoltage:
             List of edges as tuples (node1, node2, weight). Default is
             [('Stephen', 'Sinnie', 0.2), ('Sinnie', 'Stephen', 0.2), ('Sinnie', 'Elaine', 0.3),
              ('Elaine', 'Sinnie', 0.2), ('Stephen', 'Elaine', 1.1), ('Elaine', 'Stephen', 1.2)].
-        precalculated_distance : bool, optional
-            Whether to precalculate distances. Default is True.
+        precalculated_distance : bool or str, optional
+            Whether to precalculate the distances between all pairs of nodes. If "lazy",
+            the shortest path trees from person1 and to person2 are computed the first time
+            they are queried, and kept in an LRU cache, `shortestPathTree`. If False, they are
+            computed at every query. Default is True.
+        method : str, optional
+            How the potentials are computed: "relaxation" for the Jacobi sweeps, stopping
+            when the currents are balanced within `errTol` at every node, or "direct" for
+            sparse LU solves of the balance equations (see :meth:`solveVoltagesDirect`).
+            Default is "relaxation".
+        cache_size : int, optional
+            The maximum number of shortest path trees kept in the cache in the "lazy" mode.
+            If None, the cache is unbounded. Default is 128.
+
+        Raises
+        ------
+        ValueError
+            If the method is unknown.
         """
+        if method not in ["relaxation", "direct"]:
+            raise ValueError(f"Unknown method: {method}")
+        self.method = method
         self.initializeClass(nodes, edges)
         self.precalculated_distance = precalculated_distance
-        if self.precalculated_distance:
+        # hits and misses are reported by self.shortestPathTree.cache_info()
+        self.shortestPathTree = lru_cache(maxsize=cache_size)(self.computeShortestPathTree)
+        if self.precalculated_distance is True:
             self.precalculate_distance()
 
     def initializeClass(self, nodes: list[str], edges: list[tuple[str, str, float]]) -> None:
@@ -58,23 +233,151 @@ class SocialNetworkSimVoltage:
             List of edges as tuples (node1, node2, weight).
         """
         self.constructSocialNetwork(nodes, edges)
+        self.initializeParameters()
+
+    def initializeParameters(self) -> None:
+        """
+        Set the convergence parameters of the simulations to their defaults.
+        """
         self.errTol = 1e-4
         self.maxSteps = 10000
+        self.maxOuterSteps = 20
+
+    @classmethod
+    def fromArrays(
+            cls,
+            nodes: list[str],
+            edgeSrc: Annotated[NDArray[np.int64], Literal["1D Array"]],
+            edgeDst: Annotated[NDArray[np.int64], Literal["1D Array"]],
+            edgeResistance: Annotated[NDArray[np.float64], Literal["1D Array"]],
+            inEdgeOrder: Annotated[NDArray[np.int64], Literal["1D Array"]],
+            method: Literal["relaxation", "direct"]="relaxation",
+            cache_size: Optional[int]=128,
+            errTol: float=1e-4,
+            maxSteps: int=10000,
+            maxOuterSteps: int=20
+    ) -> 'SocialNetworkSimVoltage':
+        """
+        Build a network from the arrays describing its edges, as built by
+        :meth:`constructSocialNetwork`, without a networkx graph.
+
+        This is how the network is passed to worker processes. The shortest path trees
+        are computed in the "lazy" mode, and the methods working on the networkx graph,
+        such as :meth:`checkPersonIrrelevant` and :meth:`drawNetwork`, are not available.
+
+        Parameters
+        ----------
+        nodes : list[str]
+            The node identifiers, in the order of their indices.
+        edgeSrc : numpy.ndarray
+            The indices of the sources of the edges, grouped by source.
+        edgeDst : numpy.ndarray
+            The indices of the targets of the edges.
+        edgeResistance : numpy.ndarray
+            The resistances of the edges.
+        inEdgeOrder : numpy.ndarray
+            The positions of the edges grouped by target.
+        method : str, optional
+            Either "relaxation" or "direct". Default is "relaxation".
+        cache_size : int, optional
+            The maximum number of shortest path trees kept in the cache. Default is 128.
+        errTol : float, optional
+            The tolerance on the balance of currents of the relaxation. Default is 1e-4.
+        maxSteps : int, optional
+            The maximum number of sweeps of the relaxation. Default is 10000.
+        maxOuterSteps : int, optional
+            The maximum number of passes of the direct solver. Default is 20.
+
+        Returns
+        -------
+        SocialNetworkSimVoltage
+            The network.
+        """
+        network = cls.__new__(cls)
+        network.method = method
+        network.wordNet = None
+        network.nodeindex = NodeIndex(nodes)
+        network.edgeSrc, network.edgeDst = edgeSrc, edgeDst
+        network.edgeResistance, network.inEdgeOrder = edgeResistance, inEdgeOrder
+        network.constructMatrices()
+        network.errTol, network.maxSteps, network.maxOuterSteps = errTol, maxSteps, maxOuterSteps
+        network.precalculated_distance = "lazy"
+        network.shortestPathTree = lru_cache(maxsize=cache_size)(network.computeShortestPathTree)
+        return network
+
+    def arrayState(self) -> dict:
+        """
+        Return the arguments of :meth:`fromArrays` rebuilding this network.
+        """
+        return {
+            'nodes': self.nodeindex.nodelist,
+            'edgeSrc': self.edgeSrc,
+            'edgeDst': self.edgeDst,
+            'edgeResistance': self.edgeResistance,
+            'inEdgeOrder': self.inEdgeOrder,
+            'method': self.method,
+            'cache_size': self.shortestPathTree.cache_info().maxsize,
+            'errTol': self.errTol,
+            'maxSteps': self.maxSteps,
+            'maxOuterSteps': self.maxOuterSteps
+        }
 
-    def precalculate_distance(self) -> dict[tuple[str, str], float]:
+    def precalculate_distance(self, max_workers: Optional[int]=None, path: Optional[str]=None) -> None:
         """
         Precalculate the shortest path distances between all pairs of nodes.
-        
-        This method computes the shortest path length between all pairs of nodes
-        in the network and stores them in a dictionary for quick access.
-        If no path exists between two nodes, the distance is set to infinity.
+
+        One single-source Dijkstra search is run from each node, on the resistances of
+        the edges, by chunks of `DIJKSTRA_CHUNK_SIZE` sources, in the calling process unless
+        `max_workers` asks for a pool of processes. The distances are stored in the array
+        `distances`, with `distances[i, j]` the distance from the node of index i to the node
+        of index j in `nodeindex`, and infinity if there is no path.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            The number of processes. If None or 1, the searches are run in the calling
+            process, which is faster unless the graph has many thousands of nodes, as a pool
+            pays for starting the processes and copying the graph to each of them. Graphs of
+            at most one chunk of nodes are always processed in the calling process.
+            Default is None.
+        path : str, optional
+            If given, the distances are written to a memory-mapped .npy file at this path,
+            instead of being held in memory. Default is None.
         """
-        self.distance_matrix = {}
-        for person1, person2 in product(self.wordNet.nodes(), self.wordNet.nodes()):
-            try:
-                self.distance_matrix[(person1, person2)] = float(nx.shortest_path_length(self.wordNet, person1, person2, weight='weight'))
-            except nx.exception.NetworkXNoPath:
-                self.distance_matrix[(person1, person2)] = float('inf')
+        nbnodes = len(self.nodeindex)
+        if path is None:
+            self.distances = np.empty((nbnodes, nbnodes), dtype=np.float64)
+        else:
+            self.distances = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(nbnodes, nbnodes))
+        chunks = [np.arange(start, min(start + DIJKSTRA_CHUNK_SIZE, nbnodes))
+                  for start in range(0, nbnodes, DIJKSTRA_CHUNK_SIZE)]
+
+        if len(chunks) <= 1 or max_workers is None or max_workers <= 1:
+            for sources in chunks:
+                self.distances[sources] = dijkstra(self.resistanceMatrix, directed=True, indices=sources)
+        else:
+            graph = (self.resistanceMatrix.data, self.resistanceMatrix.indices, self.resistanceMatrix.indptr)
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_initDijkstraWorker, initargs=graph) as executor:
+                for sources, rows in zip(chunks, executor.map(_dijkstraRows, chunks)):
+                    self.distances[sources] = rows
+        if path is not None:
+            self.distances.flush()
+
+    @property
+    def distance_matrix(self) -> Mapping[tuple[str, str], float]:
+        """
+        The precalculated shortest path distances, keyed by the pairs of people, as in
+        `distance_matrix[(person1, person2)]`. It is a read-only view of `distances`,
+        kept for compatibility.
+
+        Raises
+        ------
+        AttributeError
+            If the distances are not precalculated.
+        """
+        if not hasattr(self, 'distances'):
+            raise AttributeError("The distances are not precalculated: call precalculate_distance first.")
+        return _DistanceMapping(self.nodeindex, self.distances)
 
     def constructSocialNetwork(self, nodes: list[str], edges: list[tuple[str, str, float]]) -> None:
         """
@@ -92,7 +395,174 @@ class SocialNetworkSimVoltage:
         self.wordNet = nx.DiGraph()
         self.wordNet.add_nodes_from(nodes)
         self.wordNet.add_weighted_edges_from(edges)
-        
+        self.nodeindex = NodeIndex(self.wordNet.nodes())
+
+        # the edges grouped by source, each in the order of the successors in networkx,
+        # i.e., the CSR arrays of the conductance matrix G, with G[i, j] for the edge from i to j
+        nbnodes = len(self.nodeindex)
+        nbedges = self.wordNet.number_of_edges()
+        self.edgeSrc = np.fromiter((self.nodeindex[node1] for node1, _ in self.wordNet.edges()),
+                                   dtype=np.int64, count=nbedges)
+        self.edgeDst = np.fromiter((self.nodeindex[node2] for _, node2 in self.wordNet.edges()),
+                                   dtype=np.int64, count=nbedges)
+        self.edgeResistance = np.fromiter((weight for _, _, weight in self.wordNet.edges(data='weight')),
+                                          dtype=np.float64, count=nbedges)
+        # the positions of the edges grouped by target, each in the order of the predecessors in networkx,
+        # so that currents are summed in the same order as by compute_incurrent and average_VR
+        inSrc = np.fromiter((self.nodeindex[node1] for node1, _ in self.wordNet.in_edges()),
+                            dtype=np.int64, count=nbedges)
+        inDst = np.fromiter((self.nodeindex[node2] for _, node2 in self.wordNet.in_edges()),
+                            dtype=np.int64, count=nbedges)
+        edgekeys = self.edgeSrc * nbnodes + self.edgeDst
+        keyorder = np.argsort(edgekeys)
+        self.inEdgeOrder = keyorder[np.searchsorted(edgekeys[keyorder], inSrc * nbnodes + inDst)]
+        self.constructMatrices()
+
+    def constructMatrices(self) -> None:
+        """
+        Build the conductance and resistance matrices from the arrays of the edges.
+        """
+        nbnodes = len(self.nodeindex)
+        self.edgeConductance = 1. / self.edgeResistance
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(self.edgeSrc, minlength=nbnodes))])
+        self.conductanceMatrix = csr_array((self.edgeConductance, self.edgeDst, indptr), shape=(nbnodes, nbnodes))
+        # the weights of the shortest paths, forward and in the reverse graph
+        self.resistanceMatrix = csr_array((self.edgeResistance, self.edgeDst, indptr), shape=(nbnodes, nbnodes))
+        self.reverseResistanceMatrix = self.resistanceMatrix.T.tocsr()
+
+    def computeShortestPathTree(
+            self,
+            idx: int,
+            reverse: bool=False
+    ) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], Annotated[NDArray[np.int32], Literal["1D Array"]]]:
+        """
+        Compute the shortest path tree from a node, or to a node, with one Dijkstra search.
+
+        The trees are cached by `shortestPathTree`, which takes the same arguments.
+
+        Parameters
+        ----------
+        idx : int
+            The index of the root of the tree.
+        reverse : bool, optional
+            If True, the tree of the shortest paths to the root is computed, by searching
+            the reverse graph. Default is False.
+
+        Returns
+        -------
+        tuple
+            A tuple containing:
+            - distances (numpy.ndarray): The lengths of the shortest paths from the root
+              (or to the root), and infinity for the nodes not connected to it.
+            - predecessors (numpy.ndarray): The index of the parent of each node in the
+              tree, and -9999 for the root and the nodes not connected to it.
+        """
+        graph = self.reverseResistanceMatrix if reverse else self.resistanceMatrix
+        distances, predecessors = dijkstra(graph, directed=True, indices=idx, return_predecessors=True)
+        # the cached trees are shared by all the queries
+        distances.flags.writeable = False
+        predecessors.flags.writeable = False
+        return distances, predecessors
+
+    def queryDistances(
+            self,
+            idx1: int,
+            idx2: int
+    ) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], Annotated[NDArray[np.float64], Literal["1D Array"]]]:
+        """
+        Look up the distances from person1 to all nodes, and from all nodes to person2,
+        according to `precalculated_distance`.
+
+        Parameters
+        ----------
+        idx1 : int
+            The index of person1.
+        idx2 : int
+            The index of person2.
+
+        Returns
+        -------
+        tuple
+            A tuple containing:
+            - distFrom1 (numpy.ndarray): The distances from person1 to the nodes.
+            - distTo2 (numpy.ndarray): The distances from the nodes to person2.
+        """
+        if self.precalculated_distance is True:
+            return self.distances[idx1], self.distances[:, idx2]
+        (distFrom1, _), (distTo2, _) = self.queryShortestPathTrees(idx1, idx2)
+        return distFrom1, distTo2
+
+    def queryShortestPathTrees(
+            self,
+            idx1: int,
+            idx2: int
+    ) -> tuple[tuple[NDArray[np.float64], NDArray[np.int32]], tuple[NDArray[np.float64], NDArray[np.int32]]]:
+        """
+        Get the shortest path tree from person1 and the shortest path tree to person2,
+        from the cache in the "lazy" mode, and computed otherwise.
+
+        Parameters
+        ----------
+        idx1 : int
+            The index of person1.
+        idx2 : int
+            The index of person2.
+
+        Returns
+        -------
+        tuple
+            The trees from person1 and to person2, as returned by :meth:`computeShortestPathTree`.
+        """
+        if self.precalculated_distance == "lazy":
+            return self.shortestPathTree(idx1), self.shortestPathTree(idx2, reverse=True)
+        return self.computeShortestPathTree(idx1), self.computeShortestPathTree(idx2, reverse=True)
+
+    def irrelevantMask(
+            self,
+            idx1: int,
+            idx2: int,
+            trees: Optional[tuple[tuple[NDArray[np.float64], NDArray[np.int32]], tuple[NDArray[np.float64], NDArray[np.int32]]]]=None
+    ) -> Annotated[NDArray[np.bool_], Literal["1D Array"]]:
+        """
+        Find the people irrelevant for the path between person1 and person2, for all nodes at once.
+
+        As in :meth:`checkPersonIrrelevant`, a person is irrelevant if there is no path from
+        person1 to them or from them to person2, or if the shortest path from person1 to them
+        and the shortest path from them to person2 share any other node. The shortest paths
+        are read from the tree from person1 and the tree to person2: each node of the path to
+        person2 is checked for being an ancestor in the tree from person1, with the preorder
+        intervals of :func:`PreorderIntervals`, one step along the paths of all nodes at a time.
+
+        Parameters
+        ----------
+        idx1 : int
+            The index of person1.
+        idx2 : int
+            The index of person2.
+        trees : tuple, optional
+            The trees from person1 and to person2, as returned by :meth:`queryShortestPathTrees`.
+            If None, they are queried. Default is None.
+
+        Returns
+        -------
+        numpy.ndarray
+            A boolean mask of the irrelevant people, in the order of `nodeindex`.
+        """
+        if trees is None:
+            trees = self.queryShortestPathTrees(idx1, idx2)
+        (distFrom1, predFrom1), (distTo2, predTo2) = trees
+        start, end = PreorderIntervals(predFrom1, idx1)
+        irrelevant = np.isinf(distFrom1) | np.isinf(distTo2)
+        nodes = np.flatnonzero(~irrelevant)
+        pathnodes = predTo2[nodes]
+        while len(nodes) > 0:
+            onpath = pathnodes >= 0
+            nodes, pathnodes = nodes[onpath], pathnodes[onpath]
+            shared = (start[pathnodes] <= start[nodes]) & (start[nodes] < end[pathnodes])
+            irrelevant[nodes[shared]] = True
+            nodes, pathnodes = nodes[~shared], predTo2[pathnodes[~shared]]
+        return irrelevant
+
     def checkPersonIrrelevant(self, person: str, person1: str, person2: str) -> bool:
         """
         Check if a person is irrelevant for the path between two other people.
@@ -132,7 +602,8 @@ class SocialNetworkSimVoltage:
         
         This method sets initial voltage values for each node based on their
         distance from person1 and person2. Person1 is set to 1.0V, person2 to 0.0V,
-        and other nodes are assigned values based on their relative distances.
+        irrelevant nodes (see :meth:`irrelevantMask`) to 10.0V, and other nodes are
+        assigned values based on their relative distances.
         
         Parameters
         ----------
@@ -146,25 +617,43 @@ class SocialNetworkSimVoltage:
         dict
             A dictionary mapping node identifiers to their initial voltage values.
         """
-        volDict = {}
-        for node in self.wordNet:
-            if node == person1:
-                volDict[node] = 1.0
-                continue
-            elif node == person2:
-                volDict[node] = 0.0
-                continue
-            elif self.checkPersonIrrelevant(node, person1, person2):
-                volDict[node] = 10.0
-                continue
-            if self.precalculated_distance:
-                distFrom1 = self.distance_matrix[person1, node]
-                distFrom2 = self.distance_matrix[node, person2]
-            else:
-                distFrom1 = float(nx.shortest_path_length(self.wordNet, person1, node, weight='weight'))
-                distFrom2 = float(nx.shortest_path_length(self.wordNet, node, person2, weight='weight'))
-            volDict[node] = distFrom2 / (distFrom1 + distFrom2)
-        return volDict
+        idx1, idx2 = self.nodeindex[person1], self.nodeindex[person2]
+        return dict(zip(self.nodeindex.nodelist, self.initialVoltages(idx1, idx2).tolist()))
+
+    def initialVoltages(
+            self,
+            idx1: int,
+            idx2: int,
+            trees: Optional[tuple[tuple[NDArray[np.float64], NDArray[np.int32]], tuple[NDArray[np.float64], NDArray[np.int32]]]]=None
+    ) -> Annotated[NDArray[np.float64], Literal["1D Array"]]:
+        """
+        Initialize the voltages of all nodes, as :meth:`initloop`, for people given by their indices.
+
+        Parameters
+        ----------
+        idx1 : int
+            The index of the person at 1.0V potential.
+        idx2 : int
+            The index of the person at 0.0V potential.
+        trees : tuple, optional
+            The trees from person1 and to person2, as returned by :meth:`queryShortestPathTrees`,
+            which give both the distances and the irrelevant people. If None, they are
+            queried. Default is None.
+
+        Returns
+        -------
+        numpy.ndarray
+            The initial voltages, in the order of `nodeindex`.
+        """
+        if trees is None:
+            trees = self.queryShortestPathTrees(idx1, idx2)
+        (distFrom1, _), (distTo2, _) = trees
+        with np.errstate(divide='ignore', invalid='ignore'):
+            voltages = distTo2 / (distFrom1 + distTo2)
+        voltages[self.irrelevantMask(idx1, idx2, trees=trees)] = 10.0
+        voltages[idx2] = 0.0
+        voltages[idx1] = 1.0
+        return voltages
 
     def compute_incurrent(self, node: str, volDict: dict[str, float]) -> float:
         """
@@ -256,6 +745,202 @@ class SocialNetworkSimVoltage:
                 numRecR += 1. / resEdge
         return sumVOverR, numRecR
 
+    def jacobiSweep(
+            self,
+            voltages: Annotated[NDArray[np.float64], Literal["1D Array"]],
+            idx1: int,
+            idx2: int
+    ) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], bool]:
+        """
+        Update the potentials of all nodes once, from the potentials of the previous sweep.
+
+        This is the array version of the loop over nodes calling :meth:`compute_incurrent`,
+        :meth:`compute_outcurrent` and :meth:`average_VR`: only the currents flowing downhill
+        from nodes at a potential between 0.0V and 1.0V are counted, and every node whose
+        incoming and outgoing currents differ by more than `errTol` is set to the
+        conductance-weighted average of the potentials of its counted neighbors.
+
+        Parameters
+        ----------
+        voltages : numpy.ndarray
+            The potentials of the nodes, in the order of `nodeindex`.
+        idx1 : int
+            The index of the person at 1.0V potential.
+        idx2 : int
+            The index of the person at 0.0V potential.
+
+        Returns
+        -------
+        tuple
+            A tuple containing:
+            - voltages (numpy.ndarray): The updated potentials.
+            - converged (bool): Whether the currents were balanced at all nodes.
+        """
+        nbnodes = len(voltages)
+        srcvol = voltages[self.edgeSrc]
+        dstvol = voltages[self.edgeDst]
+        downhill = srcvol > dstvol
+        # current into the target of the edge, counted if its source is in [0, 1],
+        # and current out of the source of the edge, counted if its target is in [0, 1]
+        inedges = self.inEdgeOrder[(downhill & (srcvol >= 0.0) & (srcvol <= 1.0))[self.inEdgeOrder]]
+        outedges = np.flatnonzero(downhill & (dstvol >= 0.0) & (dstvol <= 1.0))
+        indst, outsrc = self.edgeDst[inedges], self.edgeSrc[outedges]
+
+        in_current = np.bincount(indst, weights=(srcvol[inedges] - dstvol[inedges]) / self.edgeResistance[inedges],
+                                 minlength=nbnodes)
+        out_current = np.bincount(outsrc, weights=(srcvol[outedges] - dstvol[outedges]) / self.edgeResistance[outedges],
+                                  minlength=nbnodes)
+        # contributions of the predecessors first, then of the successors, as in average_VR
+        bins = np.concatenate([indst, outsrc])
+        sumVOverR = np.bincount(bins, weights=np.concatenate([srcvol[inedges] / self.edgeResistance[inedges],
+                                                              dstvol[outedges] / self.edgeResistance[outedges]]),
+                                minlength=nbnodes)
+        numRecR = np.bincount(bins, weights=np.concatenate([self.edgeConductance[inedges],
+                                                            self.edgeConductance[outedges]]),
+                              minlength=nbnodes)
+
+        outofrange = (voltages < 0.0) | (voltages > 1.0)
+        unbalanced = (np.abs(in_current - out_current) > self.errTol) & ~outofrange
+        unbalanced[[idx1, idx2]] = False
+        newvoltages = voltages.copy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newvoltages[unbalanced] = np.where(numRecR[unbalanced] == 0, 0.0,
+                                               sumVOverR[unbalanced] / numRecR[unbalanced])
+        newvoltages[outofrange] = 10.0
+        newvoltages[idx1] = 1.0
+        newvoltages[idx2] = 0.0
+        return newvoltages, not np.any(unbalanced)
+
+    def solveVoltagesDirect(
+            self,
+            voltages: Annotated[NDArray[np.float64], Literal["1D Array"]],
+            idx1: int,
+            idx2: int,
+            printVol: bool=False
+    ) -> Annotated[NDArray[np.float64], Literal["1D Array"]]:
+        """
+        Compute the potentials by solving the current balance equations directly.
+
+        The filtering rules of the relaxation are kept: nodes outside [0.0V, 1.0V], such as
+        irrelevant nodes, are pinned at 10.0V and carry no current, and an edge only conducts
+        if it runs downhill. For a fixed set of conducting edges, the balance of the currents
+        at every other node is a linear system, solved with a sparse LU factorization. As
+        the solution may change which edges run downhill, the set of conducting edges is
+        updated and the system solved again, for at most `maxOuterSteps` passes, until the
+        set does not change. The set may cycle instead; the passes then stop when a set comes
+        back, and the potentials of the last pass are settled by the relaxation
+        (see :meth:`relaxVoltages`).
+
+        Nodes with no conducting edge keep their potentials, as by the relaxation, which finds
+        no current into or out of them. Nodes connected through conducting edges to neither
+        person1 nor person2 are set to the average potential of their component, where no
+        current flows.
+
+        Parameters
+        ----------
+        voltages : numpy.ndarray
+            The initial potentials of the nodes, in the order of `nodeindex`.
+        idx1 : int
+            The index of the person at 1.0V potential.
+        idx2 : int
+            The index of the person at 0.0V potential.
+        printVol : bool, optional
+            Whether to print the potentials after each pass. Default is False.
+
+        Returns
+        -------
+        numpy.ndarray
+            The potentials of the nodes.
+        """
+        nbnodes = len(voltages)
+        voltages = voltages.copy()
+        active = (voltages >= 0.0) & (voltages <= 1.0)
+        voltages[~active] = 10.0
+        voltages[idx1], voltages[idx2] = 1.0, 0.0
+        fixed = ~active
+        fixed[[idx1, idx2]] = True
+
+        seen = set()
+        previous = None
+        stable = False
+        for _ in range(self.maxOuterSteps):
+            # an edge between nodes at equal potentials carries no current, but may once the
+            # potentials are solved, so it is kept in the system
+            conducting = (voltages[self.edgeSrc] >= voltages[self.edgeDst]) \
+                & active[self.edgeSrc] & active[self.edgeDst]
+            # a set seen before is either the solution or the start of a cycle
+            key = np.packbits(conducting).tobytes()
+            if key in seen:
+                stable = (key == previous)
+                break
+            seen.add(key)
+            previous = key
+
+            # symmetric conductances of the conducting edges, and the Laplacian they make
+            src, dst = self.edgeSrc[conducting], self.edgeDst[conducting]
+            conductance = self.edgeConductance[conducting]
+            G = csr_array((np.concatenate([conductance, conductance]),
+                           (np.concatenate([src, dst]), np.concatenate([dst, src]))),
+                          shape=(nbnodes, nbnodes))
+            degrees = G.sum(axis=1)
+
+            _, components = connected_components(G, directed=False)
+            grounded = np.zeros(np.max(components) + 1, dtype=bool)
+            grounded[components[[idx1, idx2]]] = True
+            free = ~fixed & (degrees > 0) & grounded[components]
+            # a component reaching neither person carries no current only at a single potential
+            floating = ~fixed & (degrees > 0) & ~grounded[components]
+            if np.any(floating):
+                weights = np.bincount(components[floating], weights=degrees[floating])
+                means = np.bincount(components[floating], weights=(degrees * voltages)[floating])
+                voltages[floating] = means[components[floating]] / weights[components[floating]]
+            if np.any(free):
+                laplacian = (diags_array(degrees) - G)[free][:, free]
+                rhs = G[free][:, ~free] @ voltages[~free]
+                voltages[free] = splu(laplacian.tocsc()).solve(rhs)
+            if printVol:
+                print(dict(zip(self.nodeindex.nodelist, voltages.tolist())))
+        if not stable:
+            # the sets cycle, or the passes ran out: the relaxation settles the last potentials
+            voltages = self.relaxVoltages(voltages, idx1, idx2, printVol=printVol)
+        return voltages
+
+    def relaxVoltages(
+            self,
+            voltages: Annotated[NDArray[np.float64], Literal["1D Array"]],
+            idx1: int,
+            idx2: int,
+            printVol: bool=False
+    ) -> Annotated[NDArray[np.float64], Literal["1D Array"]]:
+        """
+        Compute the potentials with the relaxation, i.e., Jacobi sweeps (see :meth:`jacobiSweep`)
+        until the currents are balanced, or for at most `maxSteps` sweeps.
+
+        Parameters
+        ----------
+        voltages : numpy.ndarray
+            The initial potentials of the nodes, in the order of `nodeindex`.
+        idx1 : int
+            The index of the person at 1.0V potential.
+        idx2 : int
+            The index of the person at 0.0V potential.
+        printVol : bool, optional
+            Whether to print the potentials after each sweep. Default is False.
+
+        Returns
+        -------
+        numpy.ndarray
+            The potentials of the nodes.
+        """
+        converged = False
+        step = 0
+        while (not converged) and step < self.maxSteps:
+            voltages, converged = self.jacobiSweep(voltages, idx1, idx2)
+            step += 1
+            if printVol:
+                print(dict(zip(self.nodeindex.nodelist, voltages.tolist())))
+        return voltages
+
     def getResistance(self, person1: str, person2: str, printVol: bool=False) -> float:
         """
         Compute the resistance distance between two people in the social network.
@@ -279,57 +964,219 @@ class SocialNetworkSimVoltage:
         """
         if person1 == person2:
             return 0.0
-        if self.precalculated_distance:
-            if self.distance_matrix[(person1, person2)] == float('inf'):
-                return float('inf')
-        else:
-            try:
-                distTwoWords = nx.shortest_path_length(self.wordNet, person1, person2, weight='weight')
-            except nx.exception.NetworkXNoPath:
-                return float('inf')
+        return self.resistanceFromIndices(self.nodeindex[person1], self.nodeindex[person2], printVol=printVol)
+
+    def resistanceFromIndices(self, idx1: int, idx2: int, printVol: bool=False) -> float:
+        """
+        Compute the resistance distance between two people given by their indices.
+
+        Parameters
+        ----------
+        idx1 : int
+            The index of the first person (at 1.0V potential).
+        idx2 : int
+            The index of the second person (at 0.0V potential).
+        printVol : bool, optional
+            Whether to print voltage values during iteration. Default is False.
+
+        Returns
+        -------
+        float
+            The resistance distance between the two people.
+        """
+        if idx1 == idx2:
+            return 0.0
+        # the two shortest path trees of the query, searched once
+        trees = self.queryShortestPathTrees(idx1, idx2)
+        if trees[0][0][idx2] == np.inf:
+            return float('inf')
 
         # initialization
-        volDict = self.initloop(person1, person2)
+        voltages = self.initialVoltages(idx1, idx2, trees=trees)
         if printVol:
-            print(volDict)
-        tempVolDict = {node: volDict[node] for node in self.wordNet}
+            print(dict(zip(self.nodeindex.nodelist, voltages.tolist())))
 
         # iteration: computing the potential of each node
-        converged = False
-        step = 0
-        while (not converged) and step < self.maxSteps:
-            tempConverged = True
-            for node in self.wordNet:
-                if node == person1:
-                    tempVolDict[node] = 1.0
-                    continue
-                elif node == person2:
-                    tempVolDict[node] = 0.0
-                    continue
-                elif (volDict[node] < 0.0) or (volDict[node] > 1.0):
-                    tempVolDict[node] = 10.0
-                    continue
-                in_current = self.compute_incurrent(node, volDict)
-                out_current = self.compute_outcurrent(node, volDict)
-                if abs(in_current - out_current) > self.errTol:
-                    sumVOverR, numRecR = self.average_VR(node, volDict)
-                    tempVolDict[node] = 0.0 if numRecR==0 else sumVOverR / numRecR
-                    tempConverged = False
-                else:
-                    tempConverged = tempConverged and True
-            converged = tempConverged
-            # value update
-            for node in self.wordNet:
-                volDict[node] = tempVolDict[node]
-            step += 1
-            if printVol:
-                print(volDict)
+        if self.method == "direct":
+            voltages = self.solveVoltagesDirect(voltages, idx1, idx2, printVol=printVol)
+        else:
+            voltages = self.relaxVoltages(voltages, idx1, idx2, printVol=printVol)
 
         # calculating the resistance
-        startCurrent = sum([(1.0-volDict[rootsucc])/self.wordNet[person1][rootsucc]['weight']
-                            for rootsucc in self.wordNet.successors(person1) if volDict[rootsucc]<=1.0])
+        start, end = self.conductanceMatrix.indptr[idx1], self.conductanceMatrix.indptr[idx1 + 1]
+        succvol = voltages[self.edgeDst[start:end]]
+        counted = succvol <= 1.0
+        startCurrent = sum(((1.0 - succvol[counted]) / self.edgeResistance[start:end][counted]).tolist())
         return (1.0 / startCurrent)
-                                
+
+    def getResistances(
+            self,
+            persons1: Union[Iterable[str], Annotated[NDArray[np.int64], Literal["1D Array"]]],
+            persons2: Union[Iterable[str], Annotated[NDArray[np.int64], Literal["1D Array"]]],
+            indices: bool=False
+    ) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], Annotated[NDArray[np.bool_], Literal["1D Array"]]]:
+        """
+        Compute the resistance distances between many pairs of people.
+
+        The pairs are looked up at once, and the pairs with unknown people are flagged in
+        a mask instead of raising exceptions. Each valid pair is then simulated by
+        :meth:`resistanceFromIndices`.
+
+        Parameters
+        ----------
+        persons1 : Iterable or numpy.ndarray
+            The first people of the pairs (at 1.0V potential).
+        persons2 : Iterable or numpy.ndarray
+            The second people of the pairs (at 0.0V potential), of the same length as `persons1`.
+        indices : bool, optional
+            If True, the people are given by their indices in the order of the nodes of
+            the network, instead of their identifiers. Default is False.
+
+        Returns
+        -------
+        tuple
+            A tuple containing:
+            - resistances (numpy.ndarray): The resistance distances, and NaN for the pairs
+              with an unknown person.
+            - found (numpy.ndarray): A boolean mask of the pairs whose people are both known.
+        """
+        if indices:
+            idx0, idx1 = np.asarray(persons1, dtype=np.int64), np.asarray(persons2, dtype=np.int64)
+            nbnodes = len(self.nodeindex)
+            found0 = (idx0 >= 0) & (idx0 < nbnodes)
+            found1 = (idx1 >= 0) & (idx1 < nbnodes)
+        else:
+            idx0, found0 = self.nodeindex.indices(persons1)
+            idx1, found1 = self.nodeindex.indices(persons2)
+        if len(idx0) != len(idx1):
+            raise ValueError("persons1 and persons2 must have the same length.")
+        found = found0 & found1
+        resistances = np.full(len(idx0), np.nan)
+        for pairidx in np.flatnonzero(found).tolist():
+            resistances[pairidx] = self.resistanceFromIndices(int(idx0[pairidx]), int(idx1[pairidx]))
+        return resistances, found
+
+    def resistance_rows(
+            self,
+            sources: Optional[Iterable[str]]=None,
+            targets: Optional[Iterable[str]]=None,
+            max_workers: Optional[int]=None
+    ) -> Iterator[tuple[str, Annotated[NDArray[np.float64], Literal["1D Array"]]]]:
+        """
+        Compute the resistance distances from each source to all targets, on a pool of
+        processes, and yield each row as soon as it is computed.
+
+        The workers map the arrays of :meth:`arrayState` from temporary .npy files, and rebuild
+        the network with :meth:`fromArrays`, computing the shortest path trees in the "lazy"
+        mode, with a cache large enough to keep the trees to all the targets. As the rows come
+        in the order they finish, a long job can be checkpointed, and resumed on the sources
+        not done yet.
+
+        Parameters
+        ----------
+        sources : Iterable, optional
+            The people at 1.0V potential. If None, all the nodes. Default is None.
+        targets : Iterable, optional
+            The people at 0.0V potential. If None, all the nodes. Default is None.
+        max_workers : int, optional
+            The number of processes. If None, the default of
+            :class:`concurrent.futures.ProcessPoolExecutor` is used. If 1, the rows are
+            computed in the calling process. Default is None.
+
+        Yields
+        ------
+        tuple
+            A tuple containing:
+            - source (str): The source of the row.
+            - resistances (numpy.ndarray): The resistance distances from the source to the targets.
+
+        Raises
+        ------
+        ValueError
+            If a person is not in the network.
+        """
+        sources = list(dict.fromkeys(self.nodeindex.nodelist if sources is None else sources))
+        targets = self.nodeindex.nodelist if targets is None else list(targets)
+        sourceidx, sourcefound = self.nodeindex.indices(sources)
+        targetidx, targetfound = self.nodeindex.indices(targets)
+        if not np.all(sourcefound):
+            raise ValueError(f"Person {sources[np.argmin(sourcefound)]} is not in the network.")
+        if not np.all(targetfound):
+            raise ValueError(f"Person {targets[np.argmin(targetfound)]} is not in the network.")
+
+        if max_workers == 1:
+            for source, idx1 in zip(sources, sourceidx.tolist()):
+                yield source, np.array([self.resistanceFromIndices(idx1, idx2) for idx2 in targetidx.tolist()])
+            return
+        with tempfile.TemporaryDirectory() as directory:
+            state = self.arrayState()
+            state['cache_size'] = _rowsCacheSize(state['cache_size'], targetidx)
+            state, paths = _mapArrayState(state, directory)
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_initResistanceWorker,
+                                     initargs=(state, paths, targetidx)) as executor:
+                futures = {executor.submit(_resistanceRow, idx1): source
+                           for source, idx1 in zip(sources, sourceidx.tolist())}
+                try:
+                    for future in as_completed(futures):
+                        yield futures[future], future.result()
+                finally:
+                    # if the iteration is stopped early, the rows not started are dropped
+                    executor.shutdown(cancel_futures=True)
+
+    def resistance_matrix(
+            self,
+            sources: Optional[Iterable[str]]=None,
+            targets: Optional[Iterable[str]]=None,
+            max_workers: Optional[int]=None
+    ) -> Annotated[NDArray[np.float64], Literal["2D Array"]]:
+        """
+        Compute the resistance distances between sources and targets, on a pool of processes
+        (see :meth:`resistance_rows`).
+
+        Parameters
+        ----------
+        sources : Iterable, optional
+            The people at 1.0V potential. If None, all the nodes. Default is None.
+        targets : Iterable, optional
+            The people at 0.0V potential. If None, all the nodes. Default is None.
+        max_workers : int, optional
+            The number of processes. Default is None.
+
+        Returns
+        -------
+        numpy.ndarray
+            The matrix of the resistance distances, with one row per source and one column per target.
+
+        Raises
+        ------
+        ValueError
+            If a person is not in the network.
+        """
+        sources = self.nodeindex.nodelist if sources is None else list(sources)
+        targets = self.nodeindex.nodelist if targets is None else list(targets)
+        rows = dict(self.resistance_rows(sources, targets, max_workers=max_workers))
+        matrix = np.empty((len(sources), len(targets)))
+        for position, source in enumerate(sources):
+            matrix[position] = rows[source]
+        return matrix
+
+    def all_pairs_resistance(self, max_workers: Optional[int]=None) -> Annotated[NDArray[np.float64], Literal["2D Array"]]:
+        """
+        Compute the resistance distances between all pairs of nodes, on a pool of processes
+        (see :meth:`resistance_rows`).
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            The number of processes. Default is None.
+
+        Returns
+        -------
+        numpy.ndarray
+            The matrix of the resistance distances, in the order of `nodeindex`.
+        """
+        return self.resistance_matrix(max_workers=max_workers)
+
     def drawNetwork(self) -> None:
         """
         Draw the social network using NetworkX.
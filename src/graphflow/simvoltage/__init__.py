@@ -1,3 +1,4 @@
-
 from .resistancedist import GraphResistanceDistance
-from .SocialNetworkSimVoltage import SocialNetworkSimVoltage
\ No newline at end of file
+from .sparseresistance import SparseGraphResistanceDistance, ApproximateGraphResistanceDistance
+from .SocialNetworkSimVoltage import SocialNetworkSimVoltage
+from .service import ResistanceService
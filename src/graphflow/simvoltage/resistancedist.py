@@ -5,12 +5,18 @@ Get the resistance distance matrix of a simple undirected network.
 See: http://en.wikipedia.org/wiki/Resistance_distance
 '''
 
-from typing import Optional
+import json
+import os
+from typing import Annotated, Any, Iterable, Literal, Optional, Union
 
 import numpy as np
 import sparse
+from numpy.typing import DTypeLike, NDArray
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import connected_components
 
 from .exceptions import UnknownNodeException
+from ..results import NodeIndex
 
 
 DEFAULT_NODES = ['Stephen', 'Sinnie', 'Elaine']
@@ -25,28 +31,61 @@ class GraphResistanceDistance:
     This class calculates the resistance distance between all pairs of nodes
     in an undirected graph using the Moore-Penrose pseudoinverse of the Laplacian matrix.
     Resistance distance is a measure of how well-connected two nodes are in a network,
-    considering all possible paths between them.
+    considering all possible paths between them. Nodes in different connected components
+    are at an infinite distance, as with :class:`SparseGraphResistanceDistance`.
     
     See: http://en.wikipedia.org/wiki/Resistance_distance
     """
-    def __init__(self, nodes: list[str]=None, edges: Optional[list[tuple[str, str]]]=None):
+    def __init__(
+            self,
+            nodes: list[str]=None,
+            edges: Optional[list[Union[tuple[str, str], tuple[str, str, float]]]]=None,
+            dtype: DTypeLike=np.float64,
+            *,
+            src: Optional[Annotated[NDArray[np.int64], Literal["1D Array"]]]=None,
+            dst: Optional[Annotated[NDArray[np.int64], Literal["1D Array"]]]=None,
+            conductance: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+    ):
         """
         Initialize the GraphResistanceDistance class.
+
+        The graph is given either as a list of edges, or, for large graphs, as arrays of
+        node indices `src` and `dst`, with optional conductances.
         
         Parameters
         ----------
         nodes : list, optional
-            List of node identifiers. Default is ['Stephen', 'Sinnie', 'Elaine'].
+            List of node identifiers. Default is ['Stephen', 'Sinnie', 'Elaine'], or
+            0, ..., n-1 if `src` and `dst` are given.
         edges : list of tuples, optional
-            List of edges as tuples (node1, node2). Default is
-            [('Stephen', 'Sinnie'), ('Elaine', 'Sinnie'), ('Elaine', 'Stephen')].
+            List of edges as tuples (node1, node2), or (node1, node2, conductance).
+            Default is [('Stephen', 'Sinnie'), ('Elaine', 'Sinnie'), ('Elaine', 'Stephen')].
+        dtype : numpy.dtype, optional
+            The type of the stored resistance distances, e.g., numpy.float32 to halve
+            the memory of the matrix. Default is numpy.float64.
+        src : numpy.ndarray, optional
+            The indices in `nodes` of the first ends of the edges. Default is None.
+        dst : numpy.ndarray, optional
+            The indices in `nodes` of the second ends of the edges. Default is None.
+        conductance : numpy.ndarray, optional
+            The conductances of the edges given by `src` and `dst`, i.e., the inverse of
+            their resistances. If None, all are 1. Default is None.
         """
-        if nodes is None:
-            nodes = DEFAULT_NODES
-        if edges is None:
-            edges = DEFAULT_EDGES
-
-        self.initializeClass(nodes, edges)
+        self.dtype = dtype
+        if src is not None or dst is not None:
+            if src is None or dst is None:
+                raise ValueError("Both src and dst must be given.")
+            src = np.asarray(src, dtype=np.int64)
+            dst = np.asarray(dst, dtype=np.int64)
+            if nodes is None:
+                nodes = list(range(int(max(np.max(src, initial=-1), np.max(dst, initial=-1))) + 1))
+            self.initializeFromArrays(nodes, src, dst, conductance)
+        else:
+            if nodes is None:
+                nodes = DEFAULT_NODES
+            if edges is None:
+                edges = DEFAULT_EDGES
+            self.initializeClass(nodes, edges)
         self.Omega = self.computeResistanceDistance()
         
     def getResistance(self, node1: str, node2: str) -> float:
@@ -63,7 +102,8 @@ class GraphResistanceDistance:
         Returns
         -------
         float
-            The resistance distance between the two nodes.
+            The resistance distance between the two nodes, or infinity if they are
+            not connected.
         
         Raises
         ------
@@ -78,7 +118,187 @@ class GraphResistanceDistance:
             unknown_keys = [node for node in [node1, node2] if not node in self.nodesIdx]
             raise UnknownNodeException(unknown_keys)
     
-    def initializeClass(self, nodes: list[str], edges: list[tuple[str, str]]) -> None:
+    def save(self, path: str) -> None:
+        """
+        Save the precomputed distances to a directory, to be loaded by :meth:`load`.
+
+        The directory holds the node identifiers and the arrays of the class, each in a
+        NumPy .npy file, along with the parameters in meta.json.
+
+        Parameters
+        ----------
+        path : str
+            The directory. It is created if it does not exist.
+        """
+        os.makedirs(path, exist_ok=True)
+        nodes = self.nodeindex.nodes
+        np.save(os.path.join(path, 'nodes.npy'), nodes, allow_pickle=(nodes.dtype == object))
+        arrays = self.persistedArrays()
+        for name, array in arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), array)
+        meta = {
+            'class': type(self).__name__,
+            'pickled_nodes': bool(nodes.dtype == object),
+            'arrays': list(arrays.keys()),
+            'parameters': self.persistedParameters()
+        }
+        with open(os.path.join(path, 'meta.json'), 'w') as metafile:
+            json.dump(meta, metafile)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[Literal["r", "c"]]="r") -> 'GraphResistanceDistance':
+        """
+        Load distances saved by :meth:`save`, without recomputing them.
+
+        The arrays are memory-mapped, so that processes loading the same directory share
+        one copy in the page cache, and only the pages read are loaded.
+
+        Parameters
+        ----------
+        path : str
+            The directory.
+        mmap_mode : str, optional
+            The memory-map mode of :func:`numpy.load`: "r" for read-only, "c" for
+            copy-on-write, or None to read the arrays in memory. Default is "r".
+
+        Returns
+        -------
+        GraphResistanceDistance
+            The loaded instance, of the class it was saved from.
+
+        Raises
+        ------
+        ValueError
+            If the directory was saved from another class.
+        """
+        with open(os.path.join(path, 'meta.json'), 'r') as metafile:
+            meta = json.load(metafile)
+        if meta['class'] != cls.__name__:
+            raise ValueError(f"{path} holds a {meta['class']}, not a {cls.__name__}.")
+
+        distance = cls.__new__(cls)
+        for name, value in meta['parameters'].items():
+            setattr(distance, name, value)
+        nodes = np.load(os.path.join(path, 'nodes.npy'), allow_pickle=meta['pickled_nodes'])
+        distance.nodes = nodes.tolist()
+        distance.nodeindex = NodeIndex(distance.nodes)
+        distance.nodesIdx = distance.nodeindex.nodeidx
+        distance._edges = None
+        distance.Omega = None
+        for name in meta['arrays']:
+            setattr(distance, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode))
+        distance.restoreState()
+        return distance
+
+    def persistedArrays(self) -> dict[str, np.ndarray]:
+        """
+        Return the arrays saved by :meth:`save`, by attribute name.
+        """
+        return {'src': self.src, 'dst': self.dst, 'conductance': self.conductance, 'Omega': self.Omega}
+
+    def persistedParameters(self) -> dict[str, Any]:
+        """
+        Return the JSON-serializable parameters saved by :meth:`save`, by attribute name.
+        """
+        return {'dtype': np.dtype(self.dtype).str}
+
+    def restoreState(self) -> None:
+        """
+        Restore what was not saved, after the attributes are loaded by :meth:`load`.
+        """
+        self.dtype = np.dtype(self.dtype)
+
+    def getResistances(
+            self,
+            nodes1: Union[Iterable[str], Annotated[NDArray[np.int64], Literal["1D Array"]]],
+            nodes2: Union[Iterable[str], Annotated[NDArray[np.int64], Literal["1D Array"]]],
+            indices: bool=False
+    ) -> tuple[Annotated[NDArray[np.float64], Literal["1D Array"]], Annotated[NDArray[np.bool_], Literal["1D Array"]]]:
+        """
+        Get the resistance distances between many pairs of nodes at once.
+
+        Parameters
+        ----------
+        nodes1 : Iterable or numpy.ndarray
+            The first nodes of the pairs.
+        nodes2 : Iterable or numpy.ndarray
+            The second nodes of the pairs, of the same length as `nodes1`.
+        indices : bool, optional
+            If True, the nodes are given by their indices in `nodes` instead of their
+            identifiers. Default is False.
+
+        Returns
+        -------
+        tuple
+            A tuple containing:
+            - resistances (numpy.ndarray): The resistance distances, and NaN for the pairs
+              with an unknown node.
+            - found (numpy.ndarray): A boolean mask of the pairs whose nodes are both known.
+        """
+        idx0, found0 = self.resolveNodes(nodes1, indices)
+        idx1, found1 = self.resolveNodes(nodes2, indices)
+        if len(idx0) != len(idx1):
+            raise ValueError("nodes1 and nodes2 must have the same length.")
+        found = found0 & found1
+        resistances = np.full(len(idx0), np.nan)
+        resistances[found] = self.resistancesFromIndices(idx0[found], idx1[found])
+        return resistances, found
+
+    def resolveNodes(
+            self,
+            nodes: Union[Iterable[str], Annotated[NDArray[np.int64], Literal["1D Array"]]],
+            indices: bool=False
+    ) -> tuple[Annotated[NDArray[np.int64], Literal["1D Array"]], Annotated[NDArray[np.bool_], Literal["1D Array"]]]:
+        """
+        Map nodes to their indices, flagging the unknown ones.
+
+        Parameters
+        ----------
+        nodes : Iterable or numpy.ndarray
+            The node identifiers, or their indices if `indices` is True.
+        indices : bool, optional
+            Whether the nodes are given by their indices. Default is False.
+
+        Returns
+        -------
+        tuple
+            A tuple containing:
+            - indices (numpy.ndarray): The indices of the nodes, and 0 for unknown nodes.
+            - found (numpy.ndarray): A boolean mask of the known nodes.
+        """
+        if not indices:
+            return self.nodeindex.indices(nodes)
+        idx = np.asarray(nodes, dtype=np.int64)
+        found = (idx >= 0) & (idx < len(self.nodes))
+        return np.where(found, idx, 0), found
+
+    def resistancesFromIndices(
+            self,
+            idx0: Annotated[NDArray[np.int64], Literal["1D Array"]],
+            idx1: Annotated[NDArray[np.int64], Literal["1D Array"]]
+    ) -> Annotated[NDArray[np.float64], Literal["1D Array"]]:
+        """
+        Get the resistance distances between pairs of nodes given by valid indices.
+
+        Parameters
+        ----------
+        idx0 : numpy.ndarray
+            The indices of the first nodes of the pairs.
+        idx1 : numpy.ndarray
+            The indices of the second nodes of the pairs.
+
+        Returns
+        -------
+        numpy.ndarray
+            The resistance distances.
+        """
+        return np.asarray(self.Omega[idx0, idx1], dtype=np.float64)
+
+    def initializeClass(
+            self,
+            nodes: list[str],
+            edges: list[Union[tuple[str, str], tuple[str, str, float]]]
+    ) -> None:
         """
         Initialize the class with nodes and edges.
         
@@ -87,70 +307,144 @@ class GraphResistanceDistance:
         nodes : list[str]
             List of node identifiers.
         edges : list of tuples
-            List of edges as tuples (node1, node2).
+            List of edges as tuples (node1, node2), or (node1, node2, conductance).
+        """
+        nodesIdx = {node: idx for idx, node in enumerate(nodes)}
+        src = np.fromiter((nodesIdx[edge[0]] for edge in edges), dtype=np.int64, count=len(edges))
+        dst = np.fromiter((nodesIdx[edge[1]] for edge in edges), dtype=np.int64, count=len(edges))
+        conductance = np.fromiter((edge[2] if len(edge) > 2 else 1. for edge in edges),
+                                  dtype=np.float64, count=len(edges))
+        self.initializeFromArrays(nodes, src, dst, conductance)
+
+    def initializeFromArrays(
+            self,
+            nodes: list[str],
+            src: Annotated[NDArray[np.int64], Literal["1D Array"]],
+            dst: Annotated[NDArray[np.int64], Literal["1D Array"]],
+            conductance: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+    ) -> None:
+        """
+        Initialize the class with nodes and arrays of edges.
+
+        The edges are undirected: an edge given several times, in either direction, is
+        kept once, with the conductance of its first occurrence. Self-loops are dropped,
+        as no current flows through them.
+
+        Parameters
+        ----------
+        nodes : list[str]
+            List of node identifiers.
+        src : numpy.ndarray
+            The indices in `nodes` of the first ends of the edges.
+        dst : numpy.ndarray
+            The indices in `nodes` of the second ends of the edges.
+        conductance : numpy.ndarray, optional
+            The conductances of the edges. If None, all are 1. Default is None.
         """
         self.nodes = nodes
-        # all edges are unique
-        self.edges = list(set([tuple(sorted(edge)) for edge in edges]))
-        self.nodesIdx = {self.nodes[idx]: idx for idx in range(len(self.nodes))}
+        self.nodeindex = NodeIndex(self.nodes)
+        self.nodesIdx = self.nodeindex.nodeidx
+        nbnodes = len(self.nodes)
+        if conductance is None:
+            conductance = np.ones(len(src))
+        conductance = np.asarray(conductance, dtype=np.float64)
+
+        # all edges are unique: each is keyed by its ends in increasing order
+        low, high = np.minimum(src, dst), np.maximum(src, dst)
+        keep = low != high
+        low, high, conductance = low[keep], high[keep], conductance[keep]
+        _, first = np.unique(low * nbnodes + high, return_index=True)
+        self.src = low[first]
+        self.dst = high[first]
+        self.conductance = conductance[first]
+        self._edges = None
+
+    @property
+    def edges(self) -> list[tuple[str, str]]:
+        """
+        The list of unique edges, as tuples (node1, node2), built on first access.
+        """
+        if self._edges is None:
+            self._edges = [(self.nodes[idx0], self.nodes[idx1]) for idx0, idx1 in zip(self.src.tolist(), self.dst.tolist())]
+        return self._edges
 
     def calculateDegreeMatrix(self) -> sparse.SparseArray:
         """
         Calculate the degree matrix of the graph.
         
         The degree matrix is a diagonal matrix where each diagonal entry
-        represents the degree of the corresponding node (number of edges connected to it).
+        represents the degree of the corresponding node, i.e., the total conductance
+        of the edges connected to it.
         
         Returns
         -------
         sparse.SparseArray
-            The degree matrix as a sparse DOK (Dictionary of Keys) matrix.
-        """
-        Dmatrix = sparse.DOK((len(self.nodes), len(self.nodes)))
-        for edge in self.edges:
-            for node in edge:
-                idx = self.nodesIdx[node]
-                Dmatrix[idx, idx] += 1
-        return Dmatrix
+            The degree matrix as a sparse COO (Coordinate) matrix.
+        """
+        nbnodes = len(self.nodes)
+        degrees = np.bincount(self.src, weights=self.conductance, minlength=nbnodes) \
+            + np.bincount(self.dst, weights=self.conductance, minlength=nbnodes)
+        diagonal = np.arange(nbnodes)
+        return sparse.COO(np.stack([diagonal, diagonal]), degrees, shape=(nbnodes, nbnodes))
         
     def calculateAdjacencyMatrix(self) -> sparse.SparseArray:
         """
         Calculate the adjacency matrix of the graph.
         
         The adjacency matrix is a square matrix where the entry at position (i, j)
-        is 1 if there is an edge between nodes i and j, and 0 otherwise.
+        is the conductance of the edge between nodes i and j, and 0 if there is none.
         
         Returns
         -------
         sparse.SparseArray
-            The adjacency matrix as a sparse DOK (Dictionary of Keys) matrix.
-        """
-        Amatrix = sparse.DOK((len(self.nodes), len(self.nodes)))
-        for edge in self.edges:
-            idx0 = self.nodesIdx[edge[0]]
-            idx1 = self.nodesIdx[edge[1]]
-            Amatrix[idx0, idx1] = 1
-            Amatrix[idx1, idx0] = 1
-        return Amatrix
+            The adjacency matrix as a sparse COO (Coordinate) matrix.
+        """
+        nbnodes = len(self.nodes)
+        coords = np.stack([np.concatenate([self.src, self.dst]), np.concatenate([self.dst, self.src])])
+        return sparse.COO(coords, np.concatenate([self.conductance, self.conductance]), shape=(nbnodes, nbnodes))
         
-    def computeResistanceDistance(self) -> sparse.SparseArray:
+    def calculateLaplacianMatrix(self) -> csr_array:
+        """
+        Calculate the Laplacian matrix of the graph, D - A, in the CSR format of SciPy.
+
+        Returns
+        -------
+        scipy.sparse.csr_array
+            The Laplacian matrix.
+        """
+        nbnodes = len(self.nodes)
+        degrees = np.bincount(self.src, weights=self.conductance, minlength=nbnodes) \
+            + np.bincount(self.dst, weights=self.conductance, minlength=nbnodes)
+        rows = np.concatenate([self.src, self.dst, np.arange(nbnodes)])
+        cols = np.concatenate([self.dst, self.src, np.arange(nbnodes)])
+        data = np.concatenate([-self.conductance, -self.conductance, degrees])
+        return csr_array((data, (rows, cols)), shape=(nbnodes, nbnodes))
+
+    def computeResistanceDistance(self) -> Annotated[NDArray[np.float64], Literal["2D Array"]]:
         """
         Compute the resistance distance matrix for the graph.
         
         This method calculates the resistance distance between all pairs of nodes
-        using the Moore-Penrose pseudoinverse of the Laplacian matrix.
+        using the Moore-Penrose pseudoinverse of the Laplacian matrix, Lambda, as
+        Lambda[i, i] + Lambda[j, j] - 2 * Lambda[i, j], computed for all pairs at once.
+        The pseudoinverse is block diagonal over the connected components, where the
+        formula holds, and the distances between components are set to infinity.
         
         Returns
         -------
-        sparse.SparseArray
-            The resistance distance matrix as a sparse DOK matrix.
-        """
-        Dmatrix = self.calculateDegreeMatrix()
-        Amatrix = self.calculateAdjacencyMatrix()
-        Lmatrix = Dmatrix - Amatrix
-        Lambda = np.linalg.pinv(Lmatrix.todense())
-        Omega = sparse.DOK((len(self.nodes), len(self.nodes)))
-        for i in range(len(self.nodes)):
-            for j in range(len(self.nodes)):
-                Omega[i, j] = Lambda[i, i] + Lambda[j, j] - 2 * Lambda[i, j]
-        return Omega
+        numpy.ndarray
+            The resistance distance matrix, as a contiguous array of type `dtype`.
+        """
+        Lmatrix = self.calculateLaplacianMatrix()
+        Lambda = np.linalg.pinv(Lmatrix.toarray(), hermitian=True)
+        diagonal = np.diagonal(Lambda).copy()
+        # computed in place, to hold no more than one n x n temporary
+        Omega = Lambda
+        Omega *= -2
+        Omega += diagonal[:, None]
+        Omega += diagonal[None, :]
+        nbcomponents, components = connected_components(Lmatrix, directed=False)
+        if nbcomponents > 1:
+            for component in range(nbcomponents):
+                Omega[np.ix_(components == component, components != component)] = np.inf
+        return np.ascontiguousarray(Omega, dtype=self.dtype)
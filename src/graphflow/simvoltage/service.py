@@ -0,0 +1,267 @@
+
+'''
+Asynchronous front end answering a stream of resistance queries on one network.
+
+The pairs are submitted to a bounded queue, gathered into batches, and the pairs of
+a batch sharing a person are sent together to a pool of processes, where the shortest
+path tree of the shared person is computed once. The results are read from an
+asynchronous iterator, whose queue is bounded too, so that a slow consumer holds
+back the producers.
+'''
+
+import asyncio
+import os
+import tempfile
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Annotated, Literal, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from .SocialNetworkSimVoltage import SocialNetworkSimVoltage, _mapArrayState, _initResistanceWorker, \
+    _resistancePairs
+
+
+# end of the pairs, and end of the results
+_CLOSED = object()
+
+
+class _Failure:
+    # an exception raised by a worker, handed over to the consumer of the results
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+class ResistanceService:
+    """
+    Answer a stream of resistance queries on a long-lived :class:`SocialNetworkSimVoltage`.
+
+    Examples
+    --------
+    >>> async with ResistanceService(network) as service:
+    ...     async def produce():
+    ...         for person1, person2 in pairs:
+    ...             await service.submit(person1, person2)
+    ...         await service.close()
+    ...     producer = asyncio.create_task(produce())
+    ...     async for (person1, person2), resistance in service:
+    ...         ...
+    """
+    def __init__(
+            self,
+            network: SocialNetworkSimVoltage,
+            max_workers: Optional[int]=None,
+            max_pending: int=1024,
+            batch_size: int=64
+    ):
+        """
+        Initialize the ResistanceService class.
+
+        Parameters
+        ----------
+        network : SocialNetworkSimVoltage
+            The network. The workers map the arrays of
+            :meth:`SocialNetworkSimVoltage.arrayState` from temporary .npy files.
+        max_workers : int, optional
+            The number of processes. If None, the number of CPUs. Default is None.
+        max_pending : int, optional
+            The maximum number of pairs waiting to be batched, and of results waiting to
+            be read. :meth:`submit` waits while the queue of pairs is full. Default is 1024.
+        batch_size : int, optional
+            The maximum number of pairs gathered into one batch. Default is 64.
+        """
+        self.network = network
+        self.max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.executor = None
+        self.directory = None
+        self.dispatcher = None
+        self.running = set()
+
+    async def start(self) -> None:
+        """
+        Start the pool of processes and the dispatching of the pairs.
+        """
+        self.pairs = asyncio.Queue(maxsize=self.max_pending)
+        self.results = asyncio.Queue(maxsize=self.max_pending)
+        # batches being solved or delivered, two per worker so that none waits for work
+        self.slots = asyncio.Semaphore(2 * self.max_workers)
+        self.directory = tempfile.TemporaryDirectory()
+        state, paths = _mapArrayState(self.network.arrayState(), self.directory.name)
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_initResistanceWorker,
+                                            initargs=(state, paths))
+        self.dispatcher = asyncio.create_task(self.dispatch())
+
+    async def submit(self, person1: str, person2: str) -> None:
+        """
+        Queue the pair (person1, person2), waiting while the queue is full.
+
+        Parameters
+        ----------
+        person1 : str
+            The person at 1.0V potential.
+        person2 : str
+            The person at 0.0V potential.
+        """
+        await self.pairs.put((person1, person2))
+
+    async def close(self) -> None:
+        """
+        Signal that no more pairs will be submitted. The iteration over the results
+        stops once all the queued pairs are answered.
+        """
+        await self.pairs.put(_CLOSED)
+
+    def groupBatch(self, batch: list[tuple[str, str]]) -> list[list[int]]:
+        """
+        Group the pairs of a batch sharing a person.
+
+        Each pair goes with the pairs sharing its person1, or those sharing its person2,
+        whichever is more frequent in the batch. The pairs sharing no person with another
+        are spread over at most `max_workers` groups, so that they are solved in parallel.
+
+        Parameters
+        ----------
+        batch : list
+            The pairs.
+
+        Returns
+        -------
+        list
+            The groups, as lists of positions in the batch.
+        """
+        counts1 = Counter(person1 for person1, _ in batch)
+        counts2 = Counter(person2 for _, person2 in batch)
+        groups = defaultdict(list)
+        singles = []
+        for position, (person1, person2) in enumerate(batch):
+            if counts1[person1] >= counts2[person2]:
+                if counts1[person1] > 1:
+                    groups[(0, person1)].append(position)
+                else:
+                    singles.append(position)
+            else:
+                groups[(1, person2)].append(position)
+        nbchunks = min(self.max_workers, len(singles))
+        chunks = [singles[chunkid::nbchunks] for chunkid in range(nbchunks)]
+        return list(groups.values()) + chunks
+
+    async def dispatch(self) -> None:
+        """
+        Gather the queued pairs into batches, and solve the groups of each batch on the pool,
+        until the pairs are closed. If the dispatching fails, the exception is handed over
+        to the consumer of the results, and the results end.
+        """
+        try:
+            closed = False
+            while not closed:
+                batch = [await self.pairs.get()]
+                while len(batch) < self.batch_size and not self.pairs.empty():
+                    batch.append(self.pairs.get_nowait())
+                if _CLOSED in batch:
+                    batch = batch[:batch.index(_CLOSED)]
+                    closed = True
+
+                idx1, found1 = self.network.nodeindex.indices([person1 for person1, _ in batch])
+                idx2, found2 = self.network.nodeindex.indices([person2 for _, person2 in batch])
+                for position in np.flatnonzero(~(found1 & found2)).tolist():
+                    await self.results.put((batch[position], np.nan))
+                found = (found1 & found2).tolist()
+                for group in self.groupBatch(batch):
+                    group = [position for position in group if found[position]]
+                    if len(group) == 0:
+                        continue
+                    await self.slots.acquire()
+                    task = asyncio.create_task(self.solveGroup([batch[position] for position in group],
+                                                               idx1[group], idx2[group]))
+                    self.running.add(task)
+                    task.add_done_callback(self.running.discard)
+        except Exception as exception:
+            # e.g., a malformed pair: the consumer raises it, instead of waiting for results forever
+            await self.results.put(_Failure(exception))
+
+        if len(self.running) > 0:
+            await asyncio.gather(*self.running)
+        await self.results.put(_CLOSED)
+
+    async def solveGroup(
+            self,
+            pairs: list[tuple[str, str]],
+            idx1: Annotated[NDArray[np.int64], Literal["1D Array"]],
+            idx2: Annotated[NDArray[np.int64], Literal["1D Array"]]
+    ) -> None:
+        """
+        Solve a group of pairs in a worker process, and queue the results.
+
+        Parameters
+        ----------
+        pairs : list
+            The pairs.
+        idx1 : numpy.ndarray
+            The indices of the people at 1.0V potential.
+        idx2 : numpy.ndarray
+            The indices of the people at 0.0V potential.
+        """
+        # the slot is released once the results are delivered, so that a slow consumer
+        # stops the dispatching
+        try:
+            try:
+                resistances = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, _resistancePairs, idx1, idx2)
+            except Exception as exception:
+                await self.results.put(_Failure(exception))
+                return
+            for pair, resistance in zip(pairs, resistances.tolist()):
+                await self.results.put((pair, resistance))
+        finally:
+            self.slots.release()
+
+    def __aiter__(self) -> 'ResistanceService':
+        return self
+
+    async def __anext__(self) -> tuple[tuple[str, str], float]:
+        """
+        Return the next result, as ((person1, person2), resistance), in the order the
+        pairs are solved. The resistance is NaN if a person is not in the network.
+
+        Raises
+        ------
+        StopAsyncIteration
+            If the pairs are closed and all answered.
+        """
+        result = await self.results.get()
+        if result is _CLOSED:
+            # for any later iteration
+            self.results.put_nowait(_CLOSED)
+            raise StopAsyncIteration
+        if isinstance(result, _Failure):
+            raise result.exception
+        return result
+
+    async def shutdown(self) -> None:
+        """
+        Stop the dispatching, dropping the pairs not solved yet, and the pool of processes.
+        """
+        for task in [self.dispatcher, *self.running]:
+            if task is not None and not task.done():
+                task.cancel()
+        await asyncio.gather(*[task for task in [self.dispatcher, *self.running] if task is not None],
+                             return_exceptions=True)
+        if self.executor is not None:
+            # waiting for the processes to exit must not block the event loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, partial(self.executor.shutdown, wait=True, cancel_futures=True))
+            self.executor = None
+        if self.directory is not None:
+            self.directory.cleanup()
+            self.directory = None
+
+    async def __aenter__(self) -> 'ResistanceService':
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.shutdown()
@@ -0,0 +1,506 @@
+
+'''
+Resistance distances of large simple undirected networks, computed on demand.
+
+Instead of the dense pseudoinverse of the Laplacian, the resistance distance
+between u and v is read from the solution of L x = e_u - e_v, with one node
+of each connected component grounded so that the system is nonsingular.
+See: http://en.wikipedia.org/wiki/Resistance_distance
+'''
+
+from typing import Annotated, Any, Literal, Optional, Union
+
+import numpy as np
+from numpy.typing import NDArray
+from scipy.sparse import csr_array, diags_array
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import cg, splu
+
+from .exceptions import UnknownNodeException
+from .resistancedist import GraphResistanceDistance
+
+
+# number of pairs of nodes processed together by the batch queries
+PAIRS_BLOCK_SIZE = 256
+# maximum number of entries of a block of right-hand sides solved together, i.e., 32 MB
+SOLVE_BLOCK_ENTRIES = 2 ** 22
+# number of random directions per log(n) / epsilon ** 2 of the approximate distances: the
+# proof of the Johnson-Lindenstrauss lemma needs 24, but a third of it keeps the distances
+# of sampled pairs within epsilon in practice
+PROJECTIONS_FACTOR = 8.
+
+
+class SparseGraphResistanceDistance(GraphResistanceDistance):
+    """
+    Compute resistance distances of a simple undirected network with a sparse solver.
+
+    The construction takes O(E) time and memory (plus the fill-in of the factorization
+    with the "lu" method), and each call of :meth:`getResistance` costs about one sparse
+    solve. Nodes in different connected components are at an infinite distance.
+    """
+    def __init__(
+            self,
+            nodes: list[str]=None,
+            edges: Optional[list[Union[tuple[str, str], tuple[str, str, float]]]]=None,
+            method: Literal["lu", "cg"]="lu",
+            eps: float=1e-8,
+            maxstep: Optional[int]=None,
+            *,
+            src: Optional[Annotated[NDArray[np.int64], Literal["1D Array"]]]=None,
+            dst: Optional[Annotated[NDArray[np.int64], Literal["1D Array"]]]=None,
+            conductance: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+    ):
+        """
+        Initialize the SparseGraphResistanceDistance class.
+
+        Parameters
+        ----------
+        nodes : list, optional
+            List of node identifiers. Default is ['Stephen', 'Sinnie', 'Elaine'].
+        edges : list of tuples, optional
+            List of edges as tuples (node1, node2), or (node1, node2, conductance).
+            Default is [('Stephen', 'Sinnie'), ('Elaine', 'Sinnie'), ('Elaine', 'Stephen')].
+        method : str, optional
+            Either "lu", to factorize the grounded Laplacian once with SuperLU and answer
+            each query with two triangular solves, or "cg", to solve each query with the
+            conjugate gradient method preconditioned by the diagonal, without any fill-in.
+            Default is "lu".
+        eps : float, optional
+            The relative tolerance of the conjugate gradient method. Default is 1e-8.
+        maxstep : int, optional
+            The maximum number of iterations of the conjugate gradient method. If None,
+            the default of :func:`scipy.sparse.linalg.cg` is used. Default is None.
+        src, dst, conductance : numpy.ndarray, optional
+            The edges as arrays (see :class:`graphflow.simvoltage.GraphResistanceDistance`).
+            Default is None.
+
+        Raises
+        ------
+        ValueError
+            If the method is unknown.
+        """
+        if method not in ["lu", "cg"]:
+            raise ValueError(f"Unknown method: {method}")
+        self.method = method
+        self.eps = eps
+        self.maxstep = maxstep
+        super().__init__(nodes=nodes, edges=edges, src=src, dst=dst, conductance=conductance)
+
+    def computeResistanceDistance(self) -> None:
+        """
+        Prepare the grounded Laplacian, instead of computing all the distances.
+
+        The first node of each connected component is grounded, i.e., its row and column
+        are removed from the Laplacian, and the remaining block-diagonal matrix is
+        positive definite. With the "lu" method, it is factorized here.
+
+        Returns
+        -------
+        None
+            No distance matrix is stored: distances are computed by :meth:`getResistance`.
+        """
+        Lmatrix = self.calculateLaplacianMatrix()
+        nbnodes = len(self.nodes)
+        _, self.components = connected_components(Lmatrix, directed=False)
+        grounded = np.zeros(nbnodes, dtype=bool)
+        grounded[np.unique(self.components, return_index=True)[1]] = True
+
+        # index of each node in the grounded Laplacian, -1 for grounded nodes
+        self.groundedIdx = np.full(nbnodes, -1, dtype=np.int64)
+        self.groundedIdx[~grounded] = np.arange(nbnodes - np.count_nonzero(grounded))
+        self.groundedLaplacian = Lmatrix[~grounded][:, ~grounded].tocsc()
+
+        if self.groundedLaplacian.shape[0] == 0:
+            self.solver = None
+        elif self.method == "lu":
+            lu = splu(self.groundedLaplacian)
+            self.solver = lu.solve
+        else:
+            preconditioner = diags_array(1. / self.groundedLaplacian.diagonal())
+            self.solver = lambda b: self.conjugateGradient(b, preconditioner)
+        return None
+
+    def persistedArrays(self) -> dict[str, np.ndarray]:
+        return {'src': self.src, 'dst': self.dst, 'conductance': self.conductance}
+
+    def persistedParameters(self) -> dict[str, Any]:
+        parameters = super().persistedParameters()
+        parameters.update({'method': self.method, 'eps': self.eps, 'maxstep': self.maxstep})
+        return parameters
+
+    def restoreState(self) -> None:
+        # the factorization cannot be saved, and is computed again from the Laplacian
+        super().restoreState()
+        self.computeResistanceDistance()
+
+    def conjugateGradient(self, b: np.ndarray, preconditioner) -> np.ndarray:
+        """
+        Solve the grounded Laplacian system with the preconditioned conjugate gradient method.
+
+        Parameters
+        ----------
+        b : numpy.ndarray
+            The right-hand side.
+        preconditioner : scipy.sparse.sparray
+            The inverse of the diagonal of the grounded Laplacian.
+
+        Returns
+        -------
+        numpy.ndarray
+            The solution.
+
+        Raises
+        ------
+        RuntimeError
+            If the conjugate gradient method does not converge.
+        """
+        x, info = cg(self.groundedLaplacian, b, rtol=self.eps, maxiter=self.maxstep, M=preconditioner)
+        if info != 0:
+            raise RuntimeError(f"The conjugate gradient method did not converge (info={info}).")
+        return x
+
+    def getResistance(self, node1: str, node2: str) -> float:
+        """
+        Get the resistance distance between two nodes.
+
+        Parameters
+        ----------
+        node1 : str
+            The identifier of the first node.
+        node2 : str
+            The identifier of the second node.
+
+        Returns
+        -------
+        float
+            The resistance distance between the two nodes, or infinity if they are
+            not connected.
+
+        Raises
+        ------
+        UnknownNodeException
+            If either node is not in the graph.
+        """
+        unknown_keys = [node for node in [node1, node2] if not node in self.nodesIdx]
+        if len(unknown_keys) > 0:
+            raise UnknownNodeException(unknown_keys)
+
+        idx0 = self.nodesIdx[node1]
+        idx1 = self.nodesIdx[node2]
+        if idx0 == idx1:
+            return 0.
+        if self.components[idx0] != self.components[idx1]:
+            return np.inf
+
+        # inject a unit current at node1 and extract it at node2, the grounded node having zero voltage
+        gidx0, gidx1 = self.groundedIdx[idx0], self.groundedIdx[idx1]
+        b = np.zeros(self.groundedLaplacian.shape[0])
+        if gidx0 >= 0:
+            b[gidx0] = 1.
+        if gidx1 >= 0:
+            b[gidx1] = -1.
+        x = self.solver(b)
+        return float((x[gidx0] if gidx0 >= 0 else 0.) - (x[gidx1] if gidx1 >= 0 else 0.))
+
+    def solveCurrents(
+            self,
+            gidx0: Annotated[NDArray[np.int64], Literal["1D Array"]],
+            gidx1: Optional[Annotated[NDArray[np.int64], Literal["1D Array"]]]=None
+    ) -> Annotated[NDArray[np.float64], Literal["2D Array"]]:
+        """
+        Solve the grounded Laplacian system for a block of unit currents.
+
+        Parameters
+        ----------
+        gidx0 : numpy.ndarray
+            The indices in the grounded Laplacian of the nodes where the currents are
+            injected, or -1 for grounded nodes.
+        gidx1 : numpy.ndarray, optional
+            The indices of the nodes where the currents are extracted, likewise. If None,
+            the currents flow to the grounded nodes. Default is None.
+
+        Returns
+        -------
+        numpy.ndarray
+            The voltages, with one column per current.
+        """
+        columns = np.arange(len(gidx0))
+        # the solvers take dense right-hand sides only
+        b = np.zeros((self.groundedLaplacian.shape[0], len(gidx0)))
+        b[gidx0[gidx0 >= 0], columns[gidx0 >= 0]] = 1.
+        if gidx1 is not None:
+            b[gidx1[gidx1 >= 0], columns[gidx1 >= 0]] = -1.
+        if self.method == "lu":
+            return self.solver(b)
+        return np.column_stack([self.solver(column) for column in b.T])
+
+    def resistancesFromIndices(
+            self,
+            idx0: Annotated[NDArray[np.int64], Literal["1D Array"]],
+            idx1: Annotated[NDArray[np.int64], Literal["1D Array"]]
+    ) -> Annotated[NDArray[np.float64], Literal["1D Array"]]:
+        """
+        Get the resistance distances between pairs of nodes given by valid indices.
+
+        If the pairs share nodes, one system is solved per node, the distance between
+        u and v being X[u, u] + X[v, v] - 2 X[u, v], with X the inverse of the grounded
+        Laplacian. Otherwise, one system is solved per pair. The systems are solved by
+        blocks of at most `SOLVE_BLOCK_ENTRIES` entries, which the "lu" method solves
+        together.
+
+        Parameters
+        ----------
+        idx0 : numpy.ndarray
+            The indices of the first nodes of the pairs.
+        idx1 : numpy.ndarray
+            The indices of the second nodes of the pairs.
+
+        Returns
+        -------
+        numpy.ndarray
+            The resistance distances.
+        """
+        resistances = np.where(self.components[idx0] == self.components[idx1], 0., np.inf)
+        tosolve = np.flatnonzero((idx0 != idx1) & np.isfinite(resistances))
+        gidx0, gidx1 = self.groundedIdx[idx0[tosolve]], self.groundedIdx[idx1[tosolve]]
+        nbgrounded = self.groundedLaplacian.shape[0]
+        blocksize = max(1, min(PAIRS_BLOCK_SIZE, SOLVE_BLOCK_ENTRIES // max(nbgrounded, 1)))
+        nodes = np.unique(np.concatenate([gidx0, gidx1]))
+        nodes = nodes[nodes >= 0]
+
+        if len(nodes) < len(tosolve):
+            # the voltages of grounded nodes are zero, read from an extra entry
+            diagonal = np.zeros(nbgrounded + 1)
+            cross = np.zeros(len(tosolve))
+            rows0, rows1 = np.where(gidx0 >= 0, gidx0, nbgrounded), np.where(gidx1 >= 0, gidx1, nbgrounded)
+            position = np.full(nbgrounded + 1, -1)
+            for start in range(0, len(nodes), blocksize):
+                block = nodes[start:start+blocksize]
+                x = self.solveCurrents(block)
+                diagonal[block] = x[block, np.arange(len(block))]
+                position[block] = np.arange(len(block))
+                inblock = (position[rows0] >= 0) & (gidx1 >= 0)
+                cross[inblock] = x[gidx1[inblock], position[rows0[inblock]]]
+                position[block] = -1
+            resistances[tosolve] = diagonal[rows0] + diagonal[rows1] - 2 * cross
+            return resistances
+
+        for start in range(0, len(tosolve), blocksize):
+            block0, block1 = gidx0[start:start+blocksize], gidx1[start:start+blocksize]
+            x = self.solveCurrents(block0, block1)
+            columns = np.arange(len(block0))
+            resistances[tosolve[start:start+blocksize]] = \
+                np.where(block0 >= 0, x[np.maximum(block0, 0), columns], 0.) \
+                - np.where(block1 >= 0, x[np.maximum(block1, 0), columns], 0.)
+        return resistances
+
+
+class ApproximateGraphResistanceDistance(SparseGraphResistanceDistance):
+    """
+    Approximate the resistance distances of a large simple undirected network.
+
+    Following Spielman and Srivastava, the resistance distance between u and v is
+    ||W^(1/2) B L^+ (e_u - e_v)||^2, where B is the edge-node incidence matrix and W
+    the diagonal matrix of the conductances. By the Johnson-Lindenstrauss lemma, this
+    norm is preserved within a factor 1 +/- epsilon by projecting W^(1/2) B onto
+    k = O(log n / epsilon^2) random directions. The k rows of the projection are
+    solved against the Laplacian once, giving an n x k embedding, and each call of
+    :meth:`getResistance` is a squared distance between two rows of it.
+
+    The embedding takes 8 n k bytes, e.g., about 10 GB for a million nodes with the
+    default `epsilon`, and its construction solves k Laplacian systems: `epsilon` or
+    `nbprojections` bound both. If k is at least n, the embedding would cost more than
+    the exact distances, and these are computed as in :class:`SparseGraphResistanceDistance`.
+    """
+    def __init__(
+            self,
+            nodes: list[str]=None,
+            edges: Optional[list[Union[tuple[str, str], tuple[str, str, float]]]]=None,
+            epsilon: float=0.3,
+            seed: Optional[int]=None,
+            nbprojections: Optional[int]=None,
+            method: Literal["lu", "cg"]="lu",
+            eps: float=1e-8,
+            maxstep: Optional[int]=None,
+            *,
+            src: Optional[Annotated[NDArray[np.int64], Literal["1D Array"]]]=None,
+            dst: Optional[Annotated[NDArray[np.int64], Literal["1D Array"]]]=None,
+            conductance: Optional[Annotated[NDArray[np.float64], Literal["1D Array"]]]=None
+    ):
+        """
+        Initialize the ApproximateGraphResistanceDistance class.
+
+        Parameters
+        ----------
+        nodes : list, optional
+            List of node identifiers. Default is ['Stephen', 'Sinnie', 'Elaine'].
+        edges : list of tuples, optional
+            List of edges as tuples (node1, node2), or (node1, node2, conductance).
+            Default is [('Stephen', 'Sinnie'), ('Elaine', 'Sinnie'), ('Elaine', 'Stephen')].
+        epsilon : float, optional
+            The relative accuracy of the distances. The number of random directions is
+            ceil(PROJECTIONS_FACTOR * log(n) / epsilon ** 2), with PROJECTIONS_FACTOR = 8.
+            Default is 0.3.
+        seed : int, optional
+            The seed of the random directions. Default is None.
+        nbprojections : int, optional
+            If given, the number of random directions, overriding `epsilon`. If it is at
+            least the number of nodes, the distances are exact. Default is None.
+        method : str, optional
+            The solver of the Laplacian systems, "lu" or "cg"
+            (see :class:`SparseGraphResistanceDistance`). Default is "lu".
+        eps : float, optional
+            The relative tolerance of the conjugate gradient method. Default is 1e-8.
+        maxstep : int, optional
+            The maximum number of iterations of the conjugate gradient method. Default is None.
+        src, dst, conductance : numpy.ndarray, optional
+            The edges as arrays (see :class:`graphflow.simvoltage.GraphResistanceDistance`).
+            Default is None.
+        """
+        self.epsilon = epsilon
+        self.seed = seed
+        self.nbprojections = nbprojections
+        super().__init__(
+            nodes=nodes, edges=edges, method=method, eps=eps, maxstep=maxstep,
+            src=src, dst=dst, conductance=conductance
+        )
+
+    def computeResistanceDistance(self) -> None:
+        """
+        Compute the n x k embedding of the nodes, stored in the attribute `embedding`.
+
+        If k is at least n, no embedding is computed, and `embedding` is None.
+
+        Returns
+        -------
+        None
+            No distance matrix is stored: distances are computed by :meth:`getResistance`.
+        """
+        super().computeResistanceDistance()
+        nbnodes = len(self.nodes)
+        if self.nbprojections is not None:
+            nbprojections = self.nbprojections
+        else:
+            nbprojections = int(np.ceil(PROJECTIONS_FACTOR * np.log(max(nbnodes, 2)) / self.epsilon ** 2))
+        if nbprojections >= nbnodes:
+            # n solves give the exact distances, for less than the embedding
+            self.embedding = None
+            return None
+
+        # Y^T = (W^(1/2) B)^T Q^T, accumulated by chunks of edges, so that the k x m random matrix Q
+        # of entries +/- 1/sqrt(k) is never held at once
+        rng = np.random.default_rng(self.seed)
+        nbedges = len(self.src)
+        sqrtconductance = np.sqrt(self.conductance)
+        projection = np.zeros((nbnodes, nbprojections))
+        chunksize = max(1, (1 << 22) // nbprojections)
+        for start in range(0, nbedges, chunksize):
+            end = min(start + chunksize, nbedges)
+            nbchunkedges = end - start
+            # columns of (W^(1/2) B)^T for the edges of the chunk
+            incidenceT = csr_array(
+                (np.concatenate([sqrtconductance[start:end], -sqrtconductance[start:end]]),
+                 (np.concatenate([self.src[start:end], self.dst[start:end]]), np.tile(np.arange(nbchunkedges), 2))),
+                shape=(nbnodes, nbchunkedges)
+            )
+            signs = rng.choice([-1., 1.], size=(nbchunkedges, nbprojections)) / np.sqrt(nbprojections)
+            projection += incidenceT @ signs
+
+        # Z^T = L^+ Y^T, up to a constant per component, which cancels in the distances
+        self.embedding = np.zeros((nbnodes, nbprojections))
+        grounded = self.groundedIdx < 0
+        if self.solver is not None:
+            if self.method == "lu":
+                self.embedding[~grounded] = self.solver(projection[~grounded])
+            else:
+                self.embedding[~grounded] = np.column_stack(
+                    [self.solver(column) for column in projection[~grounded].T]
+                )
+        return None
+
+    def persistedArrays(self) -> dict[str, np.ndarray]:
+        arrays = super().persistedArrays()
+        arrays['components'] = self.components
+        if self.embedding is not None:
+            arrays['embedding'] = self.embedding
+        return arrays
+
+    def persistedParameters(self) -> dict[str, Any]:
+        parameters = super().persistedParameters()
+        parameters.update({'epsilon': self.epsilon, 'seed': self.seed, 'nbprojections': self.nbprojections})
+        return parameters
+
+    def restoreState(self) -> None:
+        if not hasattr(self, 'embedding'):
+            # the distances are exact, and the factorization is computed again
+            super().restoreState()
+            return None
+        # the embedding answers all the queries, and no Laplacian system is solved again
+        GraphResistanceDistance.restoreState(self)
+        self.solver = None
+
+    def getResistance(self, node1: str, node2: str) -> float:
+        """
+        Get the approximate resistance distance between two nodes.
+
+        Parameters
+        ----------
+        node1 : str
+            The identifier of the first node.
+        node2 : str
+            The identifier of the second node.
+
+        Returns
+        -------
+        float
+            The approximate resistance distance between the two nodes, or infinity if
+            they are not connected.
+
+        Raises
+        ------
+        UnknownNodeException
+            If either node is not in the graph.
+        """
+        unknown_keys = [node for node in [node1, node2] if not node in self.nodesIdx]
+        if len(unknown_keys) > 0:
+            raise UnknownNodeException(unknown_keys)
+
+        if self.embedding is None:
+            return super().getResistance(node1, node2)
+        idx0 = self.nodesIdx[node1]
+        idx1 = self.nodesIdx[node2]
+        if self.components[idx0] != self.components[idx1]:
+            return np.inf
+        difference = self.embedding[idx0] - self.embedding[idx1]
+        return float(np.dot(difference, difference))
+
+    def resistancesFromIndices(
+            self,
+            idx0: Annotated[NDArray[np.int64], Literal["1D Array"]],
+            idx1: Annotated[NDArray[np.int64], Literal["1D Array"]]
+    ) -> Annotated[NDArray[np.float64], Literal["1D Array"]]:
+        """
+        Get the approximate resistance distances between pairs of nodes given by valid indices.
+
+        Parameters
+        ----------
+        idx0 : numpy.ndarray
+            The indices of the first nodes of the pairs.
+        idx1 : numpy.ndarray
+            The indices of the second nodes of the pairs.
+
+        Returns
+        -------
+        numpy.ndarray
+            The approximate resistance distances.
+        """
+        if self.embedding is None:
+            return super().resistancesFromIndices(idx0, idx1)
+        resistances = np.empty(len(idx0))
+        # by blocks, so that the differences of the embeddings take bounded memory
+        for start in range(0, len(idx0), PAIRS_BLOCK_SIZE):
+            end = start + PAIRS_BLOCK_SIZE
+            difference = self.embedding[idx0[start:end]] - self.embedding[idx1[start:end]]
+            resistances[start:end] = np.einsum('ij,ij->i', difference, difference)
+        resistances[self.components[idx0] != self.components[idx1]] = np.inf
+        return resistances
@@ -28,6 +28,86 @@ class testHITS(unittest.TestCase):
         self.assertAlmostEqual(authdict['b'], 1.0)
         self.assertAlmostEqual(authdict['c'], 0.0)
 
+    def testForkResult(self):
+        forkgr = nx.DiGraph()
+        forkgr.add_nodes_from(['a', 'b', 'c'])
+        forkgr.add_edges_from([('a', 'b'), ('c', 'b')])
+
+        hubs, auths = graphflow.hits.CalculateHITS(forkgr, as_result=True)
+
+        self.assertIs(hubs.nodeindex, auths.nodeindex)
+        np.testing.assert_allclose(hubs.scores, [np.sqrt(0.5), 0.0, np.sqrt(0.5)], atol=1e-7)
+        self.assertEqual(list(auths.topk(1)), ['b'])
+
+
+    def testSparse(self):
+        graph = nx.DiGraph(nx.scale_free_graph(300, seed=7))
+        A = nx.adjacency_matrix(graph)
+
+        sparsehub, sparseauth = graphflow.hits.hits(A, eps=1e-10)
+        densehub, denseauth = graphflow.hits.hits(A.toarray(), eps=1e-10)
+        np.testing.assert_allclose(sparsehub, densehub, atol=1e-8)
+        np.testing.assert_allclose(sparseauth, denseauth, atol=1e-8)
+
+        nxhub, nxauth = nx.hits(graph, tol=1e-12)
+        nodes = list(graph.nodes())
+        nxauthvec = np.array([nxauth[node] for node in nodes])
+        np.testing.assert_allclose(sparseauth / np.sum(sparseauth), nxauthvec / np.sum(nxauthvec), atol=1e-6)
+
+        seededhub, _ = graphflow.hits.hits(A, eps=1e-10, seed=42)
+        seededhub2, _ = graphflow.hits.hits(A, eps=1e-10, seed=42)
+        np.testing.assert_array_equal(seededhub, seededhub2)
+
+
+    def testSVD(self):
+        forkgr = nx.DiGraph()
+        forkgr.add_nodes_from(['a', 'b', 'c'])
+        forkgr.add_edges_from([('a', 'b'), ('c', 'b')])
+        hubdict, authdict = graphflow.hits.CalculateHITS(forkgr, solver='svd')
+        self.assertAlmostEqual(hubdict['a'], np.sqrt(0.5))
+        self.assertAlmostEqual(hubdict['b'], 0.0)
+        self.assertAlmostEqual(authdict['b'], 1.0)
+
+        graph = nx.DiGraph(nx.scale_free_graph(300, seed=7))
+        A = nx.adjacency_matrix(graph)
+        powerhub, powerauth = graphflow.hits.hits(A, eps=1e-10)
+        svdhub, svdauth, residual = graphflow.hits.hits(A, eps=1e-10, solver='svd', return_residual=True)
+        np.testing.assert_allclose(svdhub, powerhub, atol=1e-6)
+        np.testing.assert_allclose(svdauth, powerauth, atol=1e-6)
+        self.assertLess(residual, 1e-6)
+
+        self.assertRaises(ValueError, graphflow.hits.hits, A, solver='qr')
+
+    def testMaxStep(self):
+        graph = nx.DiGraph(nx.scale_free_graph(300, seed=7))
+        A = nx.adjacency_matrix(graph)
+        with self.assertWarns(RuntimeWarning):
+            _, _, residual = graphflow.hits.hits(A, eps=1e-12, maxstep=2, return_residual=True)
+        self.assertGreater(residual, 1e-12)
+
+
+    def testTopicHITS(self):
+        graph = nx.DiGraph(nx.scale_free_graph(500, seed=3))
+        topichits = graphflow.hits.TopicHITS(graph, max_inlinks=None, eps=1e-8)
+        rootsets = [[1, 5, 17], [2], [30, 40]]
+
+        results = topichits.calculateHITSBatch(rootsets, max_workers=2)
+        self.assertEqual(len(results), len(rootsets))
+        for roots, (hubs, auths) in zip(rootsets, results):
+            base = set(roots)
+            for root in roots:
+                base |= set(graph.successors(root)) | set(graph.predecessors(root))
+            self.assertEqual(set(hubs), base)
+            hubdict, authdict = graphflow.hits.CalculateHITS(graph.subgraph(base), eps=1e-8)
+            for node in base:
+                self.assertAlmostEqual(hubs[node], hubdict[node], places=5)
+                self.assertAlmostEqual(auths[node], authdict[node], places=5)
+
+        cappedhits = graphflow.hits.TopicHITS(graph, max_inlinks=1)
+        roots = cappedhits.rootIndices([0])
+        self.assertLessEqual(len(cappedhits.baseSet(roots)), 2 + graph.out_degree(0))
+        self.assertRaises(ValueError, topichits.calculateHITS, ['nonexistent'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,16 @@
 
+import os
+import subprocess
+import sys
+import textwrap
 import unittest
+from unittest import mock
 
+import numpy as np
 import networkx as nx
 import graphflow
 import graphflow.pagerank.GooglePageRank
+import graphflow.pagerank.cpagerank
 from graphflow import PageRankLanguage
 
 nodes = ['Stephen', 'John', 'Mary',
@@ -69,6 +76,7 @@ class test_pagerank(unittest.TestCase):
         graph = nx.DiGraph()
         graph.add_nodes_from(nodes)
         graph.add_weighted_edges_from(edges)
+        self.graph = graph
 
         self.googlematrix, self.nodedict = graphflow.pagerank.GooglePageRank.GoogleMatrix(graph, 0.15)
 
@@ -88,6 +96,315 @@ class test_pagerank(unittest.TestCase):
         for name in pagerank:
             self.assertAlmostEqual(pagerank[name], pagerank_answer[name], places=5)
 
+        # no node, no step, in every kernel
+        cpagerank = graphflow.pagerank.cpagerank
+        indptr, indices = np.zeros(1, dtype=np.int32), np.zeros(0, dtype=np.int32)
+        data, dangling = np.zeros(0), np.zeros(0, dtype=np.uint8)
+        for r, nbsteps in [cpagerank.pagerank_dense(np.empty((0, 0)), 1e-4, 1000),
+                           cpagerank.pagerank_csr(indptr, indices, data, dangling, 0.85, 1e-4, 1000, False),
+                           cpagerank.pagerank_gauss_seidel(indptr, indices, data, 0.85, 1e-4, 1000),
+                           cpagerank.personalized_pagerank_csr(indptr, indices, data, dangling, np.zeros((0, 2)),
+                                                               0.85, 1e-4, 1000, False)]:
+            self.assertEqual(len(r), 0)
+            self.assertEqual(nbsteps, 0)
+
+    def testNetwork_sparse(self):
+        pagerank = graphflow.pagerank.CalculatePageRank(self.graph, 0.15, engine='sparse')
+
+        self.assertEqual(len(pagerank), len(pagerank_answer))
+        for name in pagerank:
+            self.assertAlmostEqual(pagerank[name], pagerank_answer[name], places=5)
+
+    def testNetwork_sparse_python(self):
+        P, dangling, nodedict = graphflow.pagerank.TransitionMatrix(self.graph)
+        pagerank = graphflow.pagerank.CalculatePageRankFromTransitionMatrix(P, dangling, nodedict, 0.15, language=PageRankLanguage.PYTHON)
+
+        self.assertEqual(len(pagerank), len(pagerank_answer))
+        for name in pagerank:
+            self.assertAlmostEqual(pagerank[name], pagerank_answer[name], places=5)
+
+    def testEdgeArrays(self):
+        src, dst, nodedict = graphflow.pagerank.EdgeIndexArrays(self.graph)
+        self.assertEqual(nodedict, self.nodedict)
+
+        A = graphflow.pagerank.GoogleMatrixFromEdgeArrays(src, dst, len(nodedict), 0.15)
+        np.testing.assert_allclose(A, self.googlematrix)
+
+        P, dangling = graphflow.pagerank.TransitionMatrixFromEdgeArrays(src, dst, len(nodedict))
+        self.assertFalse(np.any(dangling))
+        np.testing.assert_allclose(P.sum(axis=0), np.ones(len(nodedict)))
+        pagerank = graphflow.pagerank.CalculatePageRankFromTransitionMatrix(P, dangling, nodedict, 0.15)
+        for name in pagerank:
+            self.assertAlmostEqual(pagerank[name], pagerank_answer[name], places=5)
+
+    def testDanglingNodes(self):
+        graph = nx.DiGraph()
+        graph.add_edges_from([('a', 'b'), ('b', 'c'), ('a', 'c')])
+
+        A, nodedict = graphflow.pagerank.GoogleMatrix(graph, 0.85)
+        densepagerank = graphflow.pagerank.CalculatePageRankFromAdjacencyMatrix(A, nodedict, language=PageRankLanguage.PYTHON)
+        sparsepagerank = graphflow.pagerank.CalculatePageRank(graph, 0.85, engine='sparse')
+        for name in densepagerank:
+            self.assertAlmostEqual(sparsepagerank[name], densepagerank[name], places=5)
+
+        pagerank = graphflow.pagerank.CalculatePageRank(graph, 0.85, redistribute_dangling=True)
+        self.assertAlmostEqual(sum(pagerank.values()), 1.0, places=4)
+        self.assertGreater(pagerank['c'], pagerank['b'])
+        self.assertGreater(pagerank['b'], pagerank['a'])
+
+        self.assertRaises(ValueError, graphflow.pagerank.CalculatePageRank, graph, 0.85,
+                          engine='cython', redistribute_dangling=True)
+
+    def testEngines(self):
+        for engine in ['dense', 'cython', 'sparse', 'auto']:
+            pagerank = graphflow.pagerank.CalculatePageRank(self.graph, 0.15, engine=engine)
+            for name in pagerank:
+                self.assertAlmostEqual(pagerank[name], pagerank_answer[name], places=5)
+
+        self.assertEqual(graphflow.pagerank.select_engine(100, 9000).name, 'cython')
+        self.assertEqual(graphflow.pagerank.select_engine(100, 500).name, 'sparse')
+        self.assertEqual(graphflow.pagerank.select_engine(100000, 10**9).name, 'sparse')
+        self.assertRaises(ValueError, graphflow.pagerank.get_engine, 'quantum')
+
+    def testEngineFallback(self):
+        # the Python paths of the solvers agree with the compiled kernels
+        graph = nx.DiGraph(nx.grid_2d_graph(10, 10))
+        graph.add_edge('dangling', (0, 0))
+        for solver in ['power', 'gauss-seidel']:
+            expected = graphflow.pagerank.CalculatePageRank(graph, 0.85, eps=1e-10, engine='sparse',
+                                                            redistribute_dangling=True, solver=solver)
+            with mock.patch.object(graphflow.pagerank.solvers, 'CompiledKernels', return_value=None):
+                pagerank = graphflow.pagerank.CalculatePageRank(graph, 0.85, eps=1e-10, engine='sparse',
+                                                                redistribute_dangling=True, solver=solver)
+            for name in pagerank:
+                self.assertAlmostEqual(pagerank[name], expected[name], places=8)
+
+        # as if the extension were not built, in a fresh interpreter, so that the package
+        # is imported without it
+        script = textwrap.dedent('''
+            import sys
+            sys.modules['graphflow.pagerank.cpagerank'] = None
+            import networkx as nx
+            import graphflow
+            import graphflow.pagerank
+
+            assert not graphflow.pagerank.engines.DenseCythonEngine().is_available()
+            try:
+                graphflow.pagerank.get_engine('cython')
+                raise AssertionError('the cython engine should be unavailable')
+            except ValueError:
+                pass
+            assert graphflow.pagerank.select_engine(100, 9000).name == 'dense'
+            assert graphflow.pagerank.select_engine(10000, 20000).name == 'sparse'
+
+            graph = nx.DiGraph(nx.grid_2d_graph(10, 10))
+            expected = graphflow.pagerank.CalculatePageRank(graph, 0.85, eps=1e-10, engine='dense')
+            for engine in ['auto', 'sparse']:
+                for solver in ['power', 'gauss-seidel']:
+                    pagerank = graphflow.pagerank.CalculatePageRank(graph, 0.85, eps=1e-10, engine=engine,
+                                                                    solver=solver)
+                    assert max(abs(pagerank[name] - expected[name]) for name in graph) < 1e-8, (engine, solver)
+            R, _ = graphflow.pagerank.CalculatePersonalizedPageRank(graph, 0.85, [[(0, 0)]])
+            assert R.shape == (100, 1)
+            try:
+                graphflow.pagerank.CalculatePageRankFromAdjacencyMatrix(
+                    graphflow.pagerank.GoogleMatrix(graph, 0.85)[0], {}, language=graphflow.PageRankLanguage.CYTHON
+                )
+                raise AssertionError('the Cython language should need the extension')
+            except ImportError:
+                pass
+        ''')
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        process = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True)
+        self.assertEqual(process.returncode, 0, process.stderr)
+
+    def testSolvers(self):
+        for solver in ['power', 'gauss-seidel', 'extrapolation', 'gmres', 'bicgstab']:
+            pagerank, nbmatvecs = graphflow.pagerank.CalculatePageRank(self.graph, 0.15, eps=1e-8, solver=solver,
+                                                                       return_matvecs=True)
+            self.assertGreater(nbmatvecs, 0)
+            for name in pagerank:
+                self.assertAlmostEqual(pagerank[name], pagerank_answer[name], places=5)
+
+        graph = nx.DiGraph(nx.grid_2d_graph(20, 20))
+        _, power_matvecs = graphflow.pagerank.CalculatePageRank(graph, 0.95, eps=1e-8, engine='sparse',
+                                                                return_matvecs=True)
+        for solver in ['gauss-seidel', 'extrapolation', 'gmres']:
+            _, nbmatvecs = graphflow.pagerank.CalculatePageRank(graph, 0.95, eps=1e-8, solver=solver,
+                                                                return_matvecs=True)
+            self.assertLess(nbmatvecs, power_matvecs)
+
+        self.assertRaises(ValueError, graphflow.pagerank.CalculatePageRank, self.graph, 0.15,
+                          engine='cython', solver='gmres')
+
+        # only the power iteration leaves the rank of dangling nodes out
+        graph = nx.gnp_random_graph(300, 0.01, seed=1, directed=True)
+        answer = graphflow.pagerank.CalculatePageRank(graph, 0.85, eps=1e-10, engine='sparse',
+                                                      redistribute_dangling=True)
+        for solver in ['gauss-seidel', 'extrapolation', 'gmres', 'bicgstab']:
+            self.assertRaises(ValueError, graphflow.pagerank.CalculatePageRank, graph, 0.85, solver=solver)
+            self.assertFalse(graphflow.pagerank.get_engine('sparse').can_handle(300, 900, solver=solver))
+            pagerank = graphflow.pagerank.CalculatePageRank(graph, 0.85, eps=1e-10, solver=solver,
+                                                            redistribute_dangling=True)
+            for node in answer:
+                self.assertAlmostEqual(pagerank[node], answer[node], places=6)
+        with self.assertWarns(RuntimeWarning):
+            graphflow.pagerank.CalculatePageRank(graph, 0.85, eps=1e-12, maxstep=1, solver='bicgstab',
+                                                 redistribute_dangling=True)
+        # maxstep bounds the inner iterations of GMRES, not its restart cycles
+        with self.assertWarns(RuntimeWarning):
+            _, nbmatvecs = graphflow.pagerank.CalculatePageRank(nx.DiGraph(nx.grid_2d_graph(20, 20)), 0.95,
+                                                                eps=1e-14, maxstep=45, solver='gmres',
+                                                                return_matvecs=True)
+        self.assertLessEqual(nbmatvecs, 3 * (graphflow.pagerank.solvers.GMRES_RESTART + 2))
+
+    def testIncremental(self):
+        incpagerank = graphflow.pagerank.IncrementalPageRank(self.graph, 0.15, eps=1e-8, redistribute_dangling=True)
+        pagerank = incpagerank.calculatePageRank()
+        for name in pagerank:
+            self.assertAlmostEqual(pagerank[name], pagerank_answer[name], places=5)
+        cold_matvecs = incpagerank.nbmatvecs
+
+        added_edges = [('Mary', 'Urban'), ('Zoe', 'Nancy')]
+        removed_edges = [('Zoe', 'Wallace')]
+        incpagerank.applyEdgeDelta(added_edges, removed_edges)
+        pagerank = incpagerank.calculatePageRank(initial=pagerank)
+        self.assertLess(incpagerank.nbmatvecs, cold_matvecs)
+
+        graph = self.graph.copy()
+        graph.add_edges_from(added_edges)
+        graph.remove_edges_from(removed_edges)
+        answer = graphflow.pagerank.CalculatePageRank(graph, 0.15, eps=1e-8, redistribute_dangling=True)
+        self.assertEqual(len(pagerank), len(answer))
+        for name in answer:
+            self.assertAlmostEqual(pagerank[name], answer[name], places=6)
+
+        self.assertRaises(ValueError, incpagerank.applyEdgeDelta, [], [('Zoe', 'Wallace')])
+
+    def testIncrementalDangling(self):
+        graph = nx.gnp_random_graph(300, 0.01, seed=1, directed=True)
+        added_edges, removed_edges = [(1, 2), (3, 4)], [next(iter(graph.edges()))]
+        newgraph = graph.copy()
+        newgraph.add_edges_from(added_edges)
+        newgraph.remove_edges_from(removed_edges)
+        for redistribute_dangling in [True, False]:
+            incpagerank = graphflow.pagerank.IncrementalPageRank(graph, 0.85, eps=1e-8, maxstep=10000,
+                                                                 redistribute_dangling=redistribute_dangling)
+            self.assertTrue(np.any(incpagerank.outdegree == 0))
+            pagerank = incpagerank.calculatePageRank()
+            cold_matvecs = incpagerank.nbmatvecs
+            incpagerank.applyEdgeDelta(added_edges, removed_edges)
+            pagerank = incpagerank.calculatePageRank(initial=pagerank)
+            self.assertLess(incpagerank.nbmatvecs, cold_matvecs)
+
+            answer = graphflow.pagerank.CalculatePageRank(newgraph, 0.85, eps=1e-8, maxstep=10000, engine='sparse',
+                                                          redistribute_dangling=redistribute_dangling)
+            for node in answer:
+                self.assertAlmostEqual(pagerank[node], answer[node], places=6)
+
+    def testPersonalized(self):
+        seeds = [nodes, ['Stephen'], {'Mary': 1., 'Urban': 3.}]
+        R, nodedict = graphflow.pagerank.CalculatePersonalizedPageRank(self.graph, 0.15, seeds, eps=1e-10)
+        self.assertEqual(R.shape, (len(nodes), len(seeds)))
+
+        for name in nodes:
+            self.assertAlmostEqual(R[nodedict[name], 0], pagerank_answer[name], places=5)
+        for col in [1, 2]:
+            personalization = {name: 0. for name in nodes}
+            personalization.update({name: 1. for name in seeds[col]} if col == 1 else seeds[col])
+            answer = nx.pagerank(self.graph, alpha=0.15, personalization=personalization, weight=None, tol=1e-12)
+            for name in nodes:
+                self.assertAlmostEqual(R[nodedict[name], col], answer[name], places=6)
+
+        P, dangling, _ = graphflow.pagerank.TransitionMatrix(self.graph)
+        teleport = graphflow.pagerank.TeleportMatrix(seeds, nodedict)
+        pythonR, _ = graphflow.pagerank.PersonalizedPageRankFromTransitionMatrix(P, dangling, teleport, 0.15, eps=1e-10,
+                                                                                 language=PageRankLanguage.PYTHON)
+        np.testing.assert_allclose(pythonR, R)
+
+        self.assertRaises(ValueError, graphflow.pagerank.TeleportMatrix, [[]], nodedict)
+
+        # no node, no step
+        R, nodedict = graphflow.pagerank.CalculatePersonalizedPageRank(nx.DiGraph(), 0.85, np.zeros((0, 2)))
+        self.assertEqual(R.shape, (0, 2))
+        self.assertEqual(nodedict, {})
+
+    def testResult(self):
+        result = graphflow.pagerank.CalculatePageRank(self.graph, 0.15, engine='sparse', as_result=True)
+        self.assertIsInstance(result, graphflow.NodeScores)
+        self.assertGreater(result.nbmatvecs, 0)
+        self.assertEqual(len(result), len(pagerank_answer))
+        for name in pagerank_answer:
+            self.assertAlmostEqual(result[name], pagerank_answer[name], places=5)
+        self.assertEqual(set(result.todict().keys()), set(pagerank_answer.keys()))
+
+        top = result.topk(3)
+        expected = sorted(pagerank_answer, key=lambda name: -pagerank_answer[name])[:3]
+        self.assertEqual(list(top), expected)
+        self.assertTrue(np.all(np.diff(top.scores) <= 0))
+
+        indices, found = result.nodeindex.indices(['John', 'Nobody', 'Stephen'])
+        np.testing.assert_array_equal(found, [True, False, True])
+        self.assertEqual(indices[0], result.nodeindex['John'])
+        self.assertEqual(indices[2], result.nodeindex['Stephen'])
+
+    def testMixedLabels(self):
+        nodeindex = graphflow.NodeIndex([1, 'a', 2])
+        indices, found = nodeindex.indices(['1', 'a', 'zz', 2])
+        np.testing.assert_array_equal(found, [False, True, False, True])
+        self.assertEqual(indices[1], 1)
+        self.assertEqual(indices[3], 2)
+
+        top = graphflow.NodeScores(np.array([0.5, 0.1, 0.4]), nodeindex).topk(2)
+        self.assertEqual(list(top), [1, 2])
+        self.assertAlmostEqual(top[1], 0.5)
+
+    def testTopK(self):
+        full, fullmatvecs = graphflow.pagerank.CalculatePageRank(self.graph, 0.15, engine='sparse', eps=1e-10,
+                                                                  redistribute_dangling=True, return_matvecs=True)
+        top, nbmatvecs = graphflow.pagerank.CalculatePageRank(self.graph, 0.15, eps=1e-10, top_k=3,
+                                                              redistribute_dangling=True, return_matvecs=True)
+        expected = sorted(full, key=lambda name: -full[name])[:3]
+        self.assertEqual(list(top), expected)
+        self.assertLess(nbmatvecs, fullmatvecs)
+        # the iteration stops once the ranking is settled, before the scores are accurate
+        for name in top:
+            self.assertAlmostEqual(top[name], full[name], places=2)
+
+        # when the rank leaks through the dangling nodes, the error bound does not hold,
+        # and the iteration runs until the vector converges
+        graph = nx.gnp_random_graph(300, 0.01, seed=1, directed=True)
+        full, fullmatvecs = graphflow.pagerank.CalculatePageRank(graph, 0.85, engine='sparse', eps=1e-10,
+                                                                  return_matvecs=True)
+        top, nbmatvecs = graphflow.pagerank.CalculatePageRank(graph, 0.85, eps=1e-10, top_k=5,
+                                                              return_matvecs=True)
+        self.assertEqual(nbmatvecs, fullmatvecs)
+        self.assertEqual(list(top), sorted(full, key=lambda node: -full[node])[:5])
+        for node in top:
+            self.assertAlmostEqual(top[node], full[node], places=8)
+
+        self.assertRaises(ValueError, graphflow.pagerank.CalculatePageRank, self.graph, 0.15,
+                          top_k=3, solver='gmres')
+        self.assertRaises(ValueError, graphflow.pagerank.CalculatePageRank, self.graph, 0.15, top_k=0)
+
+    def testRegisterEngine(self):
+        class UniformEngine(graphflow.pagerank.PageRankEngine):
+            name = 'uniform'
+
+            def cost(self, nbnodes, nbedges):
+                return 0.
+
+            def compute(self, src, dst, nbnodes, beta, eps=1e-4, maxstep=1000, redistribute_dangling=False,
+                        solver='power'):
+                return np.repeat(1. / nbnodes, nbnodes), 0
+
+        graphflow.pagerank.register_engine(UniformEngine())
+        try:
+            self.assertRaises(ValueError, graphflow.pagerank.register_engine, UniformEngine())
+            pagerank = graphflow.pagerank.CalculatePageRank(self.graph, 0.15)
+            self.assertAlmostEqual(pagerank['Stephen'], 1. / len(nodes))
+        finally:
+            del graphflow.pagerank.engines.PAGERANK_ENGINES['uniform']
 
 
 if __name__ == '__main__':
@@ -0,0 +1,162 @@
+
+import os
+import tempfile
+import unittest
+from itertools import product
+from unittest import mock
+
+import numpy as np
+import networkx as nx
+from graphflow.simvoltage import GraphResistanceDistance, SparseGraphResistanceDistance, \
+    ApproximateGraphResistanceDistance
+from graphflow.simvoltage.exceptions import UnknownNodeException
+
+
+class test_resistancedist(unittest.TestCase):
+    def setUp(self):
+        graph = nx.connected_watts_strogatz_graph(40, 4, 0.3, seed=11)
+        self.nodes = [f'n{node}' for node in graph.nodes()]
+        self.edges = [(f'n{node1}', f'n{node2}') for node1, node2 in graph.edges()]
+        self.dense = GraphResistanceDistance(self.nodes, self.edges)
+
+    def testTriangle(self):
+        distance = GraphResistanceDistance()
+        self.assertAlmostEqual(distance.getResistance('Stephen', 'Sinnie'), 2. / 3.)
+        self.assertRaises(UnknownNodeException, distance.getResistance, 'Stephen', 'Nobody')
+
+    def testDenseMatrix(self):
+        Omega = self.dense.Omega
+        self.assertIsInstance(Omega, np.ndarray)
+        self.assertTrue(Omega.flags['C_CONTIGUOUS'])
+        np.testing.assert_allclose(np.diagonal(Omega), 0., atol=1e-10)
+        np.testing.assert_allclose(Omega, Omega.T, atol=1e-10)
+
+        single = GraphResistanceDistance(self.nodes, self.edges, dtype=np.float32)
+        self.assertEqual(single.Omega.dtype, np.float32)
+        np.testing.assert_allclose(single.Omega, Omega, rtol=1e-4, atol=1e-5)
+
+    def testWeightedArrays(self):
+        # a -(conductance 2)- b -(conductance 1)- c, with the edge a-b repeated in reverse
+        src = np.array([0, 1, 1, 2])
+        dst = np.array([1, 2, 0, 2])
+        conductance = np.array([2., 1., 5., 3.])
+        for cls in [GraphResistanceDistance, SparseGraphResistanceDistance]:
+            distance = cls(['a', 'b', 'c'], src=src, dst=dst, conductance=conductance)
+            self.assertEqual(len(distance.edges), 2)
+            self.assertAlmostEqual(distance.getResistance('a', 'b'), 0.5)
+            self.assertAlmostEqual(distance.getResistance('a', 'c'), 1.5)
+
+        tupled = GraphResistanceDistance(['a', 'b', 'c'], [('a', 'b', 2.), ('b', 'c', 1.)])
+        self.assertAlmostEqual(tupled.getResistance('c', 'a'), 1.5)
+
+        indexed = SparseGraphResistanceDistance(src=src, dst=dst)
+        self.assertEqual(indexed.nodes, [0, 1, 2])
+        self.assertAlmostEqual(indexed.getResistance(0, 2), 2.)
+
+    def testSparse(self):
+        for method in ['lu', 'cg']:
+            distance = SparseGraphResistanceDistance(self.nodes, self.edges, method=method)
+            for node1, node2 in [('n0', 'n1'), ('n3', 'n27'), ('n39', 'n0'), ('n5', 'n5')]:
+                self.assertAlmostEqual(distance.getResistance(node1, node2),
+                                       self.dense.getResistance(node1, node2), places=6)
+            self.assertRaises(UnknownNodeException, distance.getResistance, 'n0', 'Nobody')
+
+        self.assertRaises(ValueError, SparseGraphResistanceDistance, self.nodes, self.edges, method='qr')
+
+    def testSparseDisconnected(self):
+        distance = SparseGraphResistanceDistance(['a', 'b', 'c', 'd', 'e'],
+                                                 [('a', 'b'), ('b', 'c'), ('d', 'e')])
+        self.assertAlmostEqual(distance.getResistance('a', 'c'), 2.)
+        self.assertAlmostEqual(distance.getResistance('e', 'd'), 1.)
+        self.assertEqual(distance.getResistance('a', 'd'), np.inf)
+
+        # the engines agree across components
+        nodes, edges = ['a', 'b', 'c', 'd', 'e', 'f'], [('a', 'b'), ('b', 'c'), ('c', 'a'), ('d', 'e')]
+        expected = SparseGraphResistanceDistance(nodes, edges).getResistances(*zip(*product(nodes, repeat=2)))[0]
+        for distance in [GraphResistanceDistance(nodes, edges),
+                         GraphResistanceDistance(nodes, edges, dtype=np.float32),
+                         ApproximateGraphResistanceDistance(nodes, edges, nbprojections=2000, seed=1)]:
+            resistances, _ = distance.getResistances(*zip(*product(nodes, repeat=2)))
+            np.testing.assert_array_equal(np.isinf(resistances), np.isinf(expected))
+            np.testing.assert_allclose(resistances, expected, rtol=0.2, atol=1e-6)
+        self.assertEqual(GraphResistanceDistance(nodes, edges).getResistance('f', 'f'), 0.)
+
+    def testApproximate(self):
+        epsilon = 0.3
+        distance = ApproximateGraphResistanceDistance(self.nodes, self.edges, epsilon=epsilon, seed=5)
+        for node1, node2 in [('n0', 'n1'), ('n3', 'n27'), ('n39', 'n0')]:
+            exact = self.dense.getResistance(node1, node2)
+            self.assertLess(abs(distance.getResistance(node1, node2) - exact), epsilon * exact)
+        self.assertEqual(distance.getResistance('n2', 'n2'), 0.)
+
+        again = ApproximateGraphResistanceDistance(self.nodes, self.edges, nbprojections=30, seed=5)
+        self.assertEqual(again.embedding.shape, (len(self.nodes), 30))
+        self.assertEqual(again.getResistance('n0', 'n1'),
+                         ApproximateGraphResistanceDistance(self.nodes, self.edges, nbprojections=30, seed=5)
+                         .getResistance('n0', 'n1'))
+
+        # with as many directions as nodes, or more, the distances are exact
+        sparsedistance = SparseGraphResistanceDistance(self.nodes, self.edges)
+        pairs = [('n0', 'n1'), ('n3', 'n27'), ('n39', 'n0')]
+        for exact in [distance, ApproximateGraphResistanceDistance(self.nodes, self.edges, nbprojections=40)]:
+            self.assertIsNone(exact.embedding)
+            np.testing.assert_allclose(exact.getResistances(*zip(*pairs))[0],
+                                       sparsedistance.getResistances(*zip(*pairs))[0])
+
+    def testBatch(self):
+        nodes1 = ['n0', 'n3', 'Nobody', 'n39', 'n5']
+        nodes2 = ['n1', 'n27', 'n0', 'n0', 'n5']
+        expected = np.array([self.dense.getResistance(node1, node2) if node1 != 'Nobody' else np.nan
+                             for node1, node2 in zip(nodes1, nodes2)])
+        for distance in [self.dense,
+                         SparseGraphResistanceDistance(self.nodes, self.edges, method='lu'),
+                         SparseGraphResistanceDistance(self.nodes, self.edges, method='cg'),
+                         ApproximateGraphResistanceDistance(self.nodes, self.edges, nbprojections=2000, seed=1)]:
+            resistances, found = distance.getResistances(nodes1, nodes2)
+            np.testing.assert_array_equal(found, [True, True, False, True, True])
+            np.testing.assert_allclose(resistances, expected, rtol=0.2, atol=1e-6)
+
+        resistances, found = self.dense.getResistances(np.array([0, 1, 40]), np.array([1, 1, 0]), indices=True)
+        np.testing.assert_array_equal(found, [True, True, False])
+        self.assertAlmostEqual(resistances[0], self.dense.getResistance('n0', 'n1'))
+
+        # one solve per node when the pairs share nodes, and one per pair otherwise, by small blocks
+        nodes1 = ['n0'] * 40 + self.nodes[:20]
+        nodes2 = self.nodes + self.nodes[20:]
+        expected, _ = self.dense.getResistances(nodes1, nodes2)
+        with mock.patch('graphflow.simvoltage.sparseresistance.SOLVE_BLOCK_ENTRIES', 100):
+            for method in ['lu', 'cg']:
+                distance = SparseGraphResistanceDistance(self.nodes, self.edges, method=method)
+                np.testing.assert_allclose(distance.getResistances(nodes1, nodes2)[0], expected, atol=1e-6)
+                np.testing.assert_allclose(distance.getResistances(nodes1[40:], nodes2[40:])[0], expected[40:],
+                                           atol=1e-6)
+
+        disconnected = SparseGraphResistanceDistance(['a', 'b', 'c'], [('a', 'b')])
+        resistances, _ = disconnected.getResistances(['a', 'a'], ['b', 'c'])
+        np.testing.assert_allclose(resistances, [1., np.inf])
+
+    def testSaveLoad(self):
+        approximate = ApproximateGraphResistanceDistance(self.nodes, self.edges, nbprojections=30, seed=3)
+        exact = ApproximateGraphResistanceDistance(self.nodes, self.edges, nbprojections=100, seed=3)
+        sparsedistance = SparseGraphResistanceDistance(self.nodes, self.edges)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name, distance in [('dense', self.dense), ('sparse', sparsedistance),
+                                   ('approximate', approximate), ('exact', exact)]:
+                path = os.path.join(tmpdir, name)
+                distance.save(path)
+                loaded = type(distance).load(path)
+                self.assertEqual(loaded.nodes, self.nodes)
+                for node1, node2 in [('n0', 'n1'), ('n3', 'n27')]:
+                    self.assertAlmostEqual(loaded.getResistance(node1, node2), distance.getResistance(node1, node2))
+                self.assertEqual(len(loaded.edges), len(distance.edges))
+
+            self.assertIsNone(ApproximateGraphResistanceDistance.load(os.path.join(tmpdir, 'exact')).embedding)
+            loaded = GraphResistanceDistance.load(os.path.join(tmpdir, 'dense'))
+            self.assertIsInstance(loaded.Omega, np.memmap)
+            self.assertFalse(loaded.Omega.flags.writeable)
+            self.assertRaises(ValueError, SparseGraphResistanceDistance.load,
+                              os.path.join(tmpdir, 'dense'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 
+import sys
 import unittest
+from unittest import mock
 
+import networkx as nx
 import numpy as np
 from graphflow.simvoltage import SocialNetworkSimVoltage
 
@@ -28,5 +31,159 @@ class test_SocialNetwork(unittest.TestCase):
         self.assertAlmostEqual(circuit.getResistance('a', 'c'), 10.0)
         self.assertAlmostEqual(circuit.getResistance('c', 'a'), np.inf)
 
+    def test_direct(self):
+        circuit = SocialNetworkSimVoltage(nodes=['a', 'b', 'c'],
+                                          edges=[('a', 'b', 10.0),
+                                                 ('b', 'c', 10.0),
+                                                 ('a', 'c', 20.0)],
+                                          method='direct')
+        self.assertAlmostEqual(circuit.getResistance('a', 'c'), 10.0)
+        self.assertAlmostEqual(circuit.getResistance('b', 'c'), 10.0)
+        self.assertAlmostEqual(circuit.getResistance('c', 'a'), np.inf)
+        self.assertRaises(ValueError, SocialNetworkSimVoltage, method='cholesky')
+
+    def test_direct_fixed_point(self):
+        # wherever the relaxation converges, the direct potentials must be balanced too
+        nbchecked = 0
+        for seed in range(12):
+            rng = np.random.default_rng(seed)
+            graph = nx.gnp_random_graph(20, 0.15, seed=seed, directed=True)
+            nodes = [f'p{node}' for node in graph.nodes()]
+            edges = [(f'p{node1}', f'p{node2}', float(rng.uniform(0.2, 2.0))) for node1, node2 in graph.edges()]
+            circuit = SocialNetworkSimVoltage(nodes=nodes, edges=edges, method='direct')
+            for _ in range(10):
+                idx1, idx2 = rng.choice(len(nodes), 2, replace=False).tolist()
+                if np.isinf(circuit.distances[idx1, idx2]):
+                    continue
+                initial = np.array(list(circuit.initloop(nodes[idx1], nodes[idx2]).values()))
+                voltages, converged = initial, False
+                for _ in range(500):
+                    voltages, converged = circuit.jacobiSweep(voltages, idx1, idx2)
+                    if converged:
+                        break
+                if not converged:
+                    continue
+                nbchecked += 1
+                direct = circuit.solveVoltagesDirect(initial, idx1, idx2)
+                self.assertTrue(circuit.jacobiSweep(direct, idx1, idx2)[1])
+        self.assertGreater(nbchecked, 30)
+
+        # a free node left without conducting edge is not grounded
+        rng = np.random.default_rng(0)
+        graph = nx.gnp_random_graph(20, 0.15, seed=0, directed=True)
+        nodes = [f'p{node}' for node in graph.nodes()]
+        edges = [(f'p{node1}', f'p{node2}', float(rng.uniform(0.2, 2.0))) for node1, node2 in graph.edges()]
+        relaxation = SocialNetworkSimVoltage(nodes=nodes, edges=edges)
+        direct = SocialNetworkSimVoltage(nodes=nodes, edges=edges, method='direct')
+        self.assertAlmostEqual(direct.getResistance('p16', 'p11'), relaxation.getResistance('p16', 'p11'), places=6)
+
+    def test_lazy_distance(self):
+        circuit = SocialNetworkSimVoltage(nodes=['a', 'b', 'c'],
+                                          edges=[('a', 'b', 10.0),
+                                                 ('b', 'c', 10.0),
+                                                 ('a', 'c', 20.0)],
+                                          precalculated_distance='lazy')
+        self.assertAlmostEqual(circuit.getResistance('a', 'c'), 10.0)
+        self.assertAlmostEqual(circuit.getResistance('b', 'c'), 10.0)
+        self.assertAlmostEqual(circuit.getResistance('c', 'a'), np.inf)
+        misses = circuit.shortestPathTree.cache_info().misses
+        self.assertAlmostEqual(circuit.getResistance('a', 'c'), 10.0)
+        cacheinfo = circuit.shortestPathTree.cache_info()
+        self.assertEqual(cacheinfo.misses, misses)
+        self.assertGreater(cacheinfo.hits, 0)
+
+    def test_dijkstra_per_query(self):
+        # one search from person1 and one to person2 per query
+        # (the module is shadowed by the class in graphflow.simvoltage)
+        module = sys.modules['graphflow.simvoltage.SocialNetworkSimVoltage']
+        graph = nx.gnp_random_graph(30, 0.15, seed=4, directed=True)
+        nodes = [f'p{node}' for node in graph.nodes()]
+        edges = [(f'p{node1}', f'p{node2}', 1.0) for node1, node2 in graph.edges()]
+        for precalculated_distance in [False, True]:
+            circuit = SocialNetworkSimVoltage(nodes=nodes, edges=edges, precalculated_distance=precalculated_distance)
+            with mock.patch.object(module, 'dijkstra', wraps=module.dijkstra) as search:
+                resistance = circuit.getResistance('p0', 'p1')
+                self.assertEqual(search.call_count, 2)
+            self.assertTrue(np.isfinite(resistance))
+
+        circuit = SocialNetworkSimVoltage(nodes=nodes, edges=edges, precalculated_distance='lazy')
+        circuit.getResistance('p0', 'p1')
+        with mock.patch.object(module, 'dijkstra', wraps=module.dijkstra) as search:
+            circuit.getResistance('p0', 'p1')
+            self.assertEqual(search.call_count, 0)
+
+    def test_batch(self):
+        circuit = SocialNetworkSimVoltage(nodes=['a', 'b', 'c'],
+                                          edges=[('a', 'b', 10.0),
+                                                 ('b', 'c', 10.0),
+                                                 ('a', 'c', 20.0)])
+        resistances, found = circuit.getResistances(['b', 'a', 'x', 'c'], ['c', 'c', 'a', 'a'])
+        np.testing.assert_array_equal(found, [True, True, False, True])
+        np.testing.assert_allclose(resistances, [10.0, 10.0, np.nan, np.inf])
+
+    def test_jacobisweep(self):
+        rng = np.random.default_rng(0)
+        graph = nx.gnp_random_graph(30, 0.1, seed=2, directed=True)
+        nodes = [f'p{node}' for node in graph.nodes()]
+        edges = [(f'p{node1}', f'p{node2}', float(rng.uniform(0.2, 2.0))) for node1, node2 in graph.edges()]
+        circuit = SocialNetworkSimVoltage(nodes=nodes, edges=edges, precalculated_distance=False)
+
+        voltages = rng.uniform(-0.2, 1.2, size=len(nodes))
+        newvoltages, converged = circuit.jacobiSweep(voltages, 0, 1)
+
+        # one sweep of the per-node methods
+        volDict = dict(zip(nodes, voltages.tolist()))
+        expected = dict(volDict)
+        expected_converged = True
+        for node in nodes[2:]:
+            if (volDict[node] < 0.0) or (volDict[node] > 1.0):
+                expected[node] = 10.0
+            elif abs(circuit.compute_incurrent(node, volDict) - circuit.compute_outcurrent(node, volDict)) > circuit.errTol:
+                sumVOverR, numRecR = circuit.average_VR(node, volDict)
+                expected[node] = 0.0 if numRecR == 0 else sumVOverR / numRecR
+                expected_converged = False
+        expected[nodes[0]], expected[nodes[1]] = 1.0, 0.0
+
+        self.assertEqual(newvoltages.tolist(), [expected[node] for node in nodes])
+        self.assertEqual(converged, expected_converged)
+
+    def test_irrelevantmask(self):
+        rng = np.random.default_rng(1)
+        graph = nx.gnp_random_graph(40, 0.08, seed=3, directed=True)
+        nodes = [f'p{node}' for node in graph.nodes()]
+        edges = [(f'p{node1}', f'p{node2}', float(rng.uniform(0.2, 2.0))) for node1, node2 in graph.edges()]
+        circuit = SocialNetworkSimVoltage(nodes=nodes, edges=edges, precalculated_distance='lazy')
+
+        for person1, person2 in [('p0', 'p1'), ('p5', 'p2'), ('p12', 'p30'), ('p3', 'p39')]:
+            mask = circuit.irrelevantMask(circuit.nodeindex[person1], circuit.nodeindex[person2])
+            for node in nodes:
+                if node not in [person1, person2]:
+                    self.assertEqual(mask[circuit.nodeindex[node]],
+                                     circuit.checkPersonIrrelevant(node, person1, person2))
+
+    def test_precalculate_distance(self):
+        rng = np.random.default_rng(0)
+        graph = nx.gnp_random_graph(150, 0.02, seed=2, directed=True)
+        nodes = [f'p{node}' for node in graph.nodes()]
+        edges = [(f'p{node1}', f'p{node2}', float(rng.uniform(0.2, 2.0))) for node1, node2 in graph.edges()]
+        circuit = SocialNetworkSimVoltage(nodes=nodes, edges=edges, precalculated_distance=False)
+        circuit.precalculate_distance(max_workers=2)
+
+        lengths = dict(nx.all_pairs_dijkstra_path_length(circuit.wordNet))
+        expected = np.array([[lengths[node1].get(node2, np.inf) for node2 in nodes] for node1 in nodes])
+        self.assertTrue(np.any(np.isinf(expected)))
+        np.testing.assert_allclose(circuit.distances, expected)
+
+        # the serial default gives the same distances, also through distance_matrix
+        serial = SocialNetworkSimVoltage(nodes=nodes, edges=edges, precalculated_distance=True)
+        np.testing.assert_array_equal(serial.distances, circuit.distances)
+        self.assertEqual(len(serial.distance_matrix), 150 * 150)
+        for node1, node2 in [('p0', 'p1'), ('p5', 'p2'), ('p12', 'p30'), ('p3', 'p149')]:
+            self.assertEqual(serial.distance_matrix[(node1, node2)], lengths[node1].get(node2, np.inf))
+        self.assertRaises(KeyError, serial.distance_matrix.__getitem__, ('p0', 'nobody'))
+        # the graph of the pool workers is not set in the calling process
+        self.assertIsNone(sys.modules['graphflow.simvoltage.SocialNetworkSimVoltage']._dijkstraGraph)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
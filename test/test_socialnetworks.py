@@ -1,76 +1,165 @@
 
+import asyncio
 import os
+import sys
+import tempfile
 import unittest
 
 import numpy as np
 import pandas as pd
-from graphflow.simvoltage import SocialNetworkSimVoltage, GraphResistanceDistance
+from graphflow.simvoltage import SocialNetworkSimVoltage, GraphResistanceDistance, ResistanceService
+from graphflow.simvoltage.SocialNetworkSimVoltage import _mapArrayState, _initResistanceWorker, _resistancePairs, \
+    _resistanceRow, _rowsCacheSize
 
 class test_SocialNetwork(unittest.TestCase):
     def setUp(self):
-        pass
+        self.nodes = ['Stephen', 'John', 'Mary',
+                      'Joshua',
+                      'Abigail', 'Andrew', 'Jacob', 'Melanie',
+                      'Shirley', 'Zoe', 'Wallace', 'Susan',
+                      'Urban']
+        self.edges = [('Stephen', 'Jacob', 1),
+                      ('Jacob', 'Stephen', 1),
+                      ('Stephen', 'Abigail', 1),
+                      ('Abigail', 'Stephen', 1),
+                      ('Stephen', 'Andrew', 1),
+                      ('Andrew', 'Stephen', 1),
+                      ('Andrew', 'Abigail', 1),
+                      ('Abigail', 'Andrew', 1),
+                      ('John', 'Stephen', 1),
+                      ('Andrew', 'John', 0.4),
+                      ('John', 'Andrew', 0.6),
+                      ('Abigail', 'John', 1),
+                      ('John', 'Abigail', 1),
+                      ('John', 'Mary', 1),
+                      ('Mary', 'John', 0.9),
+                      ('John', 'Joshua', 1),
+                      ('Joshua', 'John', 1),
+                      ('John', 'Jacob', 1),
+                      ('Jacob', 'John', 1),
+                      ('Abigail', 'Jacob', 1),
+                      ('Jacob', 'Abigail', 1),
+                      ('Jacob', 'Andrew', 1),
+                      ('Andrew', 'Jacob', 1),
+                      ('Shirley', 'Stephen', 1),
+                      ('Stephen', 'Shirley', 1),
+                      ('Melanie', 'Stephen', 1),
+                      ('Stephen', 'Melanie', 1),
+                      ('Melanie', 'Shirley', 1),
+                      ('Shirley', 'Urban', 0.2),
+                      ('Urban', 'Shirley', 0.21),
+                      ('Susan', 'Shirley', 1),
+                      ('Shirley', 'Susan', 1),
+                      ('Shirley', 'Zoe', 1),
+                      ('Zoe', 'Shirley', 1),
+                      ('Shirley', 'Wallace', 1),
+                      ('Wallace', 'Shirley', 1),
+                      ('Zoe', 'Wallace', 1)]
+
+        THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+        self.testresults = pd.read_csv(os.path.join(THIS_DIR, 'socialnetworkranks.csv'),
+                                       header=None,
+                                       names=['name1', 'name2', 'resistance'],
+                                       dtype={'name1': str, 'name2': str, 'resistance': np.float64})
 
     def tearDown(self):
         pass
 
     def test_socialnetwork(self):
-        nodes = ['Stephen', 'John', 'Mary',
-                 'Joshua',
-                 'Abigail', 'Andrew', 'Jacob', 'Melanie',
-                 'Shirley', 'Zoe', 'Wallace', 'Susan',
-                 'Urban']
-        edges = [('Stephen', 'Jacob', 1),
-                 ('Jacob', 'Stephen', 1),
-                 ('Stephen', 'Abigail', 1),
-                 ('Abigail', 'Stephen', 1),
-                 ('Stephen', 'Andrew', 1),
-                 ('Andrew', 'Stephen', 1),
-                 ('Andrew', 'Abigail', 1),
-                 ('Abigail', 'Andrew', 1),
-                 ('John', 'Stephen', 1),
-                 ('Andrew', 'John', 0.4),
-                 ('John', 'Andrew', 0.6),
-                 ('Abigail', 'John', 1),
-                 ('John', 'Abigail', 1),
-                 ('John', 'Mary', 1),
-                 ('Mary', 'John', 0.9),
-                 ('John', 'Joshua', 1),
-                 ('Joshua', 'John', 1),
-                 ('John', 'Jacob', 1),
-                 ('Jacob', 'John', 1),
-                 ('Abigail', 'Jacob', 1),
-                 ('Jacob', 'Abigail', 1),
-                 ('Jacob', 'Andrew', 1),
-                 ('Andrew', 'Jacob', 1),
-                 ('Shirley', 'Stephen', 1),
-                 ('Stephen', 'Shirley', 1),
-                 ('Melanie', 'Stephen', 1),
-                 ('Stephen', 'Melanie', 1),
-                 ('Melanie', 'Shirley', 1),
-                 ('Shirley', 'Urban', 0.2),
-                 ('Urban', 'Shirley', 0.21),
-                 ('Susan', 'Shirley', 1),
-                 ('Shirley', 'Susan', 1),
-                 ('Shirley', 'Zoe', 1),
-                 ('Zoe', 'Shirley', 1),
-                 ('Shirley', 'Wallace', 1),
-                 ('Wallace', 'Shirley', 1),
-                 ('Zoe', 'Wallace', 1)]
-        wn1 = SocialNetworkSimVoltage(nodes=nodes, edges=edges, precalculated_distance=True)
-
-        THIS_DIR = os.path.dirname(os.path.abspath(__file__))
-        testresults = pd.read_csv(os.path.join(THIS_DIR, 'socialnetworkranks.csv'),
-                                  header=None,
-                                  names=['name1', 'name2', 'resistance'],
-                                  dtype={'name1': str, 'name2': str, 'resistance': np.float64})
+        wn1 = SocialNetworkSimVoltage(nodes=self.nodes, edges=self.edges, precalculated_distance=True)
 
-        for _, row in testresults.iterrows():
+        for _, row in self.testresults.iterrows():
             name1 = row['name1']
             name2 = row['name2']
             resistance = row['resistance']
             self.assertAlmostEqual(wn1.getResistance(name1, name2), resistance, places=3)
             print('%s\t%s : %.4f passed.' % (name1, name2, resistance))
 
+    def test_socialnetwork_direct(self):
+        # the direct solve is exact, while the relaxation stops within its tolerance
+        wn2 = SocialNetworkSimVoltage(nodes=self.nodes, edges=self.edges, method='direct')
+
+        for _, row in self.testresults.iterrows():
+            self.assertAlmostEqual(wn2.getResistance(row['name1'], row['name2']), row['resistance'], delta=1e-3)
+
+    def test_resistance_matrix(self):
+        wn1 = SocialNetworkSimVoltage(nodes=self.nodes, edges=self.edges, precalculated_distance=True)
+
+        # the pairs of the table are on the diagonal
+        matrix = wn1.resistance_matrix(self.testresults['name1'], self.testresults['name2'], max_workers=2)
+        np.testing.assert_allclose(np.diag(matrix), self.testresults['resistance'], atol=1e-3)
+        self.assertRaises(ValueError, wn1.resistance_matrix, ['Nobody'])
+
+        # the workers map the arrays of the network instead of receiving copies
+        with tempfile.TemporaryDirectory() as directory:
+            state, paths = _mapArrayState(wn1.arrayState(), directory)
+            self.assertEqual(set(paths), {'edgeSrc', 'edgeDst', 'edgeResistance', 'inEdgeOrder'})
+            self.assertFalse(any(isinstance(value, np.ndarray) for value in state.values()))
+            _initResistanceWorker(state, paths)
+            idx1, _ = wn1.nodeindex.indices(self.testresults['name1'])
+            idx2, _ = wn1.nodeindex.indices(self.testresults['name2'])
+            np.testing.assert_array_equal(_resistancePairs(idx1, idx2),
+                                          [wn1.resistanceFromIndices(i1, i2) for i1, i2 in zip(idx1, idx2)])
+
+            # the rows compute each tree once, even with more targets than the cache holds
+            targets = np.arange(len(self.nodes))
+            state['cache_size'] = _rowsCacheSize(4, targets)
+            _initResistanceWorker(state, paths, targets)
+            for idx1 in range(5):
+                np.testing.assert_array_equal(_resistanceRow(idx1),
+                                              [wn1.resistanceFromIndices(idx1, idx2) for idx2 in targets])
+            network = sys.modules['graphflow.simvoltage.SocialNetworkSimVoltage']._resistanceNetwork
+            self.assertEqual(network.shortestPathTree.cache_info().misses, 5 + len(targets))
+            self.assertIsNone(_rowsCacheSize(None, targets))
+
+    def test_service(self):
+        network = SocialNetworkSimVoltage(nodes=['Stephen', 'Sinnie', 'Elaine'],
+                                          edges=[('Stephen', 'Sinnie', 0.2), ('Sinnie', 'Stephen', 0.2),
+                                                 ('Sinnie', 'Elaine', 0.3), ('Elaine', 'Sinnie', 0.2),
+                                                 ('Stephen', 'Elaine', 1.1), ('Elaine', 'Stephen', 1.2)])
+        pairs = [('Stephen', 'Sinnie'), ('Stephen', 'Elaine'), ('Elaine', 'Sinnie'),
+                 ('Sinnie', 'Elaine'), ('Stephen', 'Nobody')] * 3
+
+        async def query():
+            async with ResistanceService(network, max_workers=2, max_pending=4, batch_size=3) as service:
+                async def produce():
+                    for person1, person2 in pairs:
+                        await service.submit(person1, person2)
+                    await service.close()
+                producer = asyncio.create_task(produce())
+                results = [result async for result in service]
+                await producer
+                return results
+
+        results = asyncio.run(query())
+        self.assertEqual(sorted(pair for pair, _ in results), sorted(pairs))
+        for (person1, person2), resistance in results:
+            if person2 == 'Nobody':
+                self.assertTrue(np.isnan(resistance))
+            else:
+                self.assertEqual(resistance, network.getResistance(person1, person2))
+
+        # a malformed pair stops the dispatching, and the consumer raises instead of waiting
+        async def malformed():
+            async with ResistanceService(network, max_workers=1) as service:
+                await service.submit(['Stephen'], 'Sinnie')
+                await service.close()
+                return [result async for result in service]
+
+        self.assertRaises(TypeError, asyncio.run, asyncio.wait_for(malformed(), 60))
+
+    def test_groupbatch(self):
+        network = SocialNetworkSimVoltage(nodes=['Stephen', 'Sinnie', 'Elaine'],
+                                          edges=[('Stephen', 'Sinnie', 0.2), ('Sinnie', 'Stephen', 0.2)])
+        service = ResistanceService(network, max_workers=2)
+        batch = [('a', 'b'), ('c', 'd'), ('e', 'f'), ('g', 'h'), ('i', 'j'), ('l', 'k'), ('m', 'k'), ('n', 'k')]
+        groups = service.groupBatch(batch)
+        self.assertEqual(len(groups), 3)
+        self.assertIn([5, 6, 7], groups)
+        # the pairs sharing no person are split between the two workers
+        self.assertIn([0, 2, 4], groups)
+        self.assertIn([1, 3], groups)
+
     def test_resistdist(self):
         obj = GraphResistanceDistance()
         self.assertAlmostEqual(obj.getResistance('Stephen', 'Sinnie'), 0.6666666666666667, places=4)